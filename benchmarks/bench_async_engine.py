@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+对比线程池下载路径 (Wenku8Downloader) 与 asyncio 引擎 (AsyncWenku8Downloader)
+在相同并发上限下的章节吞吐量。所有请求都发往本地替身服务器。
+
+用法:
+    python benchmarks/bench_async_engine.py --concurrency 8 --latency 0.05
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.standin_server import StandinWenku8
+from novel.async_engine import AsyncWenku8Downloader
+from novel.hosts import PAGES, PACKS
+from novel.main import Wenku8Downloader
+from novel.metadata_cache import MetadataCache
+from novel.rate_limiter import AdaptiveRateLimiter
+
+
+class OfflineDownloader(Wenku8Downloader):
+    """跳过登录的同步下载器"""
+
+    def login(self, username, password):
+        return True
+
+
+def build_jobs(volumes, output_dir):
+    jobs = []
+    for volume in volumes:
+        volume_dir = os.path.join(output_dir, volume['title'])
+        os.makedirs(volume_dir, exist_ok=True)
+        for chapter in Wenku8Downloader._prefixed_chapters(volume):
+            jobs.append((chapter, volume_dir))
+    return jobs
+
+
+def bench_threads(server, concurrency, rate, work_dir):
+    downloader = OfflineDownloader(max_workers=concurrency, max_connections_per_host=concurrency)
+    downloader.rate_limiter = AdaptiveRateLimiter(initial_rate=rate, max_rate=rate, burst=concurrency)
+    downloader.illustration_fetcher.rate_limiter = downloader.rate_limiter
+    # 备用的 packtxt/pack 请求也发往替身服务器，不访问真实站点
+    downloader.hosts.set_mirrors({PAGES: [server.base_url], PACKS: [server.base_url]})
+    downloader.metadata_cache = MetadataCache(cache_dir=os.path.join(work_dir, 'meta'))
+    details = downloader.get_novel_details(1)
+    volumes = downloader.get_chapter_list(details['catalog_url'], novel_id=1)
+    jobs = build_jobs(volumes, os.path.join(work_dir, 'out'))
+    start = time.perf_counter()
+    results = downloader._download_chapters_parallel(jobs, 1, max_retries=1, retry_delay=0)
+    return sum(results), len(jobs), time.perf_counter() - start
+
+
+async def bench_async(server, concurrency, rate, work_dir):
+    engine = AsyncWenku8Downloader(site_url=server.base_url, pack_url=server.base_url, concurrency=concurrency,
+                                   rate_limiter=AdaptiveRateLimiter(initial_rate=rate, max_rate=rate, burst=concurrency),
+                                   metadata_cache=MetadataCache(cache_dir=os.path.join(work_dir, 'meta')),
+                                   cover_cache_dir=os.path.join(work_dir, 'covers'))
+    async with engine:
+        details = await engine.get_novel_details(1)
+        volumes = await engine.get_chapter_list(details['catalog_url'], novel_id=1)
+        jobs = build_jobs(volumes, os.path.join(work_dir, 'out'))
+        start = time.perf_counter()
+        results = await engine.download_chapters(jobs, 1, max_retries=1, retry_delay=0)
+    return sum(results), len(jobs), time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--concurrency', type=int, default=8, help='两种路径共用的并发请求上限')
+    parser.add_argument('--rate', type=float, default=1000.0, help='两种路径共用的每秒请求上限')
+    parser.add_argument('--latency', type=float, default=0.05, help='替身服务器每个请求的延迟 (秒)')
+    parser.add_argument('--volumes', type=int, default=4)
+    parser.add_argument('--chapters', type=int, default=25, help='每卷章节数')
+    args = parser.parse_args()
+
+    server = StandinWenku8(volumes=args.volumes, chapters_per_volume=args.chapters, latency=args.latency).start()
+    rows = []
+    try:
+        for name, runner in (('threads', lambda d: bench_threads(server, args.concurrency, args.rate, d)),
+                             ('asyncio', lambda d: asyncio.run(bench_async(server, args.concurrency, args.rate, d)))):
+            with tempfile.TemporaryDirectory() as work_dir, contextlib.redirect_stdout(io.StringIO()):
+                ok, total, elapsed = runner(work_dir)
+            rows.append((name, ok, total, elapsed))
+    finally:
+        server.stop()
+
+    print(f"并发上限 {args.concurrency}，限速 {args.rate:g} 次/秒，服务器延迟 {args.latency * 1000:.0f} ms，{server.chapter_count()} 个章节")
+    print(f"{'engine':<10}{'ok':>8}{'seconds':>10}{'chapters/s':>12}")
+    for name, ok, total, elapsed in rows:
+        print(f"{name:<10}{f'{ok}/{total}':>8}{elapsed:>10.2f}{total / elapsed:>12.2f}")
+
+
+if __name__ == '__main__':
+    main()
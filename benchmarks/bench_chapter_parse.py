@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+章节正文提取的微基准: 对比原来的 html.parser 两次解析路径与 novel.parsing 中的 lxml 单次解析路径，
+报告每章平均解析时间和 tracemalloc 峰值内存，并确认两者输出一致。
+
+用法:
+    python benchmarks/bench_chapter_parse.py --paragraphs 400 --runs 50
+"""
+
+import argparse
+import os
+import re
+import sys
+import time
+import tracemalloc
+from urllib.parse import urljoin
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bs4 import BeautifulSoup
+
+from novel.parsing import extract_chapter_content
+
+PAGE_URL = 'https://www.wenku8.net/novel/2/2255/84405.htm'
+
+
+def legacy_extract_chapter_content(html, page_url):
+    """改动前 download_chapter 中的提取逻辑 (html.parser，内容区序列化后再解析一次)"""
+    soup = BeautifulSoup(html, 'html.parser')
+    text_content = ""
+    image_urls_to_download = []
+    main_content_area = None
+    for selector in ['#content', '#contentmain', 'div[id="content"]', '.content']:
+        candidate = soup.select_one(selector)
+        if candidate:
+            main_content_area = candidate
+            break
+    if not main_content_area:
+        main_content_area = soup.body if soup.body else soup
+    if main_content_area:
+        image_elements = main_content_area.select('div.divimage img.imagecontent')
+        if not image_elements:
+            image_elements = main_content_area.select('img.imagecontent')
+        for img_tag in image_elements:
+            img_src = img_tag.get('src')
+            if img_src:
+                full_img_url = urljoin(page_url, img_src)
+                if full_img_url not in image_urls_to_download:
+                    image_urls_to_download.append(full_img_url)
+    if main_content_area:
+        text_extraction_soup = BeautifulSoup(str(main_content_area), 'html.parser')
+        elements_to_remove_for_text = 'div.divimage, ul#contentdp, div.chapter_turnpage, div#contentadv, script, style'
+        if 'div[align="center"] > table' in str(text_extraction_soup):
+            elements_to_remove_for_text += ', div[align="center"] > table'
+        for element_to_remove in text_extraction_soup.select(elements_to_remove_for_text):
+            element_to_remove.decompose()
+        text_content = text_extraction_soup.get_text(separator='\n', strip=True)
+        text_content = re.sub(r'\n{2,}', '\n\n', text_content)
+    return text_content, image_urls_to_download
+
+
+def sample_page(paragraphs, images=0):
+    """构造与轻小说文库章节页结构相近的页面"""
+    nav = ''.join(f'<li><a href="/modules/article/articlelist.php?class={i}">分类{i}</a></li>' for i in range(40))
+    body = '<br />\n'.join(
+        f'&nbsp;&nbsp;&nbsp;&nbsp;第{i}段。「这是一段用于测试的轻小说正文，长度与真实章节相近。」他说道。' * 2
+        for i in range(paragraphs)
+    )
+    illustrations = ''.join(
+        f'<div class="divimage"><a href="http://pic.wenku8.com/pictures/2/2255/84405/{i}.jpg" target="_blank">'
+        f'<img src="http://pic.wenku8.com/pictures/2/2255/84405/{i}.jpg" border="0" class="imagecontent"></a></div>'
+        for i in range(images)
+    )
+    return (
+        '<!DOCTYPE html PUBLIC "-//W3C//DTD XHTML 1.0 Transitional//EN">'
+        '<html><head><meta http-equiv="Content-Type" content="text/html; charset=gbk" />'
+        '<title>第一章 - 轻小说文库</title><link rel="stylesheet" href="/css/read.css" />'
+        '<script type="text/javascript">var preview_page = "84404.htm";</script></head><body>'
+        f'<div id="adv900"></div><div id="headlink"><ul>{nav}</ul></div>'
+        '<div id="title">第一章</div><div id="info">作者：测试</div>'
+        '<div id="content"><ul id="contentdp"><li>本文来自 轻小说文库(http://www.wenku8.com)</li></ul>'
+        f'{body}{illustrations}'
+        '<ul id="contentdp"><li>最新最全的日本动漫轻小说 轻小说文库(http://www.wenku8.com) 为你一网打尽！</li></ul>'
+        '<script>document.write("adv");</script></div>'
+        '<div id="footlink"><a href="84404.htm">上一页</a><a href="index.htm">返回目录</a>'
+        '<a href="84406.htm">下一页</a></div></body></html>'
+    )
+
+
+def measure(func, html, runs):
+    func(html, PAGE_URL)  # 预热
+    start = time.perf_counter()
+    for _ in range(runs):
+        func(html, PAGE_URL)
+    per_call = (time.perf_counter() - start) / runs
+
+    tracemalloc.start()
+    func(html, PAGE_URL)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return per_call, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--paragraphs', type=int, default=400, help='每章段落数')
+    parser.add_argument('--images', type=int, default=0, help='每章插图数')
+    parser.add_argument('--runs', type=int, default=50)
+    args = parser.parse_args()
+
+    html = sample_page(args.paragraphs, args.images)
+    legacy_result = legacy_extract_chapter_content(html, PAGE_URL)
+    new_result = extract_chapter_content(html, PAGE_URL)
+    if legacy_result != new_result:
+        print("警告: 两种提取路径的输出不一致")
+
+    print(f"页面大小 {len(html.encode('gbk')) / 1024:.0f} KB，{args.paragraphs} 段，{args.images} 张插图，{args.runs} 次")
+    print(f"{'path':<22}{'ms/chapter':>12}{'peak KB':>12}")
+    for name, func in (('html.parser (legacy)', legacy_extract_chapter_content),
+                       ('lxml single parse', extract_chapter_content)):
+        per_call, peak = measure(func, html, args.runs)
+        print(f"{name:<22}{per_call * 1000:>12.2f}{peak / 1024:>12.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+对比逐页请求章节列表 (每个分组从 offset=0 开始，等上一页返回后再请求下一页) 与
+manga.chapter_list (两轮并行请求所有分组的所有分页) 加载一部长篇漫画完整章节列表的耗时。
+
+请求发往本地替身接口，每个请求额外等待 --latency 秒。
+
+用法:
+    python benchmarks/bench_manga_chapter_list.py --chapters 1000 --volumes 60 --latency 0.15
+"""
+
+import argparse
+import http.server
+import json
+import os
+import socketserver
+import sys
+import threading
+import time
+from urllib.parse import urlsplit, parse_qs
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from manga import api_cache, chapter_list, http_client
+
+
+class StandinApi:
+    """替身接口: /comic2/<path_word> 和 /comic/<path_word>/group/<group>/chapters"""
+
+    def __init__(self, groups, latency=0.15):
+        self.groups = groups  # {分组: 章节数}
+        self.latency = latency
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._server = None
+
+    @property
+    def api_root(self):
+        return f"http://127.0.0.1:{self._server.server_address[1]}/api/v3"
+
+    def results(self, path, query):
+        parts = path.strip('/').split('/')[2:]  # 去掉 api/v3
+        if parts[0] == 'comic2':
+            return {"groups": {group: {"path_word": group, "name": group, "count": count}
+                               for group, count in self.groups.items()}}
+        group = parts[3]
+        total = self.groups[group]
+        offset, limit = int(query['offset'][0]), int(query['limit'][0])
+        chapters = [{"uuid": f"{group}-{i}", "name": f"{group} {i + 1}"} for i in range(offset, min(total, offset + limit))]
+        return {"list": chapters, "total": total, "limit": limit, "offset": offset}
+
+    def start(self):
+        api = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                time.sleep(api.latency)
+                with api._lock:
+                    api.requests += 1
+                url = urlsplit(self.path)
+                body = json.dumps({"code": 200, "results": api.results(url.path, parse_qs(url.query))}).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        class Server(socketserver.ThreadingMixIn, http.server.HTTPServer):
+            daemon_threads = True
+
+        self._server = Server(('127.0.0.1', 0), Handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def sequential(api_root, path_word, groups):
+    """每个分组逐页请求，直到取满 total"""
+    chapters = []
+    for group in groups:
+        offset = 0
+        while True:
+            results = api_cache.http_get_json(f"{api_root}/comic/{path_word}/group/{group}/chapters",
+                                              {"limit": chapter_list.CHAPTER_PAGE_LIMIT, "offset": offset,
+                                               "platform": 3})
+            chapters.extend(results["list"])
+            offset += chapter_list.CHAPTER_PAGE_LIMIT
+            if offset >= results["total"]:
+                break
+    return chapters
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--chapters', type=int, default=1000, help='默认分组的章节数')
+    parser.add_argument('--volumes', type=int, default=60, help='单行本分组的卷数')
+    parser.add_argument('--extras', type=int, default=12, help='番外分组的章节数')
+    parser.add_argument('--latency', type=float, default=0.15, help='每个请求的接口延迟 (秒)')
+    args = parser.parse_args()
+
+    groups = {'default': args.chapters, 'tankobon': args.volumes, 'other': args.extras}
+    api = StandinApi(groups, latency=args.latency).start()
+    http_client.configure(chapter_list.DEFAULT_MAX_WORKERS)
+    try:
+        results = {}
+        for name, load in (('逐页请求', lambda: sequential(api.api_root, 'bench', groups)),
+                           ('chapter_list', lambda: chapter_list.load_chapters(api.api_root, 'bench'))):
+            api.requests = 0
+            start = time.perf_counter()
+            chapters = load()
+            results[name] = (len(chapters), time.perf_counter() - start, api.requests)
+    finally:
+        api.stop()
+
+    print(f"默认分组 {args.chapters} 话 + 单行本 {args.volumes} 卷 + 番外 {args.extras} 话，"
+          f"接口延迟 {args.latency * 1000:.0f} ms")
+    for name, (count, elapsed, requests) in results.items():
+        print(f"  {name:<12} {count:5d} 章  {requests:3d} 个请求  耗时 {elapsed:6.2f} 秒")
+    baseline, parallel = results['逐页请求'], results['chapter_list']
+    print(f"加载时间为原来的 {parallel[1] / baseline[1]:.2f} 倍")
+
+
+if __name__ == '__main__':
+    main()
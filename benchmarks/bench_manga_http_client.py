@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+对比漫画页面下载时每次 requests.get (每页新建连接) 与 manga.http_client (按主机复用
+keep-alive 连接) 的吞吐量 (页/秒) 和建立的连接数。
+
+请求发往本地图片服务器；每个新连接额外等待 --handshake 秒，模拟 TCP+TLS 握手的往返时间，
+每个请求额外等待 --latency 秒。与 DownloadWorker 相同，--chapters 个线程各自按顺序下载一章。
+
+用法:
+    python benchmarks/bench_manga_http_client.py --chapters 3 --pages 40 --handshake 0.06
+"""
+
+import argparse
+import http.server
+import os
+import socketserver
+import struct
+import sys
+import threading
+import time
+import zlib
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from manga.http_client import HttpClient
+
+
+def png_page(size):
+    """PNG 文件头加随机数据，长度为 size；能通过 page_fetcher 的文件头校验"""
+    ihdr = struct.pack('>IIBBBBB', 800, 1200, 8, 2, 0, 0, 0)
+    head = b'\x89PNG\r\n\x1a\n' + struct.pack('>I', len(ihdr)) + b'IHDR' + ihdr + \
+        struct.pack('>I', zlib.crc32(b'IHDR' + ihdr))
+    return head + os.urandom(max(0, size - len(head)))
+
+
+class ImageServer:
+    def __init__(self, page_bytes=200 * 1024, latency=0.01, handshake=0.06):
+        self.page = png_page(page_bytes)
+        self.latency = latency
+        self.handshake = handshake
+        self.connections = 0
+        self._lock = threading.Lock()
+        self._server = None
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def start(self):
+        image_server = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def setup(self):
+                super().setup()
+                with image_server._lock:
+                    image_server.connections += 1
+                time.sleep(image_server.handshake)
+
+            def do_GET(self):
+                time.sleep(image_server.latency)
+                self.send_response(200)
+                self.send_header('Content-Type', 'image/png')
+                self.send_header('Content-Length', str(len(image_server.page)))
+                self.end_headers()
+                self.wfile.write(image_server.page)
+
+            def log_message(self, *args):
+                pass
+
+        class Server(socketserver.ThreadingMixIn, http.server.HTTPServer):
+            daemon_threads = True
+            request_queue_size = 128
+
+        self._server = Server(('127.0.0.1', 0), Handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def run(server, get, chapters, pages):
+    """chapters 个线程各下载 pages 页，返回 (页数, 耗时, 新建连接数)"""
+    connections_before = server.connections
+    errors = []
+
+    def download_chapter(chapter):
+        for page in range(pages):
+            try:
+                r = get(f"{server.base_url}/c{chapter}/{page:03d}.jpg", timeout=20, stream=True)
+                r.raise_for_status()
+                r.content
+            except Exception as e:
+                errors.append(e)
+
+    threads = [threading.Thread(target=download_chapter, args=(chapter,)) for chapter in range(chapters)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    if errors:
+        print(f"  {len(errors)} 个请求失败，例如: {errors[0]}")
+    return chapters * pages - len(errors), elapsed, server.connections - connections_before
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--chapters', type=int, default=3, help='同时下载的章节数 (即 max_concurrent_downloads)')
+    parser.add_argument('--pages', type=int, default=40, help='每章页数')
+    parser.add_argument('--page-kb', type=int, default=200, help='每页图片大小 (KB)')
+    parser.add_argument('--latency', type=float, default=0.01, help='每个请求的服务器延迟 (秒)')
+    parser.add_argument('--handshake', type=float, default=0.06, help='每个新连接的建立耗时 (秒)')
+    args = parser.parse_args()
+
+    server = ImageServer(page_bytes=args.page_kb * 1024, latency=args.latency, handshake=args.handshake).start()
+    try:
+        results = {}
+        results['requests.get'] = run(server, requests.get, args.chapters, args.pages)
+        client = HttpClient(pool_size=args.chapters)
+        results['http_client'] = run(server, client.get, args.chapters, args.pages)
+        client.close()
+    finally:
+        server.stop()
+
+    print(f"{args.chapters} 章 x {args.pages} 页，每页 {args.page_kb} KB，"
+          f"请求延迟 {args.latency * 1000:.0f} ms，建连耗时 {args.handshake * 1000:.0f} ms")
+    for name, (done, elapsed, connections) in results.items():
+        print(f"  {name:<13} {done / elapsed:7.1f} 页/秒  耗时 {elapsed:6.2f} 秒  新建连接 {connections}")
+    baseline = results['requests.get']
+    pooled = results['http_client']
+    print(f"复用连接后吞吐量为原来的 {(pooled[0] / pooled[1]) / (baseline[0] / baseline[1]):.2f} 倍")
+
+
+if __name__ == '__main__':
+    main()
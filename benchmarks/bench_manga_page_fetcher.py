@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+对比漫画章节逐页顺序下载与 manga.page_fetcher (章节内并行、所有章节共用图片请求上限、
+按页码顺序提交) 的吞吐量 (页/秒)。
+
+与 DownloadWorker 相同，--chapters 个线程各下载一章；两种方式都使用 manga.http_client
+复用连接，请求发往本地图片服务器 (见 bench_manga_http_client.ImageServer)。
+
+用法:
+    python benchmarks/bench_manga_page_fetcher.py --chapters 3 --pages 60 --max-images 8
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.bench_manga_http_client import ImageServer
+from manga import http_client, page_fetcher
+
+
+def fetch(url, filename):
+    page_fetcher.fetch_page(url, filename, timeout=20)
+
+
+def sequential(pages):
+    for url, filename in pages:
+        fetch(url, filename)
+
+
+def parallel(pages):
+    page_fetcher.download_pages(pages, fetch)
+
+
+def run(server, download, chapters, pages_per_chapter):
+    """chapters 个线程各下载一章，返回 (页数, 耗时)"""
+    with tempfile.TemporaryDirectory() as work_dir:
+        jobs = []
+        for chapter in range(chapters):
+            chapter_dir = os.path.join(work_dir, f"c{chapter}")
+            os.makedirs(chapter_dir)
+            jobs.append([(f"{server.base_url}/c{chapter}/{page:03d}.jpg", os.path.join(chapter_dir, f"{page:03d}.jpg"))
+                         for page in range(1, pages_per_chapter + 1)])
+        threads = [threading.Thread(target=download, args=(pages,)) for pages in jobs]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        done = sum(len(os.listdir(os.path.join(work_dir, f"c{chapter}"))) for chapter in range(chapters))
+    return done, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--chapters', type=int, default=3, help='同时下载的章节数 (即 max_concurrent_downloads)')
+    parser.add_argument('--pages', type=int, default=60, help='每章页数')
+    parser.add_argument('--page-kb', type=int, default=200, help='每页图片大小 (KB)')
+    parser.add_argument('--latency', type=float, default=0.05, help='每个请求的服务器延迟 (秒)')
+    parser.add_argument('--max-images', type=int, default=8, help='所有章节合计同时下载的图片数')
+    args = parser.parse_args()
+
+    page_fetcher.configure(args.max_images)
+    http_client.configure(max(args.chapters, args.max_images))
+    server = ImageServer(page_bytes=args.page_kb * 1024, latency=args.latency, handshake=0.0).start()
+    try:
+        results = {'逐页顺序': run(server, sequential, args.chapters, args.pages),
+                   'page_fetcher': run(server, parallel, args.chapters, args.pages)}
+    finally:
+        server.stop()
+
+    print(f"{args.chapters} 章 x {args.pages} 页，每页 {args.page_kb} KB，请求延迟 {args.latency * 1000:.0f} ms，"
+          f"图片请求上限 {args.max_images}")
+    for name, (done, elapsed) in results.items():
+        print(f"  {name:<12} {done / elapsed:7.1f} 页/秒  耗时 {elapsed:6.2f} 秒")
+    baseline, pooled = results['逐页顺序'], results['page_fetcher']
+    print(f"页面并行后吞吐量为原来的 {(pooled[0] / pooled[1]) / (baseline[0] / baseline[1]):.2f} 倍")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+镜像选择与故障切换 (novel.hosts) 的本地演示和计时。
+
+启动若干替身服务器作为同一站点的镜像：首选镜像分别为慢速 (--slow-latency)、
+返回 Cloudflare 限流页面、连接后不响应、或根本无法连接，另有一个正常的镜像。
+每种情况对比只使用首选镜像与使用镜像注册表 (先探测一次，请求失败时自动切换) 时
+下载一整本替身小说的耗时和成功章节数。
+
+用法:
+    python benchmarks/bench_mirror_failover.py --slow-latency 0.3 --timeout 3
+"""
+
+import argparse
+import os
+import socket
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.standin_server import StandinWenku8
+from novel.hosts import PAGES, PACKS
+from novel.main import Wenku8Downloader
+from novel.metadata_cache import MetadataCache
+from novel.http_cache import HTTPCache
+from novel.rate_limiter import AdaptiveRateLimiter
+
+
+class OfflineDownloader(Wenku8Downloader):
+    """跳过登录的同步下载器"""
+
+    def ensure_login(self, force=False):
+        return True
+
+
+def unused_url():
+    """一个没有服务器监听的本地地址"""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return f"http://127.0.0.1:{sock.getsockname()[1]}"
+
+
+def download(mirrors, work_dir, timeout, probe):
+    """返回 (成功章节数, 章节总数, 耗时)"""
+    downloader = OfflineDownloader(max_workers=4, mirrors={PAGES: mirrors, PACKS: mirrors[-1:]},
+                                   bulk_volume_mode=False)
+    downloader.rate_limiter = AdaptiveRateLimiter(initial_rate=1000, max_rate=1000, burst=4)
+    downloader.illustration_fetcher.rate_limiter = downloader.rate_limiter
+    downloader.metadata_cache = MetadataCache(cache_dir=os.path.join(work_dir, 'meta'))
+    downloader.http_cache = HTTPCache(cache_dir=os.path.join(work_dir, 'http'))
+    downloader.hosts.probe_timeout = timeout
+    downloader.request_timeout = timeout
+    start = time.perf_counter()
+    if probe:
+        downloader.hosts.probe_all()
+    ok = total = 0
+    try:
+        details = downloader.get_novel_details(1)
+        if details:
+            volumes = downloader.get_chapter_list(details['catalog_url'], novel_id=1)
+            jobs = []
+            for volume in volumes:
+                volume_dir = os.path.join(work_dir, 'out', volume['title'])
+                os.makedirs(volume_dir, exist_ok=True)
+                jobs.extend((chapter, volume_dir) for chapter in Wenku8Downloader._prefixed_chapters(volume))
+            total = len(jobs)
+            ok = sum(downloader._download_chapters_parallel(jobs, 1, max_retries=1, retry_delay=0))
+    except Exception as e:
+        print(f"  下载失败: {e.__class__.__name__}")
+    return ok, total, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--slow-latency', type=float, default=0.3, help='慢速镜像每个请求的延迟 (秒)')
+    parser.add_argument('--latency', type=float, default=0.01, help='正常镜像每个请求的延迟 (秒)')
+    parser.add_argument('--timeout', type=float, default=3.0, help='请求超时 (秒)，不响应的镜像要等满这个时间')
+    parser.add_argument('--volumes', type=int, default=2)
+    parser.add_argument('--chapters', type=int, default=10, help='每卷章节数')
+    args = parser.parse_args()
+
+    size = dict(volumes=args.volumes, chapters_per_volume=args.chapters)
+    fast = StandinWenku8(latency=args.latency, **size).start()
+    primaries = {
+        '慢速': StandinWenku8(latency=args.slow_latency, **size).start(),
+        '被限流': StandinWenku8(latency=args.latency, failure='blocked', **size).start(),
+        '不响应': StandinWenku8(latency=0, failure='hang', **size).start(),
+    }
+    rows = []
+    try:
+        cases = [(name, server.base_url) for name, server in primaries.items()] + [('无法连接', unused_url())]
+        for name, primary in cases:
+            for label, mirrors, probe in (('仅首选镜像', [primary], False),
+                                          ('镜像注册表', [primary, fast.base_url], True)):
+                with tempfile.TemporaryDirectory() as work_dir:
+                    rows.append((name, label) + download(mirrors, work_dir, args.timeout, probe))
+    finally:
+        fast.stop()
+        for server in primaries.values():
+            server.stop()
+
+    print(f"正常镜像延迟 {args.latency * 1000:.0f} ms，慢速镜像延迟 {args.slow_latency * 1000:.0f} ms")
+    print(f"{'首选镜像':<8}{'方式':<10}{'成功章节':>10}{'耗时(秒)':>10}")
+    for name, label, ok, total, elapsed in rows:
+        print(f"{name:<8}{label:<10}{f'{ok}/{total}':>10}{elapsed:>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
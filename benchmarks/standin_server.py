@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+本地轻小说文库替身服务器，用于基准测试和手动调试，不访问真实站点。
+
+提供的页面:
+    /book/<id>.htm                 小说详情页
+    /novel/0/<id>/index.htm        目录页 (若干卷 + 一个插图卷)
+    /novel/0/<id>/<cid>.htm        章节页
+    /pic/<name>.jpg                插图
+每个请求都会额外等待 latency 秒，以模拟网络往返时间。
+failure 模拟不可用的镜像: 'blocked' 对所有请求返回 Cloudflare 1015 限流页面，
+'hang' 接受连接后不再响应。
+"""
+
+import http.server
+import re
+import socketserver
+import threading
+import time
+from collections import Counter
+
+
+class StandinWenku8:
+    def __init__(self, volumes=4, chapters_per_volume=25, images_per_illustration=4, latency=0.05, failure=None):
+        self.volumes = volumes
+        self.chapters_per_volume = chapters_per_volume
+        self.images_per_illustration = images_per_illustration
+        self.latency = latency
+        self.failure = failure
+        self.hits = Counter()
+        self._server = None
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def start(self):
+        standin = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                standin.hits[self.path] += 1
+                time.sleep(standin.latency)
+                if standin.failure == 'hang':
+                    time.sleep(3600)
+                    return
+                headers = {}
+                if standin.failure == 'blocked':
+                    status, content_type = 503, 'text/html'
+                    body = b'<html><title>Access denied | error 1015</title>You are being rate limited</html>'
+                    headers = {'Server': 'cloudflare', 'CF-RAY': '0000000000000000-HKG'}
+                else:
+                    status, body, content_type = standin.render(self.path)
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        class Server(socketserver.ThreadingMixIn, http.server.HTTPServer):
+            daemon_threads = True
+
+        self._server = Server(('127.0.0.1', 0), Handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def chapter_count(self):
+        return self.volumes * self.chapters_per_volume + 1
+
+    def render(self, path):
+        html_type = 'text/html; charset=gbk'
+        book = re.match(r'/book/(\d+)\.htm$', path)
+        if book:
+            novel_id = book.group(1)
+            html = (f'<html><head><title>替身小说{novel_id} - 轻小说文库</title></head><body>'
+                    f'<div id="title"><h1>替身小说{novel_id}</h1></div>'
+                    f'<a href="/novel/0/{novel_id}/index.htm">小说目录</a></body></html>')
+            return 200, html.encode('gbk'), html_type
+        if re.match(r'/novel/\d+/\d+/index\.htm$', path):
+            return 200, self._catalog().encode('gbk'), html_type
+        chapter = re.match(r'/novel/\d+/\d+/(\d+)\.htm$', path)
+        if chapter:
+            return 200, self._chapter(int(chapter.group(1))).encode('gbk'), html_type
+        if path.startswith('/pic/'):
+            return 200, b'\xff\xd8\xff\xe0' + b'\0' * 20000, 'image/jpeg'
+        return 404, b'not found', 'text/plain'
+
+    def _catalog(self):
+        rows = []
+        for v in range(self.volumes):
+            rows.append(f'<tr><td class="vcss" colspan="4">第{v + 1}卷</td></tr>')
+            for c in range(self.chapters_per_volume):
+                cid = 1000 * (v + 1) + c + 1
+                rows.append(f'<tr><td class="ccss"><a href="{cid}.htm">第{c + 1}章 标题{cid}</a></td></tr>')
+        rows.append('<tr><td class="vcss" colspan="4">插图</td></tr>'
+                    '<tr><td class="ccss"><a href="99999.htm">插图</a></td></tr>')
+        return '<html><body><table class="css">' + ''.join(rows) + '</table></body></html>'
+
+    def _chapter(self, cid):
+        if cid == 99999:
+            images = ''.join(f'<div class="divimage"><img class="imagecontent" src="/pic/{i}.jpg"></div>'
+                             for i in range(self.images_per_illustration))
+            return f'<html><body><div id="content">{images}</div></body></html>'
+        paragraphs = '<br/>'.join(f'&nbsp;&nbsp;&nbsp;&nbsp;这是第{cid}章的第{i}段正文。' * 4 for i in range(80))
+        return (f'<html><body><div id="title">章节{cid}</div><div id="content">'
+                f'<ul id="contentdp"><li>本文来自 轻小说文库(http://www.wenku8.com)</li></ul>'
+                f'{paragraphs}</div></body></html>')
+
+
+if __name__ == '__main__':
+    with StandinWenku8() as server:
+        print(f"替身服务器已启动: {server.base_url} (Ctrl+C 退出)")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+漫画和小说下载器共用的异步日志。
+
+各模块使用 logging.getLogger(__name__) 记录日志；根 logger 上只挂一个入队处理器，
+工作线程只把记录放进无界队列 (不加锁、不等待输出)，由单独的后台线程成批取出，
+每批对控制台、滚动日志文件和界面各写一次。
+
+    import log_pipeline
+    log_pipeline.setup_logging()                       # 程序启动时调用一次
+    log_pipeline.set_levels("novel.image_fetcher=WARNING, manga=DEBUG")
+    log_pipeline.add_handler(log_pipeline.CallbackHandler(signal.emit), name_filter='novel.novel_gui')
+"""
+
+import atexit
+import logging
+import os
+import queue
+import sys
+import threading
+from logging.handlers import RotatingFileHandler
+
+from utils import get_app_base_dir
+
+DEFAULT_LEVELS = {'novel': logging.INFO, 'manga': logging.INFO}
+LOG_FILE_MAX_BYTES = 5 * 1024 * 1024
+LOG_FILE_BACKUPS = 3
+MAX_BATCH = 500  # 每批最多处理的记录数
+
+_STOP = object()
+
+
+class EnqueueHandler(logging.Handler):
+    """把日志记录放入队列；不获取处理器锁，记录在后台线程中才格式化"""
+
+    def __init__(self, record_queue):
+        super().__init__()
+        self.queue = record_queue
+
+    def handle(self, record):
+        if self.filter(record):
+            self.queue.put_nowait(record)
+        return True
+
+    def emit(self, record):
+        self.queue.put_nowait(record)
+
+
+class BatchStreamHandler(logging.StreamHandler):
+    """控制台输出，每批记录只写入并刷新一次；stream 为 None 时使用当前的 sys.stdout"""
+
+    def __init__(self, stream=None):
+        super().__init__(stream)
+        self._use_stdout = stream is None
+
+    def emit_batch(self, records):
+        if not records:
+            return
+        stream = sys.stdout if self._use_stdout else self.stream
+        try:
+            stream.write(''.join(self.format(record) + self.terminator for record in records))
+            stream.flush()
+        except Exception:
+            self.handleError(records[-1])
+
+
+class BatchRotatingFileHandler(RotatingFileHandler):
+    """滚动日志文件，每批记录只刷新一次"""
+
+    def emit_batch(self, records):
+        if not records:
+            return
+        try:
+            for record in records:
+                if self.shouldRollover(record):
+                    self.doRollover()
+                if self.stream is None:
+                    self.stream = self._open()
+                self.stream.write(self.format(record) + self.terminator)
+            self.stream.flush()
+        except Exception:
+            self.handleError(records[-1])
+
+
+class CallbackHandler(logging.Handler):
+    """
+    把每批格式化后的文字行交给 callback(lines)，用于界面日志。
+    callback 在日志线程中调用，界面应传入 pyqtSignal 的 emit 以回到界面线程。
+    """
+
+    def __init__(self, callback, level=logging.INFO):
+        super().__init__(level)
+        self.callback = callback
+        self.setFormatter(logging.Formatter('[%(asctime)s] %(message)s', '%H:%M:%S'))
+
+    def emit_batch(self, records):
+        if records:
+            try:
+                self.callback([self.format(record) for record in records])
+            except Exception:
+                self.handleError(records[-1])
+
+    def emit(self, record):
+        self.emit_batch([record])
+
+
+class LogPipeline:
+    """日志队列和唯一的输出线程"""
+
+    def __init__(self, max_batch=MAX_BATCH):
+        self.queue = queue.SimpleQueue()
+        self.max_batch = max_batch
+        self._handlers = ()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def add_handler(self, handler):
+        with self._lock:
+            self._handlers = self._handlers + (handler,)
+
+    def remove_handler(self, handler):
+        with self._lock:
+            self._handlers = tuple(h for h in self._handlers if h is not handler)
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='log-pipeline', daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        """输出队列中剩余的记录后结束后台线程"""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self.queue.put(_STOP)
+            thread.join(timeout=5)
+
+    def _run(self):
+        while True:
+            batch = [self.queue.get()]
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            stopping = any(record is _STOP for record in batch)
+            self._dispatch([record for record in batch if record is not _STOP])
+            if stopping:
+                return
+
+    def _dispatch(self, records):
+        for handler in self._handlers:
+            accepted = [record for record in records
+                        if record.levelno >= handler.level and handler.filter(record)]
+            if not accepted:
+                continue
+            if hasattr(handler, 'emit_batch'):
+                handler.emit_batch(accepted)
+            else:
+                for record in accepted:
+                    handler.handle(record)
+
+
+_pipeline = None
+_setup_lock = threading.Lock()
+_overrides = set()  # set_levels 单独设置过级别的模块
+
+
+def setup_logging(levels=None, console=True, log_file=True):
+    """
+    启用异步日志 (可重复调用，只初始化一次)。
+    levels: 各模块的日志级别，见 set_levels；log_file 为 True 时写入 <应用目录>/logs/downloader.log
+    """
+    global _pipeline
+    with _setup_lock:
+        if _pipeline is None:
+            _pipeline = LogPipeline()
+            if console:
+                console_handler = BatchStreamHandler()
+                console_handler.setFormatter(logging.Formatter('%(message)s'))
+                _pipeline.add_handler(console_handler)
+            if log_file:
+                try:
+                    log_dir = os.path.join(get_app_base_dir(), 'logs')
+                    os.makedirs(log_dir, exist_ok=True)
+                    file_handler = BatchRotatingFileHandler(
+                        os.path.join(log_dir, 'downloader.log'), maxBytes=LOG_FILE_MAX_BYTES,
+                        backupCount=LOG_FILE_BACKUPS, encoding='utf-8', delay=True
+                    )
+                    file_handler.setFormatter(logging.Formatter(
+                        '%(asctime)s %(levelname)s %(name)s [%(threadName)s] %(message)s'
+                    ))
+                    _pipeline.add_handler(file_handler)
+                except OSError as e:
+                    sys.stderr.write(f"无法创建日志文件: {e}\n")
+            root = logging.getLogger()
+            root.addHandler(EnqueueHandler(_pipeline.queue))
+            if root.level == logging.NOTSET or root.level > logging.WARNING:
+                root.setLevel(logging.WARNING)
+            for name, level in DEFAULT_LEVELS.items():
+                logging.getLogger(name).setLevel(level)
+            _pipeline.start()
+            atexit.register(_pipeline.stop)
+    if levels is not None:
+        set_levels(levels)
+    return _pipeline
+
+
+def parse_levels(text):
+    """把 "novel=INFO, novel.image_fetcher=WARNING" 解析为 {模块名: 级别}；无效的项被忽略"""
+    levels = {}
+    for item in (text or '').replace(';', ',').split(','):
+        name, sep, level = item.partition('=')
+        name, level = name.strip(), level.strip().upper()
+        if sep and name and isinstance(logging.getLevelName(level), int):
+            levels[name] = logging.getLevelName(level)
+    return levels
+
+
+def set_levels(levels):
+    """
+    设置各模块的日志级别，取代上一次的设置 (之前单独设置过、这次没有的模块恢复默认)。
+    levels 为字典或 parse_levels 接受的文字
+    """
+    global _overrides
+    if isinstance(levels, str):
+        levels = parse_levels(levels)
+    levels = dict(levels or {})
+    for name in _overrides - set(levels):
+        logging.getLogger(name).setLevel(DEFAULT_LEVELS.get(name, logging.NOTSET))
+    for name, level in levels.items():
+        logging.getLogger(name).setLevel(level)
+    _overrides = set(levels)
+
+
+def add_handler(handler, name_filter=None):
+    """增加一个输出目标 (如界面日志)；name_filter 只接收该模块及其子模块的日志"""
+    if name_filter:
+        handler.addFilter(logging.Filter(name_filter))
+    setup_logging().add_handler(handler)
+    return handler
+
+
+def remove_handler(handler):
+    if _pipeline is not None:
+        _pipeline.remove_handler(handler)
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+拷贝漫画 API 响应缓存。
+
+搜索、漫画详情、章节列表和章节内容接口的 results 以 JSON 保存在 SQLite 数据库中，重启后仍然有效，
+再次浏览同一部漫画或重新加入下载队列时不再请求接口 (不占用接口的请求频率限制)。
+缓存键由接口地址、查询参数和会影响返回内容的请求头 (webp、海外 CDN 等) 组成；
+有效期按接口分别设置 (章节内容基本不变，可以缓存较久；搜索结果和章节列表会更新，只缓存较短时间)，
+总大小超过上限时淘汰最久未使用的响应。
+
+    from manga import api_cache
+    results = api_cache.get_cache().get_json(url, params, headers=..., proxies=...)
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import time
+from collections import OrderedDict
+from threading import Lock
+from urllib.parse import urlsplit
+
+from manga import http_client
+from utils import get_app_base_dir
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TIMEOUT = 15
+DEFAULT_MAX_BYTES = 50 * 1024 * 1024  # 缓存数据库中响应的总大小上限
+MEMORY_ENTRIES = 64  # 内存中保留的最近使用的响应数
+
+SEARCH = 'search'
+COMIC = 'comic'
+CHAPTERS = 'chapters'
+CHAPTER = 'chapter'
+
+DEFAULT_TTLS = {  # 秒，0 表示不缓存
+    SEARCH: 10 * 60,
+    COMIC: 60 * 60,
+    CHAPTERS: 30 * 60,
+    CHAPTER: 7 * 24 * 60 * 60,
+}
+
+# 接口路径 (去掉 /api/v3 前缀) -> 类别
+_ENDPOINTS = [
+    (re.compile(r'^/search/comic$'), SEARCH),
+    (re.compile(r'^/comic2/[^/]+$'), COMIC),
+    (re.compile(r'^/comic/[^/]+/group/[^/]+/chapters$'), CHAPTERS),
+    (re.compile(r'^/comic/[^/]+/chapter2?/[^/]+$'), CHAPTER),
+]
+# 会改变返回内容的请求头
+VARY_HEADERS = ('use_webp', 'use_oversea_cdn', 'webp', 'region', 'platform')
+
+
+class ApiError(Exception):
+    """接口返回了非 200 的 code"""
+
+
+def api_root(api_url_base):
+    """接口地址前缀，如 https://api.mangacopy.com/api/v3"""
+    return f"https://api.{api_url_base}/api/v3"
+
+
+def http_get_json(url, params=None, headers=None, proxies=None, timeout=DEFAULT_TIMEOUT):
+    """请求接口并返回 results，code 不是 200 时抛出 ApiError"""
+    r = http_client.get(url, params=params, headers=headers, proxies=proxies, timeout=timeout)
+    r.raise_for_status()
+    data = r.json()
+    if data.get("code") != 200 or "results" not in data:
+        raise ApiError(data.get("message", "Unknown error"))
+    return data["results"]
+
+
+def endpoint_of(url):
+    """url 对应的接口类别，不是可缓存的接口时返回 None"""
+    path = urlsplit(url).path
+    path = path[len('/api/v3'):] if path.startswith('/api/v3') else path
+    for pattern, endpoint in _ENDPOINTS:
+        if pattern.match(path):
+            return endpoint
+    return None
+
+
+def cache_key(url, params=None, headers=None):
+    vary = {name: (headers or {}).get(name) for name in VARY_HEADERS}
+    text = json.dumps([url, sorted((params or {}).items()), vary], ensure_ascii=False, default=str)
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+class ApiCache:
+    """按接口设置有效期、按总大小淘汰的 API 响应缓存，可在多个线程中共用"""
+
+    def __init__(self, db_path=None, max_bytes=DEFAULT_MAX_BYTES, ttls=None, enabled=True):
+        self.db_path = db_path or os.path.join(get_app_base_dir(), 'manga_cache', 'api_cache.sqlite3')
+        self.max_bytes = max_bytes
+        self.ttls = dict(DEFAULT_TTLS, **(ttls or {}))
+        self.enabled = enabled
+        self._lock = Lock()
+        self._memory = OrderedDict()  # key -> (results, timestamp, endpoint)
+        self._counts = {}  # endpoint -> [命中次数, 未命中次数]
+        self._db = None
+        try:
+            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+            self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS responses ('
+                'key TEXT PRIMARY KEY, endpoint TEXT NOT NULL, value TEXT NOT NULL, size INTEGER NOT NULL, '
+                'timestamp REAL NOT NULL, last_used REAL NOT NULL)'
+            )
+            self._db.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"打开 API 缓存数据库失败，仅在内存中缓存 {self.db_path}: {e}")
+            self._db = None
+
+    def _db_execute(self, sql, params=()):
+        """执行一条语句并提交，调用方需持有锁"""
+        if self._db is None:
+            return None
+        try:
+            cursor = self._db.execute(sql, params)
+            self._db.commit()
+            return cursor
+        except sqlite3.Error as e:
+            logger.warning(f"API 缓存数据库操作失败: {e}")
+            return None
+
+    def _expired(self, endpoint, timestamp):
+        return time.time() - timestamp > self.ttls.get(endpoint, 0)
+
+    def _remember(self, key, results, timestamp, endpoint):
+        """放入内存缓存，调用方需持有锁"""
+        self._memory[key] = (results, timestamp, endpoint)
+        self._memory.move_to_end(key)
+        while len(self._memory) > MEMORY_ENTRIES:
+            self._memory.popitem(last=False)
+
+    def _count(self, endpoint, hit):
+        """调用方需持有锁"""
+        self._counts.setdefault(endpoint, [0, 0])[0 if hit else 1] += 1
+
+    def get(self, endpoint, key):
+        """获取缓存的 results，不存在或已过期时返回 None"""
+        with self._lock:
+            record = self._memory.get(key)
+            if record is None:
+                cursor = self._db_execute('SELECT value, timestamp FROM responses WHERE key = ?', (key,))
+                row = cursor.fetchone() if cursor else None
+                if row:
+                    try:
+                        record = (json.loads(row[0]), row[1], endpoint)
+                    except ValueError:
+                        record = None
+            if record is None or self._expired(endpoint, record[1]):
+                if record is not None:
+                    self._memory.pop(key, None)
+                    self._db_execute('DELETE FROM responses WHERE key = ?', (key,))
+                self._count(endpoint, hit=False)
+                return None
+            self._remember(key, *record)
+            self._db_execute('UPDATE responses SET last_used = ? WHERE key = ?', (time.time(), key))
+            self._count(endpoint, hit=True)
+            return record[0]
+
+    def set(self, endpoint, key, results):
+        """保存 results，总大小超出上限时淘汰最久未使用的响应"""
+        now = time.time()
+        value = json.dumps(results, ensure_ascii=False)
+        with self._lock:
+            self._remember(key, results, now, endpoint)
+            self._db_execute(
+                'INSERT OR REPLACE INTO responses (key, endpoint, value, size, timestamp, last_used) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (key, endpoint, value, len(value), now, now)
+            )
+            self._evict()
+
+    def _evict(self):
+        """删除已过期的响应，再按最久未使用淘汰到总大小不超过上限，调用方需持有锁"""
+        for endpoint, ttl in self.ttls.items():
+            self._db_execute('DELETE FROM responses WHERE endpoint = ? AND timestamp < ?',
+                             (endpoint, time.time() - ttl))
+        cursor = self._db_execute('SELECT COALESCE(SUM(size), 0) FROM responses')
+        total = cursor.fetchone()[0] if cursor else 0
+        if total <= self.max_bytes:
+            return
+        cursor = self._db_execute('SELECT key, size FROM responses ORDER BY last_used')
+        evicted = []
+        for key, size in (cursor.fetchall() if cursor else []):
+            if total <= self.max_bytes:
+                break
+            evicted.append((key,))
+            total -= size
+            self._memory.pop(key, None)
+        if self._db is not None and evicted:
+            try:
+                self._db.executemany('DELETE FROM responses WHERE key = ?', evicted)
+                self._db.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"API 缓存数据库操作失败: {e}")
+
+    def get_json(self, url, params=None, headers=None, proxies=None, timeout=DEFAULT_TIMEOUT):
+        """
+        与 http_get_json 相同，可缓存的接口先查缓存；未命中时请求接口并保存成功的响应。
+        缓存已关闭、接口不可缓存或其有效期为 0 时直接请求
+        """
+        endpoint = endpoint_of(url)
+        if not self.enabled or endpoint is None or not self.ttls.get(endpoint):
+            return http_get_json(url, params, headers=headers, proxies=proxies, timeout=timeout)
+        key = cache_key(url, params, headers)
+        results = self.get(endpoint, key)
+        if results is None:
+            results = http_get_json(url, params, headers=headers, proxies=proxies, timeout=timeout)
+            self.set(endpoint, key, results)
+        return results
+
+    def invalidate(self, url, params=None, headers=None):
+        """删除一个请求的缓存响应"""
+        key = cache_key(url, params, headers)
+        with self._lock:
+            self._memory.pop(key, None)
+            self._db_execute('DELETE FROM responses WHERE key = ?', (key,))
+
+    def clear(self):
+        """清空全部 API 缓存"""
+        with self._lock:
+            self._memory.clear()
+            self._db_execute('DELETE FROM responses')
+
+    def stats(self):
+        """返回缓存统计: 总的及各接口的命中次数、未命中次数和命中率，以及缓存的响应数和总字节数"""
+        def summary(hits, misses):
+            total = hits + misses
+            return {'hits': hits, 'misses': misses, 'hit_rate': hits / total if total else 0.0}
+
+        with self._lock:
+            cursor = self._db_execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses')
+            entries, size = cursor.fetchone() if cursor else (len(self._memory), 0)
+            counts = {endpoint: list(c) for endpoint, c in self._counts.items()}
+        result = summary(sum(c[0] for c in counts.values()), sum(c[1] for c in counts.values()))
+        result.update({
+            'entries': entries,
+            'bytes': size,
+            'endpoints': {endpoint: summary(*c) for endpoint, c in counts.items()},
+        })
+        return result
+
+
+_cache = None
+_cache_lock = Lock()
+
+
+def get_cache():
+    """进程内共用的 API 缓存 (第一次使用时打开)"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ApiCache()
+        return _cache
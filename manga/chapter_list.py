@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+漫画章节列表的并行加载。
+
+章节列表接口每次最多返回 CHAPTER_PAGE_LIMIT 章，并且按分组 (默认的连载话、单行本、番外等) 分开。
+先同时请求漫画详情 (含各分组及章节数) 和默认分组的第一页，再同时请求其余所有分页和分组，
+最后按分组、偏移量顺序合并。章节再多也只需两轮请求的时间，而不是逐页等待。
+
+    from manga import chapter_list
+    chapters = chapter_list.load_chapters(api_root, path_word, headers=..., proxies=...)
+"""
+
+import concurrent.futures
+import logging
+
+from manga.api_cache import http_get_json
+
+DEFAULT_GROUP = 'default'
+CHAPTER_PAGE_LIMIT = 500
+DEFAULT_MAX_WORKERS = 4
+
+logger = logging.getLogger(__name__)
+
+
+class ChapterListLoader:
+    """
+    加载一部漫画所有分组的完整章节列表。
+    get_json(url, params): 返回接口的 results，默认直接请求 (见 api_cache.http_get_json)
+    """
+
+    def __init__(self, api_root, headers=None, proxies=None, get_json=None, max_workers=DEFAULT_MAX_WORKERS,
+                 page_limit=CHAPTER_PAGE_LIMIT):
+        self.api_root = api_root
+        self.page_limit = page_limit
+        self.max_workers = max(1, int(max_workers))
+        self._get_json = get_json or (lambda url, params: http_get_json(url, params, headers=headers, proxies=proxies))
+
+    def _groups(self, path_word):
+        """[(分组 path_word, 分组名, 章节数或 None)]，默认分组在前"""
+        results = self._get_json(f"{self.api_root}/comic2/{path_word}", {"platform": 3})
+        groups = []
+        for key, group in (results.get("groups") or {}).items():
+            groups.append((group.get("path_word") or key, group.get("name") or key, group.get("count")))
+        groups.sort(key=lambda g: g[0] != DEFAULT_GROUP)
+        return groups
+
+    def _page(self, path_word, group, offset):
+        results = self._get_json(f"{self.api_root}/comic/{path_word}/group/{group}/chapters",
+                                 {"limit": self.page_limit, "offset": offset, "platform": 3})
+        return results.get("list") or [], results.get("total")
+
+    def _offsets(self, total):
+        return range(self.page_limit, total or 0, self.page_limit)
+
+    def load(self, path_word):
+        """返回按分组、章节顺序排列的章节列表；默认分组以外的章节带有 group_name 字段"""
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers,
+                                                   thread_name_prefix='manga-chapters') as executor:
+            # 第一轮: 分组信息和默认分组的第一页
+            groups_future = executor.submit(self._groups, path_word)
+            first_future = executor.submit(self._page, path_word, DEFAULT_GROUP, 0)
+            first_pages = {DEFAULT_GROUP: first_future}
+            try:
+                groups = groups_future.result()
+            except Exception as e:
+                logger.warning(f"获取漫画分组失败，只加载默认分组: {e}")
+                groups = []
+            if not any(group == DEFAULT_GROUP for group, _, _ in groups):
+                groups.insert(0, (DEFAULT_GROUP, DEFAULT_GROUP, None))
+
+            # 第二轮: 按详情中的章节数请求各分组的全部分页；没有章节数 (或章节数已过时) 的分组
+            # 等第一页返回总数后再补上剩余的分页
+            pages = {}  # 分组 -> {偏移量: future}
+            for group, _, count in groups:
+                if group not in first_pages:
+                    first_pages[group] = executor.submit(self._page, path_word, group, 0)
+                pages[group] = {0: first_pages[group]}
+                for offset in self._offsets(count):
+                    pages[group][offset] = executor.submit(self._page, path_word, group, offset)
+            for group, _, _ in groups:
+                try:
+                    _, total = first_pages[group].result()
+                except Exception:
+                    continue  # 在下面合并时处理
+                for offset in self._offsets(total):
+                    if offset not in pages[group]:
+                        pages[group][offset] = executor.submit(self._page, path_word, group, offset)
+
+            chapters, seen = [], set()
+            for group, name, _ in groups:
+                try:
+                    group_chapters = [c for offset in sorted(pages[group]) for c in pages[group][offset].result()[0]]
+                except Exception as e:
+                    if group == DEFAULT_GROUP:
+                        raise
+                    logger.warning(f"获取分组 {name} 的章节失败，已跳过该分组: {e}")
+                    continue
+                for chapter in group_chapters:
+                    uuid = chapter.get("uuid")
+                    if uuid is not None and uuid in seen:  # 请求期间章节列表有变化时，相邻分页可能重复
+                        continue
+                    seen.add(uuid)
+                    if group != DEFAULT_GROUP:
+                        chapter = dict(chapter, group_name=name)
+                    chapters.append(chapter)
+        return chapters
+
+
+def load_chapters(api_root, path_word, headers=None, proxies=None, get_json=None):
+    return ChapterListLoader(api_root, headers=headers, proxies=proxies, get_json=get_json).load(path_word)
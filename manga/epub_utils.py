@@ -2,14 +2,12 @@ import os
 import sys
 import zipfile
 import shutil
-from PIL import Image, ImageFile
+from PIL import Image
 import re
 import datetime
 import collections
 import uuid
 
-ImageFile.LOAD_TRUNCATED_IMAGES = True
-
 # --- Helper Functions (adapted from jpg2epub.py) ---
 
 def create_directory(path):
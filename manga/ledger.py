@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+漫画下载台账：跨会话记录已完成的页面和章节。
+
+按 (章节 uuid, 页码) 记录每页的文件名、大小、修改时间和 sha256，章节全部页面下载成功后记录为已完成。
+重新下载 (再次运行、暂停后继续、重新加入整部漫画) 时:
+  - 已完成且文件都在的章节直接跳过，不再请求章节内容 API；
+  - 其余章节只下载缺失或损坏的页面。
+检查页面时先比较大小和修改时间 (只需 stat)，修改时间变化而大小不变时才重新计算 sha256。
+
+    from manga import ledger
+    book = ledger.get_ledger()
+    if book.chapter_complete(chapter_uuid, chapter_dir): ...
+"""
+
+import hashlib
+import logging
+import os
+import sqlite3
+import time
+from threading import Lock
+
+from utils import get_app_base_dir
+
+logger = logging.getLogger(__name__)
+
+HASH_CHUNK_SIZE = 256 * 1024
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS chapters (
+    chapter_uuid TEXT PRIMARY KEY,
+    manga_path_word TEXT,
+    name TEXT,
+    total_pages INTEGER,
+    completed_at REAL
+);
+CREATE TABLE IF NOT EXISTS pages (
+    chapter_uuid TEXT NOT NULL,
+    page_index INTEGER NOT NULL,
+    file TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    sha256 TEXT NOT NULL,
+    PRIMARY KEY (chapter_uuid, page_index)
+);
+"""
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class DownloadLedger:
+    """SQLite 保存的下载台账，可在多个线程中共用"""
+
+    def __init__(self, path=None):
+        self.path = path or os.path.join(get_app_base_dir(), 'manga_cache', 'download_ledger.sqlite3')
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._lock = Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        with self._lock:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('PRAGMA synchronous=NORMAL')
+            self._conn.executescript(_SCHEMA)
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _execute(self, *statements):
+        """
+        在一个事务中执行若干 (sql, 参数)，返回最后一条语句的结果行。
+        数据库出错时只记录警告并返回空列表 (台账不可用时退化为重新检查或下载页面，不影响下载)
+        """
+        with self._lock:
+            try:
+                rows = []
+                for sql, params in statements:
+                    rows = self._conn.execute(sql, params).fetchall()
+                self._conn.commit()
+                return rows
+            except sqlite3.Error as e:
+                self._conn.rollback()
+                logger.warning(f"下载台账读写失败 {self.path}: {e}")
+                return []
+
+    def _page_rows(self, chapter_uuid):
+        rows = self._execute(('SELECT page_index, file, size, mtime, sha256 FROM pages WHERE chapter_uuid = ?',
+                              (chapter_uuid,)))
+        return {row[0]: row[1:] for row in rows}
+
+    def _file_matches(self, chapter_uuid, index, path, row):
+        """文件与台账记录一致：大小相同，且修改时间相同或内容的 sha256 相同"""
+        file, size, mtime, sha256 = row
+        if file != os.path.basename(path):
+            return False
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return False
+        if stat.st_size != size:
+            return False
+        if stat.st_mtime == mtime:
+            return True
+        try:
+            if file_sha256(path) != sha256:
+                return False
+        except OSError:
+            return False
+        # 内容未变，只是修改时间变了 (如复制过目录)，更新记录免得下次再算
+        self._execute(('UPDATE pages SET mtime = ? WHERE chapter_uuid = ? AND page_index = ?',
+                       (stat.st_mtime, chapter_uuid, index)))
+        return True
+
+    def chapter_complete(self, chapter_uuid, chapter_dir):
+        """章节已记录为完成，且每一页的文件都在 chapter_dir 中并与记录一致"""
+        rows = self._execute(('SELECT total_pages, completed_at FROM chapters WHERE chapter_uuid = ?',
+                              (chapter_uuid,)))
+        if not rows or rows[0][1] is None:
+            return False
+        total_pages = rows[0][0]
+        pages = self._page_rows(chapter_uuid)
+        if len(pages) != total_pages:
+            return False
+        return all(self._file_matches(chapter_uuid, index, os.path.join(chapter_dir, page[0]), page)
+                   for index, page in pages.items())
+
+    def page_checker(self, chapter_uuid):
+        """
+        返回 is_done(index, path)：该页已按台账下载且文件完好时为 True。
+        一次读出整章的记录，供 page_fetcher.download_pages 的 skip 参数使用
+        """
+        pages = self._page_rows(chapter_uuid)
+
+        def is_done(index, path):
+            row = pages.get(index)
+            return row is not None and self._file_matches(chapter_uuid, index, path, row)
+        return is_done
+
+    def begin_chapter(self, chapter_uuid, manga_path_word, name, total_pages):
+        """开始 (或重新开始) 下载章节：记录页数并清除完成标记"""
+        self._execute(
+            ('INSERT INTO chapters (chapter_uuid, manga_path_word, name, total_pages, completed_at) '
+             'VALUES (?, ?, ?, ?, NULL) ON CONFLICT(chapter_uuid) DO UPDATE SET '
+             'manga_path_word = excluded.manga_path_word, name = excluded.name, '
+             'total_pages = excluded.total_pages, completed_at = NULL',
+             (chapter_uuid, manga_path_word, name, total_pages)),
+            # 章节页数变少时删掉多出的页面记录
+            ('DELETE FROM pages WHERE chapter_uuid = ? AND page_index >= ?', (chapter_uuid, total_pages)),
+        )
+
+    def record_page(self, chapter_uuid, index, path):
+        """记录已下载完成的一页 (path 为最终文件路径)"""
+        try:
+            stat = os.stat(path)
+            sha256 = file_sha256(path)
+        except OSError as e:
+            logger.warning(f"无法记录已下载的页面 {path}: {e}")
+            return
+        self._execute(('INSERT OR REPLACE INTO pages (chapter_uuid, page_index, file, size, mtime, sha256) '
+                       'VALUES (?, ?, ?, ?, ?, ?)',
+                       (chapter_uuid, index, os.path.basename(path), stat.st_size, stat.st_mtime, sha256)))
+
+    def complete_chapter(self, chapter_uuid):
+        self._execute(('UPDATE chapters SET completed_at = ? WHERE chapter_uuid = ?', (time.time(), chapter_uuid)))
+
+
+_ledger = None
+_ledger_lock = Lock()
+
+
+def get_ledger():
+    """进程内共用的下载台账 (第一次使用时打开)"""
+    global _ledger
+    with _ledger_lock:
+        if _ledger is None:
+            _ledger = DownloadLedger()
+        return _ledger
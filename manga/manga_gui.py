@@ -1,9 +1,8 @@
 import sys
 import os
+import logging
 import shutil
 import re
-import requests
-import time
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QLabel, QVBoxLayout, QHBoxLayout, QWidget, 
                              QMenuBar, QStatusBar, QLineEdit, QPushButton, QListWidget, QTabWidget,
                              QGroupBox, QFormLayout, QSpinBox, QCheckBox, QComboBox, QFileDialog,
@@ -15,7 +14,9 @@ from PyQt6.QtCore import Qt, QThread, pyqtSignal, QUrl, QTimer
 from utils import get_app_base_dir
 
 
+import log_pipeline
 import manga.config as config
+from manga import api_cache, chapter_list, http_client, ledger, page_fetcher
 from manga.settings import load_settings, save_settings
 load_success, load_msg = load_settings()
 print(load_msg)
@@ -39,13 +40,17 @@ def ensure_gui_defaults(settings_dict):
         'use_oversea_cdn': "0",
         'proxies': "",
         'max_concurrent_downloads': 3, # New setting for download concurrency
-        'auto_create_epub_after_download': False # New setting for auto EPUB
+        'max_concurrent_images': 8, # 所有章节合计同时下载的图片数
+        'auto_create_epub_after_download': False, # New setting for auto EPUB
+        'api_cache_enabled': True # 缓存搜索、章节列表和章节内容接口的响应
     }
     for key, value in defaults.items():
         settings_dict.setdefault(key, value)
 
 ensure_gui_defaults(INITIAL_SETTINGS)
 
+logger = logging.getLogger(__name__)
+
 # Convert string "0"/"1" to bool for specific header-like items for easier GUI use internally
 _initial_use_webp_bool = INITIAL_SETTINGS.get('use_webp') == "1"
 _initial_use_oscdn_bool = INITIAL_SETTINGS.get('use_oversea_cdn') == "1"
@@ -124,30 +129,24 @@ class NetworkWorker(QThread):
         self.api_url_base, self.headers, self.proxies = api_url_base, headers or {}, proxies or {}
     def run(self):
         if self.query and self.api_url_base:
-            search_url = f"https://api.{self.api_url_base}/api/v3/search/comic"
+            search_url = f"{api_cache.api_root(self.api_url_base)}/search/comic"
             params = {"format": "json", "platform": 3, "q": self.query, "limit": 30, "offset": 0}
             try:
-                r = requests.get(search_url, params=params, headers=self.headers, proxies=self.proxies, timeout=10)
-                r.raise_for_status()
-                data = r.json()
-                if data.get("code") == 200 and "results" in data and "list" in data["results"]: self.search_complete.emit(data["results"]["list"])
-                else: self.error.emit(f"API Error: {data.get('message', 'Unknown error')}", "search")
+                results = api_cache.get_cache().get_json(search_url, params, headers=self.headers, proxies=self.proxies, timeout=10)
+                if "list" in results: self.search_complete.emit(results["list"])
+                else: self.error.emit("API Error: Unknown error", "search")
+            except api_cache.ApiError as e: self.error.emit(f"API Error: {e}", "search")
             except Exception as e: self.error.emit(f"Network/JSON Error: {e}", "search")
         elif self.chapter_request_info and self.api_url_base:
             path_word = self.chapter_request_info['path_word']
-            group = self.chapter_request_info.get('group', 'default')
-            chapters_url = f"https://api.{self.api_url_base}/api/v3/comic/{path_word}/group/{group}/chapters"
-            params = {"limit": 500, "offset": 0, "platform": 3}
-            try:
-                r = requests.get(chapters_url, params=params, headers=self.headers, proxies=self.proxies, timeout=15)
-                r.raise_for_status()
-                data = r.json()
-                if data.get("code") == 200 and "results" in data and "list" in data["results"]: self.chapters_ready.emit(data["results"]["list"], path_word)
-                else: self.error.emit(f"API Error: {data.get('message', 'Unknown error')}", "chapters")
+            # 所有分组的全部分页并行请求 (命中 API 缓存的不再请求) 后按顺序合并
+            get_json = lambda url, params: api_cache.get_cache().get_json(url, params, headers=self.headers, proxies=self.proxies)
+            try: self.chapters_ready.emit(chapter_list.load_chapters(api_cache.api_root(self.api_url_base), path_word, get_json=get_json), path_word)
+            except api_cache.ApiError as e: self.error.emit(f"API Error: {e}", "chapters")
             except Exception as e: self.error.emit(f"Network/JSON Error: {e}", "chapters")
         elif self.cover_url:
             try:
-                r = requests.get(self.cover_url, headers=self.headers, proxies=self.proxies, timeout=10, stream=True)
+                r = http_client.get(self.cover_url, headers=self.headers, proxies=self.proxies, timeout=10, stream=True)
                 r.raise_for_status()
                 pixmap = QPixmap()
                 if pixmap.loadFromData(r.content):
@@ -167,31 +166,53 @@ class DownloadWorker(QThread):
         self.download_root_path = download_root_path; self.api_url_base = api_url_base; self.headers = headers; self.proxies = proxies
         self.is_cancelled = False
     def run(self):
-        chapter_uuid = self.chapter_data.get("uuid"); chapter_name_sanitized = re.sub(r'[\\/*?"<>|]', "_", self.chapter_data.get("name", f"Chapter_{chapter_uuid}"))
+        chapter_uuid = self.chapter_data.get("uuid"); chapter_name = self.chapter_data.get("name", f"Chapter_{chapter_uuid}")
+        if self.chapter_data.get("group_name"): chapter_name = f"{self.chapter_data['group_name']} - {chapter_name}"  # 单行本、番外等分组的章节名可能与连载话重复
+        chapter_name_sanitized = re.sub(r'[\\/*?"<>|]', "_", chapter_name)
         manga_name_sanitized = re.sub(r'[\\/*?"<>|]', "_", self.manga_name); chapter_download_path = os.path.join(self.download_root_path, manga_name_sanitized, chapter_name_sanitized)
         os.makedirs(chapter_download_path, exist_ok=True)
-        content_url = f"https://api.{self.api_url_base}/api/v3/comic/{self.manga_path_word}/chapter/{chapter_uuid}"
-        params = {"platform": 3}; image_urls = []
+        book = ledger.get_ledger()
+        if book.chapter_complete(chapter_uuid, chapter_download_path):
+            # 台账中已完成且页面文件完好的章节不再请求章节内容
+            logger.info(f"章节已下载过，跳过: {chapter_name_sanitized}")
+            self.chapter_complete.emit(chapter_uuid, chapter_name_sanitized, chapter_download_path, True); return
+        content_url = f"{api_cache.api_root(self.api_url_base)}/comic/{self.manga_path_word}/chapter/{chapter_uuid}"
+        params = {"platform": 3}; image_urls = []; cache = api_cache.get_cache()
         try:
-            response = requests.get(content_url, params=params, headers=self.headers, proxies=self.proxies, timeout=15)
-            response.raise_for_status()
-            content_data = response.json()
-            if content_data.get("code") == 200 and "results" in content_data and "chapter" in content_data["results"]:
-                image_urls = [img["url"] for img in content_data["results"]["chapter"]["contents"]]
-            else: self.error.emit(chapter_uuid, chapter_name_sanitized, f"API Error: {content_data.get('message')}"), self.chapter_complete.emit(chapter_uuid, chapter_name_sanitized, chapter_download_path, False); return
+            results = cache.get_json(content_url, params, headers=self.headers, proxies=self.proxies, timeout=15)
+            if "chapter" in results: image_urls = [img["url"] for img in results["chapter"]["contents"]]
+            else: self.error.emit(chapter_uuid, chapter_name_sanitized, "API Error: no chapter contents"), self.chapter_complete.emit(chapter_uuid, chapter_name_sanitized, chapter_download_path, False); return
+        except api_cache.ApiError as e: self.error.emit(chapter_uuid, chapter_name_sanitized, f"API Error: {e}"), self.chapter_complete.emit(chapter_uuid, chapter_name_sanitized, chapter_download_path, False); return
         except Exception as e: self.error.emit(chapter_uuid, chapter_name_sanitized, f"Net error img list: {e}"); self.chapter_complete.emit(chapter_uuid, chapter_name_sanitized, chapter_download_path, False); return
         if not image_urls: self.error.emit(chapter_uuid, chapter_name_sanitized, "No image URLs."), self.chapter_complete.emit(chapter_uuid, chapter_name_sanitized, chapter_download_path, False); return
-        total_pages = len(image_urls)
+        total_pages = len(image_urls); pages = []
         for i, img_url in enumerate(image_urls):
-            if self.is_cancelled: self.chapter_complete.emit(chapter_uuid, chapter_name_sanitized, chapter_download_path, False); return
             page_num = i + 1; _, ext = os.path.splitext(QUrl(img_url).path()); ext = ext or ".jpg"; ext = ext.split('?')[0] if '?' in ext else ext; ext = ".jpg" if len(ext) > 5 else ext
-            filename = os.path.join(chapter_download_path, f"{page_num:03d}{ext}")
-            try:
-                img_response = requests.get(img_url, headers=self.headers, proxies=self.proxies, timeout=20, stream=True); img_response.raise_for_status()
-                with open(filename, 'wb') as f: f.write(img_response.content)
-                self.progress_update.emit(chapter_uuid, page_num, total_pages)
-            except Exception as e: self.error.emit(chapter_uuid, chapter_name_sanitized, f"Page {page_num} DL fail: {e}")
+            pages.append((img_url, os.path.join(chapter_download_path, f"{page_num:03d}{ext}")))
+        # 只下载台账中没有或文件已缺失、损坏的页面；台账建立前下载的页面文件头有效时直接记入台账
+        book.begin_chapter(chapter_uuid, self.manga_path_word, self.chapter_data.get("name"), total_pages)
+        is_recorded = book.page_checker(chapter_uuid); skipped = set()
+        def skip(index, path):
+            if not is_recorded(index, path):
+                if not os.path.exists(path): return False
+                try: page_fetcher.verify_image(path)
+                except page_fetcher.PageError: return False
+                book.record_page(chapter_uuid, index, path)
+            skipped.add(index); return True
+        # 同一章的页面并行下载 (所有章节共用图片请求上限)，按页码顺序提交并报告进度
+        def on_page(index, error):
+            if error is None:
+                if index not in skipped: book.record_page(chapter_uuid, index, pages[index][1])
+                self.progress_update.emit(chapter_uuid, index + 1, total_pages)
+            else: self.error.emit(chapter_uuid, chapter_name_sanitized, f"Page {index + 1} DL fail: {error}")
+        try: failed = page_fetcher.download_pages(pages, self._fetch_page, on_page=on_page, is_cancelled=lambda: self.is_cancelled, skip=skip)
+        except page_fetcher.Cancelled: self.chapter_complete.emit(chapter_uuid, chapter_name_sanitized, chapter_download_path, False); return
+        if failed == 0: book.complete_chapter(chapter_uuid)
+        else: cache.invalidate(content_url, params, self.headers)  # 图片地址可能已失效，下次重新获取章节内容
+        if skipped: logger.info(f"{chapter_name_sanitized}: {len(skipped)}/{total_pages} 页已下载过，未重新下载")
         self.chapter_complete.emit(chapter_uuid, chapter_name_sanitized, chapter_download_path, True)
+    def _fetch_page(self, img_url, filename):
+        page_fetcher.fetch_page(img_url, filename, headers=self.headers, proxies=self.proxies, timeout=20)
     def cancel(self): self.is_cancelled = True
 
 class ExportWorker(QThread):
@@ -250,7 +271,8 @@ class ChapterInfoDialog(QDialog):
         self.chapter_tree.setSelectionMode(QTreeWidget.SelectionMode.ExtendedSelection)
         
         for i, chapter in enumerate(self.chapters):
-            item = QTreeWidgetItem([f"{i+1:03d}. {chapter.get('name', '未知章节')}"])
+            group_prefix = f"[{chapter['group_name']}] " if chapter.get('group_name') else ""
+            item = QTreeWidgetItem([f"{i+1:03d}. {group_prefix}{chapter.get('name', '未知章节')}"])
             item.setData(0, Qt.ItemDataRole.UserRole, i)  # 存储章节索引
             self.chapter_tree.addTopLevelItem(item)
         
@@ -435,6 +457,8 @@ class ChapterInfoDialog(QDialog):
 
 
 class MainWindow(QMainWindow):
+    log_lines = pyqtSignal(list)  # 日志线程每批输出的下载日志行
+
     def __init__(self):
         super().__init__()
         self.setWindowTitle("拷贝漫画下载器")
@@ -450,11 +474,16 @@ class MainWindow(QMainWindow):
         self.download_queue = []
         self.active_download_workers = {}
         self.max_concurrent_downloads = INITIAL_SETTINGS.get('max_concurrent_downloads', 3)
+        self._apply_concurrency_settings()
         
         self._create_menu_bar()
         self._create_status_bar()
         self._init_ui()
         self._load_app_settings()
+        # 下载日志经日志线程成批交给界面，每批只追加和滚动一次
+        log_pipeline.setup_logging()
+        self.log_lines.connect(self._append_log_lines)
+        log_pipeline.add_handler(log_pipeline.CallbackHandler(self.log_lines.emit), name_filter=__name__)
 
     def _create_menu_bar(self):
         menu_bar = self.menuBar()
@@ -504,7 +533,9 @@ class MainWindow(QMainWindow):
         self.epub_include_title_page_checkbox.setChecked(INITIAL_SETTINGS.get('epub_create_title_page'))
         self.epub_auto_delete_source_checkbox.setChecked(INITIAL_SETTINGS.get('epub_auto_delete_source', False))
         self.max_concurrent_downloads_spinbox.setValue(INITIAL_SETTINGS.get('max_concurrent_downloads', 3))
+        self.max_concurrent_images_spinbox.setValue(INITIAL_SETTINGS.get('max_concurrent_images', 8))
         self.auto_create_epub_checkbox.setChecked(INITIAL_SETTINGS.get('auto_create_epub_after_download', False))
+        self.api_cache_checkbox.setChecked(INITIAL_SETTINGS.get('api_cache_enabled', True))
         self.statusBar.showMessage("设置已加载", 2000)
 
     def _save_app_settings(self):
@@ -517,7 +548,9 @@ class MainWindow(QMainWindow):
             "epub_create_title_page": self.epub_include_title_page_checkbox.isChecked(),
             "epub_auto_delete_source": self.epub_auto_delete_source_checkbox.isChecked(),
             "max_concurrent_downloads": self.max_concurrent_downloads_spinbox.value(),
-            "auto_create_epub_after_download": self.auto_create_epub_checkbox.isChecked()
+            "max_concurrent_images": self.max_concurrent_images_spinbox.value(),
+            "auto_create_epub_after_download": self.auto_create_epub_checkbox.isChecked(),
+            "api_cache_enabled": self.api_cache_checkbox.isChecked()
         }
         settings_to_save = config.SETTINGS.copy(); settings_to_save.update(gui_settings_map)
         try:
@@ -527,10 +560,22 @@ class MainWindow(QMainWindow):
             INITIAL_SETTINGS.clear(); INITIAL_SETTINGS.update(config.SETTINGS)
             global _initial_use_webp_bool, _initial_use_oscdn_bool
             _initial_use_webp_bool = INITIAL_SETTINGS.get('use_webp') == "1"; _initial_use_oscdn_bool = INITIAL_SETTINGS.get('use_oversea_cdn') == "1"
-            self.max_concurrent_downloads = INITIAL_SETTINGS.get('max_concurrent_downloads')
+            self.max_concurrent_downloads = INITIAL_SETTINGS.get('max_concurrent_downloads'); self._apply_concurrency_settings()
             self.statusBar.showMessage("设置已成功保存到文件!", 5000)
         except Exception as e: self.statusBar.showMessage(f"错误: 保存设置失败: {e}", 8000); print(f"Error: {e}"); import traceback; traceback.print_exc()
 
+    def _apply_concurrency_settings(self):
+        """图片请求上限由所有章节共用；每个主机的连接池不小于同时进行的请求数，连接才能全部复用"""
+        max_images = INITIAL_SETTINGS.get('max_concurrent_images', 8)
+        page_fetcher.configure(max_images)
+        http_client.configure(max(self.max_concurrent_downloads, max_images))
+        api_cache.get_cache().enabled = INITIAL_SETTINGS.get('api_cache_enabled', True)
+
+    def _clear_api_cache(self):
+        """清除 API 响应缓存，下次浏览或下载时重新请求接口"""
+        cache = api_cache.get_cache(); stats = cache.stats(); cache.clear()
+        self.statusBar.showMessage(f"API 缓存已清除 (本次命中 {stats['hits']} 次，未命中 {stats['misses']} 次，命中率 {stats['hit_rate']:.0%})", 5000)
+
     def _setup_downloader_tab(self):
         layout = QVBoxLayout(self.downloader_tab)
         
@@ -687,7 +732,11 @@ class MainWindow(QMainWindow):
         self.use_oscdn_checkbox = QCheckBox("使用海外 CDN"); program_form_layout.addRow(self.use_oscdn_checkbox)
         self.proxy_edit = QLineEdit(); self.proxy_edit.setPlaceholderText("例如: http://127.0.0.1:7890"); program_form_layout.addRow("HTTP(S) 代理:", self.proxy_edit)
         self.max_concurrent_downloads_spinbox = QSpinBox(); self.max_concurrent_downloads_spinbox.setRange(1, 10); program_form_layout.addRow("同时下载任务数:", self.max_concurrent_downloads_spinbox)
+        self.max_concurrent_images_spinbox = QSpinBox(); self.max_concurrent_images_spinbox.setRange(1, 32); self.max_concurrent_images_spinbox.setToolTip("所有下载任务合计同时进行的图片请求数"); program_form_layout.addRow("同时下载图片数:", self.max_concurrent_images_spinbox)
         self.auto_create_epub_checkbox = QCheckBox("下载完成后自动创建EPUB"); program_form_layout.addRow(self.auto_create_epub_checkbox)
+        api_cache_layout = QHBoxLayout(); self.api_cache_checkbox = QCheckBox("缓存 API 响应 (搜索、章节列表和章节内容)"); api_cache_layout.addWidget(self.api_cache_checkbox)
+        clear_api_cache_button = QPushButton("清除 API 缓存"); clear_api_cache_button.clicked.connect(self._clear_api_cache); api_cache_layout.addWidget(clear_api_cache_button); api_cache_layout.addStretch()
+        program_form_layout.addRow(api_cache_layout)
         program_settings_group.setLayout(program_form_layout); layout.addWidget(program_settings_group)
         epub_meta_settings_group = QGroupBox("EPUB 元数据设置"); epub_form_layout = QFormLayout()
         self.epub_language_combo = QComboBox(); epub_form_layout.addRow("EPUB 语言:", self.epub_language_combo)
@@ -758,7 +807,7 @@ class MainWindow(QMainWindow):
         headers = config.API_HEADER
         proxies = config.PROXIES
         
-        chapter_req_info = {'path_word': path_word, 'group': 'default'}
+        chapter_req_info = {'path_word': path_word}
         
         self.main_network_worker = NetworkWorker(
             chapter_request_info=chapter_req_info,
@@ -872,7 +921,7 @@ class MainWindow(QMainWindow):
     def _handle_network_error(self, error_msg, operation_type):
         """处理网络错误"""
         self.statusBar.showMessage(f"{operation_type.capitalize()} 错误: {error_msg}", 5000)
-        print(f"网络错误 ({operation_type}): {error_msg}")
+        logger.warning(f"网络错误 ({operation_type}): {error_msg}")
         
         if operation_type == "chapters" and self.results_list_context == "chapters":
             self.results_list_context = "manga_search"
@@ -980,7 +1029,7 @@ class MainWindow(QMainWindow):
             
             if not download_dest_root or not os.path.isdir(download_dest_root):
                 self.statusBar.showMessage(f"错误: 下载目标路径无效: {download_dest_root}", 5000)
-                self._log_download_status(f"错误: 下载目标路径无效: {download_dest_root}")
+                self._log_download_status(f"错误: 下载目标路径无效: {download_dest_root}", logging.WARNING)
                 return
                 
             # 开始下载，但不从队列中移除，直到下载完成
@@ -1082,7 +1131,7 @@ class MainWindow(QMainWindow):
                 self.export_worker.start()
         else:
             self.statusBar.showMessage(f"章节《{chapter_name}》下载失败或取消。", 5000)
-            self._log_download_status(f"❌ 下载失败: 《{manga_name}》- {chapter_name}")
+            self._log_download_status(f"❌ 下载失败: 《{manga_name}》- {chapter_name}", logging.WARNING)
             
         # 继续处理队列
         self._process_download_queue()
@@ -1095,17 +1144,18 @@ class MainWindow(QMainWindow):
             del self.active_download_workers[chapter_uuid]
             
         self.statusBar.showMessage(f"下载《{chapter_name}》时出错: {error_message}", 8000)
-        self._log_download_status(f"❌ 下载错误: 《{manga_name}》- {chapter_name}: {error_message}")
+        self._log_download_status(f"❌ 下载错误: 《{manga_name}》- {chapter_name}: {error_message}", logging.WARNING)
         
         # 继续处理队列
         self._process_download_queue()
     
-    def _log_download_status(self, message):
+    def _log_download_status(self, message, level=logging.INFO):
         """记录下载状态到日志"""
-        timestamp = time.strftime('%H:%M:%S')
-        self.download_status_text.append(f"[{timestamp}] {message}")
-        
-        # 自动滚动到底部
+        logger.log(level, message)
+    
+    def _append_log_lines(self, lines):
+        """把一批日志行追加到下载日志并滚动到底部"""
+        self.download_status_text.append('\n'.join(lines))
         cursor = self.download_status_text.textCursor()
         cursor.movePosition(cursor.MoveOperation.End)
         self.download_status_text.setTextCursor(cursor)
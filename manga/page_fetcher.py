@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+漫画章节页面的并行下载。
+
+每个章节用自己的线程池同时下载多页，所有章节共用一个"同时进行的图片请求数"上限，
+因此同时下载的章节再多，发往图片服务器的请求数也不会超过该上限。
+页面按完成顺序写入临时文件 (*.part)，再按页码顺序改名为最终文件名 (001.jpg、002.jpg ...)，
+中途取消时，目录中已提交的页面总是从第一页开始连续的；下载失败的页面只会被跳过 (通过 on_page 报告)，
+其后的页面仍会提交，因此失败的页码处会留下空缺。
+
+fetch_page 分块流式写入临时文件 (内存占用与图片大小无关)，并按 Content-Length 和图片文件头校验，
+因此最终文件名下只会出现完整的图片；重新下载同一章时已存在的页面直接跳过。
+
+    from manga import page_fetcher
+    page_fetcher.configure(8)   # 所有章节合计同时下载的图片数
+    failed = page_fetcher.download_pages([(url, path), ...], fetch, on_page=..., is_cancelled=...)
+"""
+
+import concurrent.futures
+import os
+from contextlib import contextmanager
+from threading import Condition
+
+from manga import http_client
+
+try:
+    from PIL import Image
+except ImportError:  # 没有 Pillow 时只检查文件开头的格式标识
+    Image = None
+
+DEFAULT_MAX_INFLIGHT = 8  # 所有章节合计同时进行的图片请求数
+PART_SUFFIX = '.part'
+CHUNK_SIZE = 64 * 1024
+_POLL_INTERVAL = 0.2  # 等待页面时检查取消的间隔 (秒)
+_IMAGE_SIGNATURES = (b'\xff\xd8\xff', b'\x89PNG\r\n\x1a\n', b'GIF87a', b'GIF89a')
+
+
+class Cancelled(Exception):
+    """章节下载已取消"""
+
+
+class PageError(Exception):
+    """下载的页面不完整或不是有效的图片"""
+
+
+class InflightLimiter:
+    """可调整上限的计数信号量，所有章节的页面请求共用"""
+
+    def __init__(self, limit=DEFAULT_MAX_INFLIGHT):
+        self.limit = max(1, int(limit))
+        self._in_flight = 0
+        self._cond = Condition()
+
+    @property
+    def in_flight(self):
+        return self._in_flight
+
+    def resize(self, limit):
+        with self._cond:
+            self.limit = max(1, int(limit))
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self, is_cancelled=None):
+        """占用一个请求名额；等待期间章节被取消时抛出 Cancelled"""
+        with self._cond:
+            while self._in_flight >= self.limit:
+                if is_cancelled is not None and is_cancelled():
+                    raise Cancelled()
+                self._cond.wait(_POLL_INTERVAL)
+            self._in_flight += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._in_flight -= 1
+                self._cond.notify()
+
+
+_limiter = InflightLimiter()
+
+
+def get_limiter():
+    """进程内所有章节共用的请求名额"""
+    return _limiter
+
+
+def configure(max_inflight):
+    _limiter.resize(max_inflight)
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def verify_image(path):
+    """只解析图片文件头 (不解码像素)，不是可识别的图片时抛出 PageError"""
+    if Image is not None:
+        try:
+            with Image.open(path) as img:
+                width, height = img.size
+        except Exception as e:
+            raise PageError(f"无法识别的图片: {e}")
+        if not width or not height:
+            raise PageError("图片尺寸为 0")
+        return
+    with open(path, 'rb') as f:
+        head = f.read(12)
+    if not (head.startswith(_IMAGE_SIGNATURES) or (head[:4] == b'RIFF' and head[8:12] == b'WEBP')):
+        raise PageError("无法识别的图片格式")
+
+
+def fetch_page(url, temp_path, **kwargs):
+    """
+    把一页图片分块流式写入 temp_path 并校验：长度与 Content-Length 不符或文件头无法识别时
+    删除临时文件并抛出 PageError。kwargs 传给 http_client.get (headers、proxies、timeout 等)
+    """
+    try:
+        with http_client.get(url, stream=True, **kwargs) as response:
+            response.raise_for_status()
+            # 经过 gzip 等编码时 Content-Length 是编码后的长度，无法与解码后的字节数比较
+            expected = None if response.headers.get('Content-Encoding') else response.headers.get('Content-Length')
+            received = 0
+            with open(temp_path, 'wb') as f:
+                for chunk in response.iter_content(CHUNK_SIZE):
+                    f.write(chunk)
+                    received += len(chunk)
+                f.flush()
+                os.fsync(f.fileno())
+        if expected is not None and expected.isdigit() and received != int(expected):
+            raise PageError(f"图片不完整: 收到 {received} 字节，应为 {expected} 字节")
+        if received == 0:
+            raise PageError("图片为空")
+        verify_image(temp_path)
+    except BaseException:
+        _remove(temp_path)
+        raise
+
+
+def download_pages(pages, fetch, on_page=None, is_cancelled=None, limiter=None, skip=None):
+    """
+    并行下载一章的所有页面，按页码顺序提交。
+    pages: [(图片URL, 最终文件路径)]，按页码排列
+    fetch(url, temp_path): 下载 url 并写入 temp_path，失败时抛出异常
+    on_page(index, error): 每页按顺序提交 (或确认失败) 后在调用线程中调用，error 为 None 表示成功 (包括跳过的页面)
+    is_cancelled(): 返回 True 时停止提交，尚未开始的页面不再下载
+    skip(index, path): 返回 True 的页面视为已下载，不再请求；默认跳过最终文件已存在的页面
+    返回失败的页数；已取消时抛出 Cancelled (已下载但未提交的临时文件会被删除)
+    """
+    limiter = limiter or _limiter
+    is_cancelled = is_cancelled or (lambda: False)
+    skip = skip or (lambda index, path: os.path.exists(path))
+
+    def fetch_one(url, temp_path):
+        with limiter.slot(is_cancelled):
+            if is_cancelled():
+                raise Cancelled()
+            fetch(url, temp_path)
+
+    failed = 0
+    # 线程数不超过共用上限，多出的线程只会在名额上等待
+    executor = concurrent.futures.ThreadPoolExecutor(
+        max_workers=max(1, min(len(pages), limiter.limit)), thread_name_prefix='manga-page'
+    )
+    # 最终文件名下的页面都经过校验，已下载过的页面不再请求
+    futures = [None if skip(index, path) else executor.submit(fetch_one, url, path + PART_SUFFIX)
+               for index, (url, path) in enumerate(pages)]
+    try:
+        for index, (future, (_, path)) in enumerate(zip(futures, pages)):
+            if future is None:
+                if on_page is not None:
+                    on_page(index, None)
+                continue
+            while True:
+                if is_cancelled():
+                    raise Cancelled()
+                try:
+                    error = future.exception(timeout=_POLL_INTERVAL)
+                    break
+                except concurrent.futures.TimeoutError:
+                    continue
+            if error is None:
+                os.replace(path + PART_SUFFIX, path)
+            else:
+                failed += 1
+                _remove(path + PART_SUFFIX)
+            if on_page is not None:
+                on_page(index, error)
+    except Cancelled:
+        for future in futures:
+            if future is not None:
+                future.cancel()
+        executor.shutdown(wait=True)
+        for _, path in pages:
+            _remove(path + PART_SUFFIX)
+        raise
+    executor.shutdown(wait=True)
+    return failed
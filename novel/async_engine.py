@@ -0,0 +1,457 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+基于 asyncio + aiohttp 的轻小说文库下载引擎。
+
+与 novel.main.Wenku8Downloader 提供相同的搜索、详情、目录和章节下载接口，
+但所有请求都在同一个事件循环中复用，并由一个信号量限制同时进行的请求数，
+适合一次性并发下载大量章节和插图。页面解析逻辑与同步版本共用 novel.parsing。
+
+用法:
+    async with AsyncWenku8Downloader(concurrency=8) as engine:
+        details = await engine.get_novel_details(1973)
+        volumes = await engine.get_chapter_list(details['catalog_url'], novel_id=1973)
+        await engine.download_volume(volumes[0]['chapters'], 'output/第一卷', 1973)
+"""
+
+import asyncio
+import logging
+import os
+import re
+import time
+from urllib.parse import quote
+
+import aiohttp
+from bs4 import BeautifulSoup
+
+from novel.manifest import VolumeManifest
+from novel.volume_text import save_chapter_text, chapter_text_filename, pending_chapters, save_volume_text
+from novel.metadata_cache import MetadataCache
+from novel.search_cache import SearchCache
+from novel.http_cache import HTTPCache
+from novel.rate_limiter import AdaptiveRateLimiter
+from novel.parsing import (parse_search_results, parse_novel_details, parse_chapter_list,
+                           extract_chapter_content, clean_chapter_text, safe_chapter_filename,
+                           image_extension)
+from novel.block_detection import BlockVerdict, BlockedError, classify_response, SNIFF_SIZE
+from novel.hosts import PAGES, PACKS
+from utils import get_app_base_dir
+
+logger = logging.getLogger(__name__)
+
+# 请求失败 (网络错误、超时或被拦截) 时统一捕获的异常
+FETCH_ERRORS = (aiohttp.ClientError, asyncio.TimeoutError, BlockedError)
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Referer': 'https://www.wenku8.net/',
+    'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8'
+}
+
+
+class AsyncWenku8Downloader:
+    def __init__(self, site_url='https://www.wenku8.net', pack_url='http://dl.wenku8.com', concurrency=8,
+                 headers=None, cookies=None, metadata_cache=None, cover_cache_dir=None, timeout=20, rate_limiter=None,
+                 search_cache=None, http_cache=None):
+        self.site_url = site_url.rstrip('/')
+        self.base_url = f"{self.site_url}/book/"
+        self.pack_url = pack_url.rstrip('/')  # 整卷文本下载服务器
+        self.concurrency = max(1, int(concurrency))
+        self.headers = dict(headers or DEFAULT_HEADERS)
+        self.cookies = dict(cookies or {})
+        self.timeout = timeout
+        self.metadata_cache = metadata_cache or MetadataCache()
+        self.rate_limiter = rate_limiter or AdaptiveRateLimiter()
+        self.last_block_verdict = BlockVerdict.OK
+        self.search_cache = search_cache or SearchCache()
+        self.http_cache = http_cache or HTTPCache()
+        self._manifests = {}  # 卷目录 -> VolumeManifest
+        self.cover_cache_dir = cover_cache_dir or os.path.join(get_app_base_dir(), 'novel_cache', 'covers')
+        os.makedirs(self.cover_cache_dir, exist_ok=True)
+        self.session = None
+        self._semaphore = None
+
+    @classmethod
+    def from_downloader(cls, downloader, concurrency=None, **kwargs):
+        """
+        从同步下载器创建异步引擎，复用其请求头、Cookie 和元数据缓存。
+        下载器尚未登录时先登录 (阻塞)，以便复制登录后的 Cookie。
+        使用下载器镜像注册表中当前最快的可用镜像。
+        """
+        downloader.ensure_login()
+        return cls(
+            site_url=downloader.hosts.best(PAGES),
+            pack_url=downloader.hosts.best(PACKS),
+            concurrency=concurrency or downloader.max_connections_per_host,
+            headers=dict(downloader.session.headers),
+            cookies=downloader.session.cookies.get_dict(),
+            metadata_cache=downloader.metadata_cache,
+            search_cache=downloader.search_cache,
+            http_cache=downloader.http_cache,
+            cover_cache_dir=downloader.cover_cache_dir,
+            rate_limiter=downloader.rate_limiter,
+            **kwargs
+        )
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def open(self):
+        """创建 aiohttp 会话；信号量必须在事件循环内创建"""
+        if self.session is None:
+            # 连接数上限与并发数一致，多出的请求在信号量上等待而不是排在连接池里
+            connector = aiohttp.TCPConnector(limit=self.concurrency, limit_per_host=self.concurrency)
+            self.session = aiohttp.ClientSession(
+                headers=self.headers,
+                cookies=self.cookies,
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout)
+            )
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def _fetch_text(self, url, encoding='gbk', timeout=None, revalidate=False):
+        """
+        获取页面文本，返回 (text, 最终URL)；被拦截时抛出 BlockedError
+        revalidate: 使用 HTTP 验证缓存 (目录页和章节页)
+        """
+        request_timeout = aiohttp.ClientTimeout(total=timeout) if timeout else None
+        headers = {}
+        if revalidate:
+            cached = self.http_cache.fresh_body(url)
+            if cached:
+                return cached[0].decode(encoding, errors='replace'), url
+            headers = self.http_cache.conditional_headers(url)
+        await self.rate_limiter.acquire_async()
+        async with self._semaphore:
+            async with self.session.get(url, timeout=request_timeout, headers=headers) as response:
+                body = await response.read()
+                if revalidate and response.status == 304:
+                    cached = self.http_cache.not_modified(url)
+                    if cached:
+                        self._check_verdict(BlockVerdict.OK, url)
+                        return cached[0].decode(encoding, errors='replace'), str(response.url)
+                if response.status != 304:
+                    self._check_verdict(classify_response(response.status, response.headers, body[:SNIFF_SIZE]), url)
+                    response.raise_for_status()
+                    if revalidate:
+                        self.http_cache.store(url, response.status, response.headers, body)
+                    return body.decode(encoding, errors='replace'), str(response.url)
+        # 本地正文已丢失，重新完整请求一次
+        return await self._fetch_text(url, encoding, timeout)
+
+    async def _fetch_to_file(self, url, path, timeout=30):
+        """流式下载二进制内容，完整写入 .part 文件后再改名，返回写入的字节数"""
+        written = 0
+        tmp_path = f"{path}.part"
+        await self.rate_limiter.acquire_async()
+        try:
+            async with self._semaphore:
+                async with self.session.get(url, timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+                    self._check_verdict(classify_response(response.status, response.headers), url)
+                    response.raise_for_status()
+                    with open(tmp_path, 'wb') as f:
+                        async for chunk in response.content.iter_chunked(8192):
+                            f.write(chunk)
+                            written += len(chunk)
+            if written:
+                os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        return written
+
+    def _check_verdict(self, verdict, url):
+        """把拦截判定反馈给限速器，被拦截时抛出 BlockedError"""
+        self.last_block_verdict = verdict
+        if verdict.blocked:
+            self.rate_limiter.on_throttle(verdict.value)
+            raise BlockedError(verdict, url)
+        self.rate_limiter.on_success()
+
+    async def login(self, username, password):
+        """用户登录，登录后的 Cookie 保存在会话中"""
+        login_url = f"{self.site_url}/login.php?do=submit&jumpurl={quote(self.site_url + '/index.php')}"
+        login_data = {
+            'username': username,
+            'password': password,
+            'usecookie': '315360000',
+            'action': 'login',
+            'submit': ' 登  录 '
+        }
+        try:
+            logger.info(f"尝试登录用户: {username}...")
+            await self.rate_limiter.acquire_async()
+            async with self._semaphore:
+                async with self.session.post(login_url, data=login_data,
+                                             headers={'Referer': f"{self.site_url}/login.php"}) as response:
+                    body = await response.read()
+                    self._check_verdict(classify_response(response.status, response.headers, body[:SNIFF_SIZE]),
+                                        login_url)
+            text = body.decode('gbk', errors='replace')
+            if ("<title>登录成功</title>" in text and "欢迎您到来！" in text) or \
+                    ("用户登录" not in text and "我的帐号" in text):
+                logger.info("登录成功!")
+                return True
+            logger.warning("登录失败。")
+            return False
+        except BlockedError as e:
+            logger.warning(f"登录请求被拦截 ({e.verdict.value})")
+            return False
+        except FETCH_ERRORS as e:
+            logger.warning(f"登录请求发生错误: {e}")
+            return False
+
+    async def _download_image(self, image_url, novel_id):
+        """下载封面图片到缓存目录，已存在时直接返回路径"""
+        if not image_url:
+            return None
+        local_path = os.path.join(self.cover_cache_dir, image_url.split('/')[-1])
+        if os.path.exists(local_path):
+            return local_path
+        try:
+            await self._fetch_to_file(image_url, local_path, timeout=10)
+            return local_path
+        except FETCH_ERRORS as e:
+            logger.warning(f"下载封面图片失败 {image_url}: {e}")
+        except IOError as e:
+            logger.warning(f"保存封面图片失败 {local_path}: {e}")
+        return None
+
+    async def search_novels(self, keyword=None, search_type='articlename', page_url=None):
+        """搜索小说，返回值与 Wenku8Downloader.search_novels 相同；封面图片并发下载"""
+        if page_url:
+            search_url = page_url
+        elif keyword:
+            encoded_keyword = quote(keyword.encode('gbk'))
+            search_url = f"{self.site_url}/modules/article/search.php?searchtype={search_type}&searchkey={encoded_keyword}"
+        else:
+            logger.warning("错误：必须提供搜索关键词或页面URL")
+            return {'novels': [], 'pagination_info': None}
+
+        cached = self.search_cache.get(search_url)
+        if cached is not None:
+            return cached
+
+        try:
+            text, final_url = await self._fetch_text(search_url)
+            novels, pagination_info = parse_search_results(text, final_url)
+            cover_paths = await asyncio.gather(
+                *(self._download_image(novel.get('cover_image_url'), novel['id']) for novel in novels)
+            )
+            for novel, cover_path in zip(novels, cover_paths):
+                novel['cover_image_path'] = cover_path
+            result = {'novels': novels, 'pagination_info': pagination_info}
+            self.search_cache.set(search_url, result)
+            return result
+        except FETCH_ERRORS as e:
+            logger.warning(f"搜索请求失败: {e}")
+            return {'novels': [], 'pagination_info': None}
+
+    async def get_novel_details(self, novel_id, use_cache=True):
+        """获取小说详情"""
+        if use_cache:
+            cached = self.metadata_cache.get(novel_id, 'details')
+            if cached:
+                return cached
+        try:
+            text, final_url = await self._fetch_text(f"{self.base_url}{novel_id}.htm")
+            details = parse_novel_details(text, final_url, novel_id)
+            if details['catalog_url']:
+                self.metadata_cache.set(novel_id, 'details', details)
+            return details
+        except FETCH_ERRORS as e:
+            logger.warning(f"获取小说详情失败: {e}")
+            return None
+
+    async def get_chapter_list(self, catalog_url, novel_id=None, use_cache=True):
+        """获取章节列表"""
+        if novel_id is None:
+            match = re.search(r'/novel/\d+/(\d+)/', catalog_url or '')
+            novel_id = int(match.group(1)) if match else None
+        if use_cache:
+            cached = self.metadata_cache.get(novel_id, 'volumes')
+            if cached:
+                return cached
+        try:
+            text, _ = await self._fetch_text(catalog_url, revalidate=True)
+            volumes = parse_chapter_list(text, catalog_url)
+            if volumes:
+                self.metadata_cache.set(novel_id, 'volumes', volumes)
+            return volumes
+        except FETCH_ERRORS as e:
+            logger.warning(f"获取章节列表失败: {e}")
+            return []
+
+    async def _fetch_fallback_text(self, chapter, novel_id):
+        """正文为空或受版权限制时，尝试 packtxt.php / pack.php 备用接口"""
+        vid_match = re.search(r'(\d+)\.htm', chapter['url'])
+        if not vid_match or not str(novel_id).isdigit():
+            return ""
+        aid, vid = str(novel_id), vid_match.group(1)
+        try:
+            text, _ = await self._fetch_text(f"{self.pack_url}/packtxt.php?aid={aid}&vid={vid}", timeout=15)
+            if len(text.strip()) > 50:
+                return text.strip()
+        except FETCH_ERRORS as e:
+            logger.warning(f"      备用 (packtxt) 请求失败: {e}")
+        try:
+            html, _ = await self._fetch_text(f"{self.pack_url}/pack.php?aid={aid}&vid={vid}",
+                                             encoding='utf-8', timeout=15)
+            body = BeautifulSoup(html, 'html.parser').body
+            if body:
+                text = body.get_text(separator='\n', strip=True)
+                return re.sub(r'\n{2,}', '\n\n', text)
+        except FETCH_ERRORS as e:
+            logger.warning(f"      备用 (pack) 请求失败: {e}")
+        return ""
+
+    def _manifest_for(self, volume_dir):
+        key = os.path.abspath(volume_dir)
+        if key not in self._manifests:
+            self._manifests[key] = VolumeManifest(volume_dir)
+        return self._manifests[key]
+
+    async def _download_chapter_image(self, img_url, img_path):
+        if os.path.exists(img_path) and os.path.getsize(img_path) > 0:
+            return True
+        try:
+            if await self._fetch_to_file(img_url, img_path) > 0:
+                return True
+        except FETCH_ERRORS as e:
+            logger.warning(f"    ✗ 下载图片失败 {img_url}: {e}")
+        except IOError as e:
+            logger.warning(f"    ✗ 保存图片文件失败 {img_path}: {e}")
+        return False
+
+    async def download_chapter(self, chapter, output_dir, novel_id):
+        """下载单个章节的文本和插图，插图之间并发下载"""
+        try:
+            html, _ = await self._fetch_text(chapter['url'], revalidate=True)
+        except BlockedError as e:
+            logger.warning(f"  ✗ 页面被Cloudflare拦截 ({e.verdict.value}): {chapter['title']}")
+            return False
+        except FETCH_ERRORS as e:
+            logger.warning(f"✗ 处理章节时网络请求错误: {chapter['title']} - {e}")
+            return False
+
+        text_content, image_urls = extract_chapter_content(html, chapter['url'])
+
+        stripped = text_content.strip()
+        if not stripped or stripped == 'null' or '因版权问题' in text_content or '文库不再提供' in text_content:
+            fallback_text = await self._fetch_fallback_text(chapter, novel_id)
+            if fallback_text:
+                text_content = fallback_text
+            stripped = text_content.strip()
+
+        if not stripped and not image_urls:
+            logger.warning(f"✗ 无法获取章节内容 (文本和图片均无或无效): {chapter['title']}")
+            return False
+        if len(stripped) < 20 and not image_urls:
+            logger.warning(f"✗ 文本内容过短 (<20 chars) 且无图片: {chapter['title']}")
+            return False
+
+        text_content = clean_chapter_text(stripped) if stripped else ""
+        safe_chapter_title = safe_chapter_filename(chapter)
+        image_names = [f"{safe_chapter_title}_img_{i+1}.{image_extension(url)}" for i, url in enumerate(image_urls)]
+        image_results = await asyncio.gather(
+            *(self._download_chapter_image(url, os.path.join(output_dir, name))
+              for url, name in zip(image_urls, image_names))
+        )
+
+        text_filename = None
+        text_hash = None
+        if text_content:
+            try:
+                text_hash = save_chapter_text(chapter, output_dir, text_content, image_names)
+                text_filename = chapter_text_filename(chapter)
+            except IOError as e:
+                logger.warning(f"  ✗ 保存文本文件失败 {chapter_text_filename(chapter)}: {e}")
+
+        success = bool(text_filename) or any(image_results)
+        if success:
+            self._manifest_for(output_dir).record(chapter, text_filename, text_hash, [
+                {'url': url, 'file': name, 'done': done}
+                for url, name, done in zip(image_urls, image_names, image_results)
+            ])
+        if success:
+            logger.info(f"  ✓ 处理完成: {chapter['title']}")
+        else:
+            logger.warning(f"  ✗ 下载失败 (无有效内容输出): {chapter['title']}")
+        return success
+
+    async def _download_chapter_with_retries(self, chapter, output_dir, novel_id, max_retries, retry_delay):
+        """max_retries 与同步版本含义相同，为总尝试次数；清单中已完成的章节直接跳过"""
+        if self._manifest_for(output_dir).is_complete(chapter):
+            logger.info(f"已下载，跳过: {chapter['title']}")
+            return True
+        for attempt in range(max(1, max_retries)):
+            if attempt:
+                logger.info(f"正在重试下载: {chapter['title']} (尝试 {attempt}/{max_retries-1})")
+                await asyncio.sleep(retry_delay)
+            if await self.download_chapter(chapter, output_dir, novel_id):
+                return True
+        logger.warning(f"✗ 下载失败 (已达最大重试次数): {chapter['title']}")
+        return False
+
+    async def download_chapters(self, jobs, novel_id, max_retries=3, retry_delay=5):
+        """
+        并发下载多个章节。
+        jobs: [(chapter, output_dir), ...]，chapter 的标题应已带序号前缀
+        返回与 jobs 顺序一致的布尔值列表
+        """
+        for _, output_dir in jobs:
+            os.makedirs(output_dir, exist_ok=True)
+        start_time = time.time()
+        cache_stats_before = self.http_cache.snapshot()
+        try:
+            results = await asyncio.gather(
+                *(self._download_chapter_with_retries(chapter, output_dir, novel_id, max_retries, retry_delay)
+                  for chapter, output_dir in jobs)
+            )
+        finally:
+            for manifest in self._manifests.values():
+                manifest.flush()
+        elapsed = max(time.time() - start_time, 1e-6)
+        logger.info(f"完成: {sum(results)}/{len(jobs)} 个章节，用时 {elapsed:.1f} 秒 ({len(jobs) / elapsed:.2f} 章/秒)")
+        logger.info(self.http_cache.report(since=cache_stats_before))
+        return list(results)
+
+    async def _bulk_download_volume(self, chapters, prefixed_chapters, output_dir, novel_id, vid):
+        """整卷下载: 一次请求获取整卷文本，切分和保存与同步版本共用 novel.volume_text，返回保存的章节数"""
+        manifest = self._manifest_for(output_dir)
+        pending = pending_chapters(manifest, prefixed_chapters)
+        if not pending or not str(novel_id).isdigit():
+            return 0
+        try:
+            volume_text, _ = await self._fetch_text(
+                f"{self.pack_url}/packtxt.php?aid={novel_id}&vid={vid}", timeout=30
+            )
+        except FETCH_ERRORS as e:
+            logger.warning(f"  整卷文本请求失败，改为逐章下载: {e}")
+            return 0
+        return save_volume_text(volume_text, [chapter['title'] for chapter in chapters], prefixed_chapters,
+                                pending, output_dir, manifest)
+
+    async def download_volume(self, chapters, output_dir, novel_id, max_retries=3, retry_delay=5, vid=None):
+        """
+        并发下载一卷，章节标题加上与同步版本一致的序号前缀
+        vid: 卷ID (目录中卷的 'vid')，提供时先尝试整卷获取文本
+        """
+        jobs = []
+        for i, chapter in enumerate(chapters, 1):
+            jobs.append(({'title': f"{i:03d}_{chapter['title']}", 'url': chapter['url']}, output_dir))
+        if vid:
+            os.makedirs(output_dir, exist_ok=True)
+            await self._bulk_download_volume(chapters, [chapter for chapter, _ in jobs], output_dir, novel_id, vid)
+        results = await self.download_chapters(jobs, novel_id, max_retries, retry_delay)
+        return sum(results)
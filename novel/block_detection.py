@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Cloudflare 拦截页面识别。
+
+先看状态码和响应头 (cf-ray / server / cf-mitigated / content-type)，图片等非 HTML 响应
+到此即可判断；HTML 页面再在正文的前几 KB 字节中查找拦截页面的特征文本，不需要先解码整个页面。
+同步下载器和异步引擎的每个请求都会经过这里，结果交给限速器和调度使用。
+"""
+
+import re
+from enum import Enum
+
+SNIFF_SIZE = 8192  # 只检查正文开头的字节数
+
+
+class BlockVerdict(Enum):
+    OK = 'ok'
+    RATE_LIMITED = 'rate_limited'   # 1015 / 429 / 503，降速后可继续
+    CHALLENGE = 'challenge'         # JS 或 Cookie 挑战页面
+    BANNED = 'banned'               # IP 被站点暂时封禁
+
+    @property
+    def blocked(self):
+        return self is not BlockVerdict.OK
+
+
+class BlockedError(Exception):
+    """请求被拦截时由异步引擎抛出"""
+
+    def __init__(self, verdict, url=''):
+        super().__init__(f"{verdict.value}: {url}")
+        self.verdict = verdict
+        self.url = url
+
+
+# 各类拦截页面的特征文本 (小写)，同时命中多类时按此顺序取结果。
+# 用 bytes 子串查找代替不区分大小写的正则: 8 KB 的 GBK 页面上约 30 微秒，正则需要 1 毫秒以上。
+_MARKERS = (
+    (BlockVerdict.RATE_LIMITED, (b'you are being rate limited',)),
+    (BlockVerdict.BANNED, (b'has banned you temporarily', b'why_was_i_blocked', b'sorry, you have been blocked')),
+    (BlockVerdict.CHALLENGE, (b'checking if the site connection is secure', b'enable javascript and cookies to continue',
+                              b'please enable cookies', b'just a moment...', b'ray id:',
+                              b'performance & security by cloudflare', b'performance &amp; security by cloudflare')),
+)
+# Cloudflare 错误页中 "Error" 和 "1015" 分属两个 <span>
+_ERROR_1015 = re.compile(rb'error(?:\s|<[^>]*>)*1015')
+
+
+def _classify_markers(sample):
+    sample = sample.lower()
+    if b'1015' in sample and _ERROR_1015.search(sample):
+        return BlockVerdict.RATE_LIMITED
+    for verdict, texts in _MARKERS:
+        if any(text in sample for text in texts):
+            return verdict
+    return BlockVerdict.OK
+
+
+def classify_response(status_code, headers, body_prefix=None):
+    """
+    判断响应是否为拦截页面。
+    headers: 不区分大小写的响应头 (requests / aiohttp 均可)
+    body_prefix: 正文开头的字节；为 None 表示期望二进制内容 (如图片)，
+                 此时经过 Cloudflare 返回的 HTML 即视为拦截。
+    """
+    if headers.get('cf-mitigated', '').lower() == 'challenge':
+        return BlockVerdict.CHALLENGE
+    if status_code == 429:
+        return BlockVerdict.RATE_LIMITED
+
+    behind_cloudflare = 'cf-ray' in headers or 'cloudflare' in headers.get('server', '').lower()
+    is_html = 'html' in headers.get('content-type', '').lower()
+    if status_code < 400 and not is_html:
+        return BlockVerdict.OK
+    if body_prefix is None:
+        if not behind_cloudflare:
+            return BlockVerdict.RATE_LIMITED if status_code == 503 else BlockVerdict.OK
+        if status_code == 403:
+            return BlockVerdict.BANNED
+        if status_code == 503 or is_html:
+            return BlockVerdict.CHALLENGE
+        return BlockVerdict.OK
+
+    # HTML 页面即使没有 Cloudflare 响应头 (如经过代理) 也检查一遍开头，代价只是扫描几 KB 字节
+    verdict = _classify_markers(body_prefix[:SNIFF_SIZE])
+    if verdict is BlockVerdict.OK and status_code == 403 and behind_cloudflare:
+        return BlockVerdict.BANNED
+    if verdict is BlockVerdict.OK and status_code == 503:
+        return BlockVerdict.RATE_LIMITED
+    return verdict
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+章节正文清理规则。
+
+规则保存在用户目录下的 novel_cleanup_rules.txt 中，每行一条:
+    普通文本         原样删除该文本
+    re:正则表达式    按行匹配 (MULTILINE)，删除匹配到的内容
+    # 开头的行        注释
+文件不存在时会写入默认规则，修改后下次清理时自动重新加载。
+
+所有普通文本合并为一个正则 (长的优先)，行首锚定的正则和其余正则各合并为一个，
+因此清理一章只需要扫描三遍正文，耗时与规则条数基本无关。
+"""
+
+import logging
+import os
+import re
+from threading import Lock
+
+from utils import get_app_base_dir
+
+logger = logging.getLogger(__name__)
+
+RULES_FILENAME = 'novel_cleanup_rules.txt'
+REGEX_PREFIX = 're:'
+
+DEFAULT_RULES_TEXT = """# 章节正文清理规则，每行一条。
+# 普通文本会被原样删除；以 re: 开头的是正则表达式，按行匹配 (^ 和 $ 表示行首行尾)。
+# 以 # 开头的行是注释。修改后无需重启，下一章下载时生效。
+
+本文来自 轻小说文库(http://www.wenku8.com)
+台版 转自 轻之国度
+最新最全的日本动漫轻小说 轻小说文库(http://www.wenku8.com) 为你一网打尽！
+更多精彩热门日本轻小说、动漫小说，轻小说文库(http://www.wenku8.com) 为你一网打尽！
+www.wenku8.com
+wenku8.com
+轻小说文库
+
+re:^插图来源[:：]?.*$
+re:^文字来源[:：]?.*$
+re:^(?=.*轻之国度)(?=.*仅供试阅).*$
+re:^(?=.*LKID)(?=.*录入).*$
+re:^\\s*扫图：.*$
+re:^\\s*录入：.*$
+re:^\\s*校对：.*$
+re:^\\s*翻译：.*$
+re:^\\s*润色：.*$
+re:^\\s*修图：.*$
+re:^\\s*转自：.*$
+re:^\\s*仅供个人学习交流使用，禁作商业用途.*$
+re:^\\s*下载后请在24小时内删除，LK不负担任何责任.*$
+re:^\\s*请尊重翻译、扫图、录入、校对的辛勤劳动，转载请保留信息.*$
+re:^\\s*本文特别严禁转载至SF轻小说频道及轻小说文库测(.*)$
+re:^\\s*──────────────$
+re:^\\s*━━━━━━━━━━━━$
+re:^\\s*＊＊＊$
+re:(?i)novel Horizons - Présente
+re:(?i)Par Ln Vol.(.*)Traduction(.*)
+"""
+
+_LEADING_FLAGS = re.compile(r'^\(\?([aiLmsux]+)\)')
+_EXTRA_BLANK_LINES = re.compile(r'\n{3,}')
+
+
+def _scoped(pattern):
+    """把开头的全局标记 (?i) 改写为局部的 (?i:...)，以便与其他规则合并"""
+    match = _LEADING_FLAGS.match(pattern)
+    if match:
+        return f"(?{match.group(1)}:{pattern[match.end():]})"
+    return f"(?:{pattern})"
+
+
+class CleanupRules:
+    def __init__(self, literals=(), patterns=()):
+        self.literals = [literal for literal in literals if literal]
+        self.patterns = []
+        for pattern in patterns:
+            try:
+                re.compile(_scoped(pattern), re.MULTILINE)
+                self.patterns.append(pattern)
+            except re.error as e:
+                logger.warning(f"  警告: 清理规则 '{pattern}' 正则表达式错误: {e}")
+
+        # 长的文本优先匹配，避免 "轻小说文库" 先于包含它的整句被删除
+        ordered = sorted(set(self.literals), key=len, reverse=True)
+        self._literal_re = re.compile('|'.join(map(re.escape, ordered))) if ordered else None
+        # 以 ^ 开头的规则共用一个行首锚点，正则引擎在非行首位置只需一次判断即可跳过
+        anchored = [_scoped(pattern[1:]) for pattern in self.patterns if pattern.startswith('^')]
+        unanchored = [_scoped(pattern) for pattern in self.patterns if not pattern.startswith('^')]
+        self._compiled_patterns = []
+        if anchored:
+            self._compiled_patterns.append(re.compile('^(?:' + '|'.join(anchored) + ')', re.MULTILINE))
+        if unanchored:
+            self._compiled_patterns.append(re.compile('|'.join(unanchored), re.MULTILINE))
+
+    @classmethod
+    def parse(cls, text):
+        literals, patterns = [], []
+        for line in text.splitlines():
+            rule = line.strip()
+            if not rule or rule.startswith('#'):
+                continue
+            if rule.startswith(REGEX_PREFIX):
+                patterns.append(rule[len(REGEX_PREFIX):])
+            else:
+                literals.append(rule)
+        return cls(literals, patterns)
+
+    def apply(self, text):
+        """删除正文中匹配规则的内容，并合并多余空行"""
+        text = text.strip()
+        if self._literal_re:
+            text = self._literal_re.sub('', text)
+        for compiled in self._compiled_patterns:
+            text = compiled.sub('', text)
+        return _EXTRA_BLANK_LINES.sub('\n\n', text.strip())
+
+
+def rules_path():
+    return os.path.join(get_app_base_dir(), RULES_FILENAME)
+
+
+_cache_lock = Lock()
+_cached_rules = None
+_cached_mtime = None
+
+
+def get_cleanup_rules(path=None):
+    """加载清理规则；规则文件未修改时复用已编译的规则"""
+    global _cached_rules, _cached_mtime
+    path = path or rules_path()
+    with _cache_lock:
+        try:
+            if not os.path.exists(path):
+                with open(path, 'w', encoding='utf-8') as f:
+                    f.write(DEFAULT_RULES_TEXT)
+            stamp = (path, os.path.getmtime(path))
+            if _cached_rules is None or stamp != _cached_mtime:
+                with open(path, 'r', encoding='utf-8') as f:
+                    _cached_rules = CleanupRules.parse(f.read())
+                _cached_mtime = stamp
+        except (IOError, OSError) as e:
+            if _cached_rules is None:
+                logger.warning(f"读取清理规则失败，使用默认规则 {path}: {e}")
+                _cached_rules = CleanupRules.parse(DEFAULT_RULES_TEXT)
+        return _cached_rules
@@ -7,5 +7,17 @@ SETTINGS = {
     'output_dir': str(get_app_base_dir() / "novel_downloads"),
     'output_epub_dir': str(get_app_base_dir() / "novel_downloads"),
     'max_retries': 3,
+    'max_workers': 4,  # 同时下载的章节数 (多本小说同时下载时共用)
+    'max_parallel_novels': 2,  # 下载队列中同时下载的小说数
+    'max_connections_per_host': 4,  # 每个主机的最大并发请求数
+    'max_requests_per_second': 10,  # 自适应限速的速率上限(次/秒)
+    'max_image_workers': 6,  # 同时下载的插图数
+    'bulk_volume_mode': True,  # 整卷获取文本，只有无法切分的章节和插图章节逐章下载
+    'metadata_cache_ttl_hours': 6,  # 小说详情和目录缓存的有效期(小时)
+    'search_cache_ttl_hours': 24,  # 搜索结果缓存的有效期(小时)
+    'search_cache_max_entries': 200,  # 最多缓存的搜索结果页数
+    'page_mirrors': '',  # 主站镜像，逗号分隔，留空使用默认镜像 (见 novel.hosts)
+    'pack_mirrors': '',  # 整卷文本下载服务器镜像
+    'log_levels': '',  # 各模块日志级别，如 "novel.image_fetcher=WARNING, novel.main=DEBUG"
     'auto_login': True  # 默认自动登录
 }
\ No newline at end of file
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import json
+import logging
+import os
+import time
+from threading import Lock
+
+from requests.cookies import create_cookie
+
+from utils import get_app_base_dir
+
+logger = logging.getLogger(__name__)
+
+
+class CookieStore:
+    """
+    登录 Cookie 的磁盘存储。
+
+    保存会话中的全部 Cookie (包括 Cloudflare 的 cf_clearance 等)，下次启动时载入，
+    有效期内无需重新登录。文件中记录所属用户名，切换账号时不载入旧账号的 Cookie:
+        {"username": "...", "saved_at": 1700000000.0,
+         "cookies": [{"name": ..., "value": ..., "domain": ..., "path": ..., "expires": ..., ...}]}
+    """
+
+    def __init__(self, path=None):
+        self.path = path or os.path.join(get_app_base_dir(), 'novel_cache', 'cookies.json')
+        self._lock = Lock()
+
+    def load(self, jar, username):
+        """把未过期的 Cookie 载入 jar，返回载入的数量"""
+        with self._lock:
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            except FileNotFoundError:
+                return 0
+            except (IOError, ValueError) as e:
+                logger.warning(f"读取已保存的登录信息失败 {self.path}: {e}")
+                return 0
+        if data.get('username') != username:
+            return 0
+
+        now = time.time()
+        loaded = 0
+        for item in data.get('cookies', []):
+            if item.get('expires') is not None and item['expires'] <= now:
+                continue
+            jar.set_cookie(create_cookie(
+                item['name'], item['value'],
+                domain=item.get('domain', ''),
+                path=item.get('path', '/'),
+                expires=item.get('expires'),
+                secure=item.get('secure', False),
+                rest=item.get('rest', {})
+            ))
+            loaded += 1
+        return loaded
+
+    def save(self, jar, username):
+        """保存 jar 中的全部 Cookie"""
+        cookies = [{
+            'name': cookie.name,
+            'value': cookie.value,
+            'domain': cookie.domain,
+            'path': cookie.path,
+            'expires': cookie.expires,
+            'secure': cookie.secure,
+            'rest': dict(getattr(cookie, '_rest', {}))
+        } for cookie in jar]
+        data = {'username': username, 'saved_at': time.time(), 'cookies': cookies}
+        with self._lock:
+            try:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                tmp_path = f"{self.path}.tmp"
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(data, f, ensure_ascii=False, indent=1)
+                os.replace(tmp_path, self.path)
+            except IOError as e:
+                logger.warning(f"保存登录信息失败 {self.path}: {e}")
+
+    def clear(self):
+        with self._lock:
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.warning(f"删除已保存的登录信息失败 {self.path}: {e}")
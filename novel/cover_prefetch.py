@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import concurrent.futures
+import logging
+import os
+from threading import Lock
+
+DEFAULT_COVER_WORKERS = 4
+
+logger = logging.getLogger(__name__)
+
+
+class CoverPrefetcher:
+    """
+    搜索结果封面的后台下载池。
+
+    搜索结果先返回给调用方，封面在后台线程中下载，每下载完一张就回调一次；
+    同一封面URL只下载一次，重复提交时复用进行中的任务。
+    也用于在后台预先加载下一页搜索结果。
+    """
+
+    def __init__(self, download_func, max_workers=DEFAULT_COVER_WORKERS):
+        self.download_func = download_func  # (image_url, novel_id) -> 本地路径，失败返回 None
+        self._lock = Lock()
+        self._futures = {}  # 封面URL或预加载页面URL -> Future
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=max(1, int(max_workers)), thread_name_prefix='cover'
+        )
+
+    def prefetch(self, novels, callback=None):
+        """
+        在后台下载一组搜索结果的封面。
+        下载完成后写入 novel['cover_image_path']，并调用 callback(novel_id, cover_path)。
+        """
+        for novel_info in novels:
+            image_url = novel_info.get('cover_image_url')
+            cover_path = novel_info.get('cover_image_path')
+            if not image_url or (cover_path and os.path.exists(cover_path)):
+                continue
+            novel_info['cover_image_path'] = None
+            future = self._submit(image_url, self.download_func, image_url, novel_info['id'])
+            if future is not None:
+                future.add_done_callback(
+                    lambda f, novel_info=novel_info: self._on_cover_done(f, novel_info, callback)
+                )
+
+    def warm(self, key, func, *args):
+        """在后台执行一次预加载任务 (如下一页搜索结果)，同一 key 只执行一次"""
+        self._submit(key, func, *args)
+
+    def _submit(self, key, func, *args):
+        with self._lock:
+            future = self._futures.get(key)
+            if future is not None and not (future.done() and (future.cancelled() or future.exception() or not future.result())):
+                return future  # 进行中或已成功；失败的任务允许重新提交
+            try:
+                future = self._executor.submit(func, *args)
+            except RuntimeError:  # 已关闭
+                return None
+            self._futures[key] = future
+            return future
+
+    def _on_cover_done(self, future, novel_info, callback):
+        if future.cancelled():
+            return
+        try:
+            cover_path = future.result()
+        except Exception as e:
+            logger.warning(f"后台下载封面失败 {novel_info.get('cover_image_url')}: {e}")
+            return
+        if not cover_path:
+            return
+        novel_info['cover_image_path'] = cover_path
+        if callback:
+            try:
+                callback(novel_info['id'], cover_path)
+            except Exception as e:
+                logger.warning(f"封面回调出错: {e}")
+
+    def forget(self):
+        """清空已完成任务的记录 (如封面缓存目录被清除后)"""
+        with self._lock:
+            self._futures = {key: future for key, future in self._futures.items() if not future.done()}
+
+    def shutdown(self):
+        """取消尚未开始的任务，不等待正在进行的下载"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
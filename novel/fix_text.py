@@ -1,65 +1,177 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+"""
+章节文本规范化。
+
+normalize_lines 逐行处理文本，下载章节时在写入文件的同时完成规范化，不再需要下载后重新读写一遍:
+    - 字符串形式的 \\n / \\r\\n / \\r 还原为换行，统一换行符
+    - 连续多个空行压缩为一个
+    - 只包含数字的行和 "第X章/节" 开头的行视为小标题，前后各留一个空行
+
+fix_all_txt_files 用于处理已有的文本库 (如旧版本下载的文件)：按修改时间、大小和内容哈希
+只处理自上次处理后有变化的文件，内容无需修改时不重写；文件较多时使用多进程。
+    python -m novel.fix_text <目录> [--workers N]
+"""
+
+import argparse
+import concurrent.futures
+import hashlib
+import json
 import os
 import re
 
+STATE_FILENAME = '.fix_text_state.json'
+PROCESS_POOL_THRESHOLD = 64  # 待处理文件超过该数量时使用多进程
+
+_ESCAPED_NEWLINES = (('\\r\\n', '\n'), ('\\n', '\n'), ('\\r', '\n'))
+_HEADING = re.compile(r'(?:[０-９0-9]+|第[０-９0-9一二三四五六七八九十百千]+[章节].*)$')
+
+
+def normalize_lines(lines):
+    """
+    规范化文本行，逐行产出结果 (不含换行符)。
+    lines: 任意可迭代的文本行，可以带或不带行尾换行符
+    """
+    started = False
+    need_blank = False
+    for raw_line in lines:
+        if '\\' in raw_line:
+            for escaped, newline in _ESCAPED_NEWLINES:
+                raw_line = raw_line.replace(escaped, newline)
+        for line in raw_line.splitlines() or ['']:
+            if not line.strip():
+                need_blank = started
+                continue
+            is_heading = bool(_HEADING.match(line))
+            if started and (need_blank or is_heading):
+                yield ''
+            yield line
+            started = True
+            need_blank = is_heading
+
+
+def normalize_text(text):
+    """规范化整段文本"""
+    return '\n'.join(normalize_lines(text.splitlines()))
+
+
+def _fix_file(file_path, known_sha256=None):
+    """
+    规范化单个文件，内容有变化时才写回。
+    known_sha256: 上次处理后的内容哈希，与当前内容一致时不再处理 (仅修改时间变化)
+    返回 (是否修改, mtime, 大小, 内容哈希)；可在子进程中运行，不打印。
+    """
+    with open(file_path, 'r', encoding='utf-8') as f:
+        content = f.read()
+    digest = hashlib.sha256(content.encode('utf-8')).hexdigest()
+    if digest == known_sha256:
+        stat = os.stat(file_path)
+        return False, stat.st_mtime, stat.st_size, digest
+    fixed = normalize_text(content)
+    changed = fixed != content
+    if changed:
+        tmp_path = f"{file_path}.part"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(fixed)
+        os.replace(tmp_path, file_path)
+    stat = os.stat(file_path)
+    return changed, stat.st_mtime, stat.st_size, hashlib.sha256(fixed.encode('utf-8')).hexdigest()
+
+
 def fix_txt_file(file_path):
     """修复单个txt文件中的换行符问题"""
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-        # 修复字符串形式的换行符
-        content = content.replace('\\n', '\n')
-        content = content.replace('\\r\\n', '\n')
-        content = content.replace('\\r', '\n')
-        
-        # 标准化换行符
-        content = content.replace('\r\n', '\n').replace('\r', '\n')
-        
-        # 压缩多个连续空行为最多两个换行符
-        content = re.sub(r'\n{3,}', '\n\n', content)
-        
-        # 处理章节标记，为它们添加适当的间距
-        # 识别只包含数字的行作为章节标题（包括全角和半角数字）
-        content = re.sub(r'\n([０-９0-9]+)\n', r'\n\n\1\n\n', content)
-        
-        # 识别"第X章/节"等格式的章节标题
-        content = re.sub(r'\n(第[０-９0-9一二三四五六七八九十百千]+[章节].*?)\n', r'\n\n\1\n\n', content)
-        
-        # 写回文件
-        with open(file_path, 'w', encoding='utf-8') as f:
-            f.write(content)
-        
-        print(f"已修复: {file_path}")
+        changed = _fix_file(file_path)[0]
+        print(f"已修复: {file_path}" if changed else f"无需修复: {file_path}")
         return True
-        
     except Exception as e:
         print(f"修复失败 {file_path}: {e}")
         return False
 
-def fix_all_txt_files(directory):
-    """修复目录下所有txt文件"""
-    fixed_count = 0
+
+def _load_state(directory):
+    path = os.path.join(directory, STATE_FILENAME)
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (IOError, ValueError):
+        return {}
+
+
+def _save_state(directory, state):
+    path = os.path.join(directory, STATE_FILENAME)
+    try:
+        with open(f"{path}.tmp", 'w', encoding='utf-8') as f:
+            json.dump(state, f, ensure_ascii=False, indent=1)
+        os.replace(f"{path}.tmp", path)
+    except IOError as e:
+        print(f"保存修复记录失败 {path}: {e}")
+
+
+def fix_all_txt_files(directory, workers=None):
+    """
+    修复目录下所有txt文件。
+    修改时间和大小与上次记录 (目录下的 .fix_text_state.json) 一致的文件直接跳过，
+    内容哈希与记录一致的文件只更新记录；
+    workers: 进程数，默认按CPU核数；为 1 时在当前进程中处理
+    """
+    state = _load_state(directory)
+    pending = []
     total_count = 0
-    
     for root, dirs, files in os.walk(directory):
         for file in files:
-            if file.lower().endswith('.txt'):
-                file_path = os.path.join(root, file)
-                total_count += 1
-                if fix_txt_file(file_path):
-                    fixed_count += 1
-    
-    print(f"\n修复完成: {fixed_count}/{total_count} 个文件")
+            if not file.lower().endswith('.txt'):
+                continue
+            total_count += 1
+            file_path = os.path.join(root, file)
+            key = os.path.relpath(file_path, directory)
+            stat = os.stat(file_path)
+            record = state.get(key)
+            if record and record.get('mtime') == stat.st_mtime and record.get('size') == stat.st_size:
+                continue
+            pending.append((key, file_path, (record or {}).get('sha256')))
+
+    fixed_count = 0
+    failed_count = 0
+    if len(pending) >= PROCESS_POOL_THRESHOLD and workers != 1:
+        executor = concurrent.futures.ProcessPoolExecutor(max_workers=workers)
+    else:
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+    with executor:
+        future_to_key = {
+            executor.submit(_fix_file, file_path, known_sha256): (key, file_path)
+            for key, file_path, known_sha256 in pending
+        }
+        for future in concurrent.futures.as_completed(future_to_key):
+            key, file_path = future_to_key[future]
+            try:
+                changed, mtime, size, digest = future.result()
+            except Exception as e:
+                print(f"修复失败 {file_path}: {e}")
+                failed_count += 1
+                continue
+            if changed:
+                fixed_count += 1
+                print(f"已修复: {file_path}")
+            state[key] = {'mtime': mtime, 'size': size, 'sha256': digest}
+
+    # 删除已不存在的文件的记录
+    state = {key: record for key, record in state.items() if os.path.exists(os.path.join(directory, key))}
+    _save_state(directory, state)
+    print(f"\n修复完成: 检查 {len(pending)}/{total_count} 个文件，修复 {fixed_count} 个，失败 {failed_count} 个")
+    return fixed_count
+
 
 if __name__ == "__main__":
-    # 使用示例
-    novels_dir = "../novels"  # 替换为你的小说目录
-    
-    if os.path.exists(novels_dir):
-        print(f"开始修复 {novels_dir} 目录下的txt文件...")
-        fix_all_txt_files(novels_dir)
+    parser = argparse.ArgumentParser(description="规范化目录下所有txt文件的换行和小标题间距")
+    parser.add_argument('directory', nargs='?', default="../novels", help="小说目录")
+    parser.add_argument('--workers', type=int, default=None, help="进程数，默认按CPU核数")
+    args = parser.parse_args()
+
+    if os.path.exists(args.directory):
+        print(f"开始修复 {args.directory} 目录下的txt文件...")
+        fix_all_txt_files(args.directory, workers=args.workers)
     else:
-        print(f"目录不存在: {novels_dir}")
-        print("请修改脚本中的 novels_dir 变量为正确的路径")
\ No newline at end of file
+        print(f"目录不存在: {args.directory}")
+        print("请指定正确的小说目录")
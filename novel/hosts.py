@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+站点镜像注册表。
+
+请求按类别 (主站页面、整卷文本下载服务器) 分别登记若干镜像，每次请求选用同类中
+最快的可用镜像；请求超时、连接失败或被拦截的镜像进入冷却期 (连续失败时冷却时间加倍)，
+之后的请求直接换用其他镜像，不再逐个等满超时。后台线程定期探测各镜像的延迟和可用性，
+冷却中的镜像探测成功后立即恢复。
+
+镜像地址只包含协议和主机 (如 https://www.wenku8.net)，请求路径在各镜像间通用。
+"""
+
+import logging
+import threading
+import time
+from threading import Lock
+from urllib.parse import urlsplit
+
+import requests
+
+from novel.block_detection import classify_response, SNIFF_SIZE
+
+PAGES = 'pages'  # 主站页面: 搜索、详情、目录、章节和登录
+PACKS = 'packs'  # 下载服务器: packtxt.php / pack.php 整卷文本
+
+DEFAULT_MIRRORS = {
+    PAGES: ['https://www.wenku8.net', 'https://www.wenku8.cc'],
+    PACKS: ['http://dl.wenku8.com'],
+}
+PROBE_PATHS = {PAGES: '/index.php', PACKS: '/'}
+
+DEFAULT_PROBE_INTERVAL = 120.0  # 后台探测间隔 (秒)
+DEFAULT_PROBE_TIMEOUT = 5.0
+FAILOVER_CONNECT_TIMEOUT = 5.0  # 还有其他镜像可换时，建立连接最多等待的秒数
+UNKNOWN_LATENCY = 1.0           # 尚未测得延迟的镜像按此延迟参与排序
+LATENCY_SMOOTHING = 0.3         # 延迟的指数移动平均系数
+FAILURE_COOLDOWN = 30.0         # 第一次失败后的冷却秒数，连续失败时加倍
+MAX_FAILURE_COOLDOWN = 600.0
+
+logger = logging.getLogger(__name__)
+
+
+def parse_mirrors(text):
+    """把 "https://a.com, https://b.com" 解析为镜像地址列表 (去掉末尾的 /，忽略无效项)"""
+    mirrors = []
+    for item in (text or '').replace(';', ',').split(','):
+        parts = urlsplit(item.strip())
+        if parts.scheme in ('http', 'https') and parts.netloc:
+            base = f"{parts.scheme}://{parts.netloc}".lower()
+            if base not in mirrors:
+                mirrors.append(base)
+    return mirrors
+
+
+def _base_of(url):
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}".lower()
+
+
+def _path_of(url):
+    parts = urlsplit(url)
+    return parts.path + (f"?{parts.query}" if parts.query else '')
+
+
+class MirrorState:
+    """一个镜像的延迟和健康状况 (同一地址出现在多个类别中时共用)"""
+
+    def __init__(self, base):
+        self.base = base
+        self.latency = None       # 秒，指数移动平均
+        self.failures = 0         # 连续失败次数
+        self.down_until = 0.0     # 冷却结束的时间 (time.monotonic)
+        self.last_error = ''
+
+    def healthy(self, now):
+        return now >= self.down_until
+
+    @property
+    def expected_latency(self):
+        return self.latency if self.latency is not None else UNKNOWN_LATENCY
+
+
+class HostRegistry:
+    """
+    按请求类别登记镜像并选择最快的可用镜像，可在多个线程中共用。
+
+        hosts = HostRegistry()
+        url = hosts.url(PAGES, '/book/1.htm')
+        for target in hosts.candidates(url):   # 同一请求在各镜像上的地址，按优先顺序排列
+            ...
+            hosts.report_success(target, elapsed) / hosts.report_failure(target, reason)
+    """
+
+    def __init__(self, mirrors=None, probe_interval=DEFAULT_PROBE_INTERVAL, probe_timeout=DEFAULT_PROBE_TIMEOUT,
+                 probe_paths=None, headers=None):
+        self.probe_interval = probe_interval
+        self.probe_timeout = probe_timeout
+        self.probe_paths = dict(PROBE_PATHS if probe_paths is None else probe_paths)
+        self._lock = Lock()
+        self._classes = {}  # 类别 -> [镜像地址]，按配置顺序
+        self._states = {}   # 镜像地址 -> MirrorState
+        self._probe_session = requests.Session()
+        if headers:
+            self._probe_session.headers.update(headers)
+        self._stop = threading.Event()
+        self._thread = None
+        self.set_mirrors(DEFAULT_MIRRORS if mirrors is None else mirrors)
+
+    def set_mirrors(self, mirrors):
+        """
+        设置各类别的镜像列表 ({类别: [地址, ...]}，地址也可以是逗号分隔的文字)。
+        保留之前已测得的延迟和健康状况；没有提供或没有有效地址的类别不变。
+        """
+        with self._lock:
+            for request_class, bases in mirrors.items():
+                bases = parse_mirrors(bases if isinstance(bases, str) else ','.join(bases))
+                if bases:
+                    self._classes[request_class] = bases
+            in_use = {base for bases in self._classes.values() for base in bases}
+            self._states = {base: self._states.get(base) or MirrorState(base) for base in in_use}
+
+    def class_of(self, url):
+        """url 所属的请求类别 (同一镜像属于多个类别时为先登记的类别)，不是已登记的镜像时返回 None"""
+        base = _base_of(url)
+        with self._lock:
+            for request_class, bases in self._classes.items():
+                if base in bases:
+                    return request_class
+        return None
+
+    def mirrors(self, request_class):
+        with self._lock:
+            return list(self._classes.get(request_class, []))
+
+    def mirrors_by_class(self):
+        with self._lock:
+            return {request_class: list(bases) for request_class, bases in self._classes.items()}
+
+    def ranked(self, request_class):
+        """
+        该类别的镜像按优先顺序排列：可用的镜像按延迟从低到高 (相同时按配置顺序)，
+        冷却中的镜像排在最后 (按冷却结束时间)，所有镜像都不可用时仍可逐个尝试。
+        """
+        now = time.monotonic()
+        with self._lock:
+            bases = self._classes.get(request_class, [])
+            healthy = [(self._states[base].expected_latency, i, base)
+                       for i, base in enumerate(bases) if self._states[base].healthy(now)]
+            cooling = [(self._states[base].down_until, i, base)
+                       for i, base in enumerate(bases) if not self._states[base].healthy(now)]
+        return [base for _, _, base in sorted(healthy) + sorted(cooling)]
+
+    def best(self, request_class):
+        ranked = self.ranked(request_class)
+        return ranked[0] if ranked else None
+
+    def url(self, request_class, path):
+        """
+        在该类别的首选镜像 (配置中的第一个) 上拼接 path (以 / 开头)。
+        地址保持不变，可用作缓存的键；实际请求时由 candidates 按延迟和健康状况选择镜像
+        """
+        mirrors = self.mirrors(request_class)
+        return f"{mirrors[0]}{path}" if mirrors else path
+
+    def candidates(self, url):
+        """同一请求在各镜像上的地址，按优先顺序排列；url 不属于任何已登记的镜像时只有它本身"""
+        request_class = self.class_of(url)
+        if request_class is None:
+            return [url]
+        path = _path_of(url)
+        return [f"{base}{path}" for base in self.ranked(request_class)]
+
+    def _state(self, url):
+        return self._states.get(_base_of(url))
+
+    def report_success(self, url, elapsed=None):
+        """请求成功：清除失败记录，elapsed (秒，到收到响应头为止) 计入延迟"""
+        with self._lock:
+            state = self._state(url)
+            if state is None:
+                return
+            recovered = state.failures > 0
+            state.failures = 0
+            state.down_until = 0.0
+            state.last_error = ''
+            if elapsed is not None:
+                if state.latency is None:
+                    state.latency = elapsed
+                else:
+                    state.latency += LATENCY_SMOOTHING * (elapsed - state.latency)
+        if recovered:
+            logger.info(f"镜像 {state.base} 已恢复")
+
+    def report_failure(self, url, reason=''):
+        """请求超时、连接失败或被拦截：镜像进入冷却期，连续失败时冷却时间加倍"""
+        with self._lock:
+            state = self._state(url)
+            if state is None:
+                return
+            state.failures += 1
+            cooldown = min(MAX_FAILURE_COOLDOWN, FAILURE_COOLDOWN * 2 ** (state.failures - 1))
+            state.down_until = time.monotonic() + cooldown
+            state.last_error = str(reason)
+        logger.warning(f"镜像 {state.base} 不可用 ({reason})，{cooldown:.0f} 秒内优先使用其他镜像")
+
+    def probe(self, base):
+        """探测一个镜像，返回是否可用并记录延迟"""
+        url = f"{base}{self.probe_paths.get(self.class_of(base), '/')}"
+        started = time.monotonic()
+        try:
+            with self._probe_session.get(url, timeout=self.probe_timeout, stream=True) as response:
+                elapsed = time.monotonic() - started
+                body_prefix = next(response.iter_content(SNIFF_SIZE), b'')
+                verdict = classify_response(response.status_code, response.headers, body_prefix)
+        except requests.exceptions.RequestException as e:
+            self.report_failure(base, f"探测失败: {e.__class__.__name__}")
+            return False
+        if verdict.blocked or response.status_code >= 500:
+            self.report_failure(base, f"探测结果: {verdict.value if verdict.blocked else response.status_code}")
+            return False
+        self.report_success(base, elapsed)
+        return True
+
+    def probe_all(self):
+        """探测有多个镜像的类别中的所有镜像 (只有一个镜像时无从选择，不必探测)"""
+        with self._lock:
+            bases = list(dict.fromkeys(base for bases in self._classes.values() if len(bases) > 1 for base in bases))
+        for base in bases:
+            if self._stop.is_set():
+                break
+            self.probe(base)
+
+    def start_probing(self):
+        """启动后台探测线程 (重复调用无效)"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._probe_loop, name='mirror-probe', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _probe_loop(self):
+        while not self._stop.is_set():
+            self.probe_all()
+            self._stop.wait(self.probe_interval)
+
+    def snapshot(self):
+        """返回 {类别: [(地址, 延迟秒数或 None, 是否可用, 最近的错误)]}，按优先顺序"""
+        now = time.monotonic()
+        result = {}
+        for request_class in self.mirrors_by_class():
+            ranked = self.ranked(request_class)
+            with self._lock:
+                states = [self._states[base] for base in ranked if base in self._states]
+                result[request_class] = [(s.base, s.latency, s.healthy(now), s.last_error) for s in states]
+        return result
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+from threading import Lock
+
+from utils import get_app_base_dir
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_BYTES = 200 * 1024 * 1024  # 缓存目录的总大小上限
+PRUNE_TARGET = 0.9  # 写入时超过上限后删除到上限的这一比例，避免之后每次写入都重新清理
+
+_MAX_AGE = re.compile(r'max-age\s*=\s*(\d+)')
+
+
+class HTTPCache:
+    """
+    目录页和章节页的 HTTP 验证缓存。
+
+    保存响应正文及其 ETag / Last-Modified，再次请求同一页面时发送
+    If-None-Match / If-Modified-Since，服务器返回 304 时直接使用本地正文；
+    响应带有 Cache-Control: max-age 且仍在有效期内时不发请求。
+    每个URL对应 <sha1>.json (验证信息) 和 <sha1>.body (原始字节) 两个文件。
+    """
+
+    def __init__(self, cache_dir=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir or os.path.join(get_app_base_dir(), 'novel_cache', 'http')
+        self.max_bytes = max_bytes
+        self._lock = Lock()
+        self._size_lock = Lock()
+        self._total_bytes = 0  # 缓存正文的总大小，由 prune 统计、store 累加
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.reset_stats()
+        self.prune()
+
+    def _paths(self, url):
+        key = hashlib.sha1(url.encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, f"{key}.json"), os.path.join(self.cache_dir, f"{key}.body")
+
+    def _load_meta(self, url):
+        meta_path, body_path = self._paths(url)
+        if not os.path.exists(meta_path) or not os.path.exists(body_path):
+            return None
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (IOError, ValueError):
+            return None
+
+    def _load_body(self, url):
+        try:
+            with open(self._paths(url)[1], 'rb') as f:
+                return f.read()
+        except IOError:
+            return None
+
+    def fresh_body(self, url):
+        """缓存仍在 max-age 有效期内时返回 (正文, 响应头)，否则返回 None"""
+        meta = self._load_meta(url)
+        if not meta or not meta.get('max_age'):
+            return None
+        if time.time() - meta.get('timestamp', 0) > meta['max_age']:
+            return None
+        body = self._load_body(url)
+        if body is None:
+            return None
+        self._count(requests=1, fresh=1, saved=len(body))
+        return body, meta.get('headers', {})
+
+    def conditional_headers(self, url):
+        """返回用于条件请求的请求头；没有缓存时返回空字典"""
+        meta = self._load_meta(url)
+        if not meta:
+            return {}
+        headers = {}
+        if meta.get('etag'):
+            headers['If-None-Match'] = meta['etag']
+        if meta.get('last_modified'):
+            headers['If-Modified-Since'] = meta['last_modified']
+        return headers
+
+    def not_modified(self, url):
+        """服务器返回 304 时读取缓存的 (正文, 响应头)，缓存已丢失时返回 None"""
+        meta = self._load_meta(url)
+        body = self._load_body(url) if meta else None
+        if body is None:
+            return None
+        self._count(requests=1, revalidated=1, saved=len(body))
+        meta['timestamp'] = time.time()  # 重新计算 max-age
+        self._write_meta(url, meta)
+        return body, meta.get('headers', {})
+
+    def store(self, url, status_code, headers, body):
+        """保存带验证信息的 200 响应；没有 ETag / Last-Modified / max-age 的响应只计入统计"""
+        self._count(requests=1, downloaded=len(body))
+        if status_code != 200 or not body:
+            return
+        etag = headers.get('ETag')
+        last_modified = headers.get('Last-Modified')
+        cache_control = headers.get('Cache-Control', '').lower()
+        max_age_match = _MAX_AGE.search(cache_control)
+        if 'no-store' in cache_control or not (etag or last_modified or max_age_match):
+            return
+        meta = {
+            'url': url,
+            'etag': etag,
+            'last_modified': last_modified,
+            'max_age': int(max_age_match.group(1)) if max_age_match and 'no-cache' not in cache_control else 0,
+            'headers': {name: headers[name] for name in ('Content-Type',) if name in headers},
+            'timestamp': time.time()
+        }
+        body_path = self._paths(url)[1]
+        try:
+            old_size = os.path.getsize(body_path) if os.path.exists(body_path) else 0
+            with open(f"{body_path}.part", 'wb') as f:
+                f.write(body)
+            os.replace(f"{body_path}.part", body_path)
+            self._write_meta(url, meta)
+        except (IOError, OSError) as e:
+            logger.warning(f"写入HTTP缓存失败 {url}: {e}")
+            return
+        with self._size_lock:
+            self._total_bytes += len(body) - old_size
+            over_limit = self._total_bytes > self.max_bytes
+        if over_limit:
+            self.prune(int(self.max_bytes * PRUNE_TARGET))
+
+    def _write_meta(self, url, meta):
+        meta_path = self._paths(url)[0]
+        try:
+            with open(f"{meta_path}.tmp", 'w', encoding='utf-8') as f:
+                json.dump(meta, f, ensure_ascii=False)
+            os.replace(f"{meta_path}.tmp", meta_path)
+        except IOError as e:
+            logger.warning(f"写入HTTP缓存失败 {url}: {e}")
+
+    def prune(self, target=None):
+        """缓存总大小超过上限时，删除最久未更新的页面，直到不超过 target (默认为上限)"""
+        target = self.max_bytes if target is None else target
+        entries = []
+        total = 0
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith('.body'):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, name[:-len('.body')]))
+            total += stat.st_size
+        entries.sort()
+        for _, size, key in entries:
+            if total <= target:
+                break
+            for suffix in ('.json', '.body'):
+                try:
+                    os.remove(os.path.join(self.cache_dir, key + suffix))
+                except OSError:
+                    pass
+            total -= size
+        with self._size_lock:
+            self._total_bytes = total
+
+    def clear(self):
+        """清空全部HTTP缓存"""
+        for name in os.listdir(self.cache_dir):
+            try:
+                os.remove(os.path.join(self.cache_dir, name))
+            except OSError:
+                pass
+        with self._size_lock:
+            self._total_bytes = 0
+
+    def _count(self, **deltas):
+        with self._lock:
+            for name, delta in deltas.items():
+                self.stats[name] += delta
+
+    def reset_stats(self):
+        with self._lock:
+            self.stats = {'requests': 0, 'revalidated': 0, 'fresh': 0, 'downloaded': 0, 'saved': 0}
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.stats)
+
+    def report(self, since=None):
+        """返回节省流量的统计文字；since 为之前的 snapshot()，用于只统计一次下载"""
+        stats = self.snapshot()
+        if since:
+            stats = {name: value - since.get(name, 0) for name, value in stats.items()}
+        total = stats['downloaded'] + stats['saved']
+        percent = stats['saved'] / total * 100 if total else 0.0
+        return (f"HTTP缓存: {stats['requests']} 次页面请求中 {stats['revalidated']} 次未修改 (304)、"
+                f"{stats['fresh']} 次直接使用本地缓存，下载 {stats['downloaded'] / 1024:.0f} KB，"
+                f"节省 {stats['saved'] / 1024:.0f} KB ({percent:.0f}%)")
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import concurrent.futures
+import logging
+import os
+import shutil
+from collections import OrderedDict
+from threading import Lock
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from novel.block_detection import classify_response
+from novel.progress import ProgressEmitter, LogSubscriber, EventType
+
+DEFAULT_MAX_IMAGE_WORKERS = 6
+CHUNK_SIZE = 64 * 1024
+DOWNLOADED_MEMORY = 256  # 记住最近下载完成的插图数，供之后的章节直接复制
+
+
+class IllustrationFetcher:
+    """
+    章节插图并发下载器。
+
+    使用独立的 Session 和连接池访问图片服务器，不占用文本页面的连接和并发名额，
+    但每张图片仍从共用的限速器 (rate_limiter) 取得令牌，被拦截时同样让限速器退避；
+    同一个图片URL在多个章节中出现时只下载一次，其余位置从已下载的文件复制。
+    """
+
+    def __init__(self, base_session=None, max_workers=DEFAULT_MAX_IMAGE_WORKERS, progress=None, rate_limiter=None):
+        self.session = requests.Session()
+        if base_session is not None:
+            self.session.headers.update(base_session.headers)
+            self.session.cookies = base_session.cookies  # 共用登录后的 Cookie
+        if progress is None:
+            progress = ProgressEmitter()
+            progress.subscribe(LogSubscriber(__name__))
+        self.progress = progress  # 日志和下载字节数以进度事件发出
+        self.rate_limiter = rate_limiter
+        self._lock = Lock()
+        self._futures = {}  # url -> 下载中的 Future，结果为已下载文件的路径，失败为 None
+        self._downloaded = OrderedDict()  # url -> 已下载文件的路径，只保留最近的 DOWNLOADED_MEMORY 个
+        self._executor = None
+        self.configure(max_workers)
+
+    def configure(self, max_workers):
+        """设置同时下载的插图数量"""
+        self.max_workers = max(1, int(max_workers))
+        adapter = HTTPAdapter(pool_connections=self.max_workers, pool_maxsize=self.max_workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        with self._lock:
+            old_executor = self._executor
+            self._executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix='illustration'
+            )
+        if old_executor is not None:
+            old_executor.shutdown(wait=False)
+
+    def _log(self, message, task=None, level=logging.INFO):
+        self.progress.message(message, task=task, level=level, source=__name__)
+
+    def fetch_all(self, items):
+        """
+        并发下载一组插图并等待全部完成。
+        items: [(img_url, img_filepath), ...]
+        返回与 items 顺序一致的布尔值列表
+        """
+        futures = [self._future_for(img_url, img_filepath) for img_url, img_filepath in items]
+        results = []
+        for (img_url, img_filepath), future in zip(items, futures):
+            if future is None:  # 文件已存在
+                results.append(True)
+                continue
+            downloaded_path = future.result()
+            if downloaded_path is None:
+                results.append(False)
+            else:
+                results.append(self._copy_if_needed(downloaded_path, img_filepath))
+        return results
+
+    def _future_for(self, img_url, img_filepath):
+        if os.path.exists(img_filepath) and os.path.getsize(img_filepath) > 0:
+            self._log(f"    ✓ 图片已存在且有效: {os.path.basename(img_filepath)}")
+            return None
+        with self._lock:
+            future = self._futures.get(img_url)
+            if future is not None:
+                return future
+            downloaded_path = self._downloaded.get(img_url)
+            if downloaded_path and os.path.exists(downloaded_path):
+                self._downloaded.move_to_end(img_url)
+                future = concurrent.futures.Future()
+                future.set_result(downloaded_path)
+                return future
+            # 下载线程中发出的事件归属于提交插图的章节所在的任务
+            future = self._executor.submit(self._download, img_url, img_filepath, self.progress.current_task())
+            self._futures[img_url] = future
+        # 在锁外登记：下载已完成时回调会在当前线程中立即执行
+        future.add_done_callback(lambda done, url=img_url: self._forget(url, done))
+        return future
+
+    def _forget(self, img_url, future):
+        """下载结束后不再保留 Future；成功时记住文件路径，失败时之后可以重试"""
+        downloaded_path = None if future.cancelled() or future.exception() else future.result()
+        with self._lock:
+            if self._futures.get(img_url) is future:
+                del self._futures[img_url]
+            if downloaded_path:
+                self._downloaded[img_url] = downloaded_path
+                self._downloaded.move_to_end(img_url)
+                while len(self._downloaded) > DOWNLOADED_MEMORY:
+                    self._downloaded.popitem(last=False)
+
+    def _copy_if_needed(self, downloaded_path, img_filepath):
+        """同一插图出现在多个章节时，从已下载的文件复制"""
+        if os.path.abspath(downloaded_path) == os.path.abspath(img_filepath):
+            return True
+        if os.path.exists(img_filepath) and os.path.getsize(img_filepath) > 0:
+            return True
+        tmp_path = f"{img_filepath}.part"
+        try:
+            shutil.copyfile(downloaded_path, tmp_path)
+            os.replace(tmp_path, img_filepath)
+            self._log(f"    ✓ 图片已下载过，直接复制: {os.path.basename(img_filepath)}")
+            return True
+        except OSError as e:
+            self._log(f"    ✗ 复制图片失败 {img_filepath}: {e}", level=logging.WARNING)
+            return False
+
+    def _download(self, img_url, img_filepath, task=None):
+        """下载单张插图，先写入 .part 文件，完整下载后再改名；返回文件路径，失败返回 None"""
+        img_filename = os.path.basename(img_filepath)
+        tmp_path = f"{img_filepath}.part"
+        try:
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire()
+            with self.session.get(img_url, stream=True, timeout=30) as img_response:
+                verdict = classify_response(img_response.status_code, img_response.headers)
+                if self.rate_limiter is not None:
+                    if verdict.blocked:
+                        self.rate_limiter.on_throttle(verdict.value)
+                    else:
+                        self.rate_limiter.on_success()
+                if verdict.blocked:
+                    self.progress.emit(EventType.BLOCKED, value=verdict.value, task=task)
+                    self._log(f"    ✗ 下载图片被拦截 ({verdict.value}): {img_url}", task=task, level=logging.WARNING)
+                    return None
+                img_response.raise_for_status()
+                received = 0
+                with open(tmp_path, 'wb') as f_img:
+                    for chunk in img_response.iter_content(chunk_size=CHUNK_SIZE):
+                        f_img.write(chunk)
+                        received += len(chunk)
+                self.progress.emit(EventType.BYTES_RECEIVED, value=received, task=task)
+
+            if os.path.getsize(tmp_path) > 0:
+                os.replace(tmp_path, img_filepath)
+                self._log(f"    ✓ 图片下载成功: {img_filename}", task=task)
+                return img_filepath
+            self._log(f"    ✗ 图片下载后文件无效或为0字节: {img_filename}", task=task, level=logging.WARNING)
+        except requests.exceptions.Timeout:
+            self._log(f"    ✗ 下载图片超时: {img_url}", task=task, level=logging.WARNING)
+        except requests.exceptions.RequestException as req_e:
+            self._log(f"    ✗ 下载图片网络请求失败 {img_url}: {req_e}", task=task, level=logging.WARNING)
+        except IOError as io_e:
+            self._log(f"    ✗ 保存图片文件失败 {img_filename}: {io_e}", task=task, level=logging.WARNING)
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return None
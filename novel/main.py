@@ -3,43 +3,310 @@
 
 import requests
 from bs4 import BeautifulSoup
+import logging
 import os
 import re
 import time
-from urllib.parse import urljoin, quote
+from urllib.parse import urljoin, quote, urlparse
 import concurrent.futures
-from threading import Lock
-from novel.fix_text import fix_all_txt_files
+from contextlib import contextmanager
+from threading import Lock, BoundedSemaphore
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from novel.metadata_cache import MetadataCache, DEFAULT_TTL as METADATA_CACHE_TTL
+from novel.search_cache import SearchCache, DEFAULT_SEARCH_TTL, DEFAULT_MAX_ENTRIES as SEARCH_CACHE_MAX_ENTRIES
+from novel.rate_limiter import AdaptiveRateLimiter, DEFAULT_MAX_RATE
+from novel.manifest import VolumeManifest
+from novel.volume_text import save_chapter_text, pending_chapters, save_volume_text
+from novel.image_fetcher import IllustrationFetcher, DEFAULT_MAX_IMAGE_WORKERS
+from novel.cover_prefetch import CoverPrefetcher
+from novel.http_cache import HTTPCache
+from novel.cookie_store import CookieStore
+from novel.progress import ProgressEmitter, LogSubscriber, EventType
+from novel.parsing import (parse_search_results, parse_novel_details, parse_chapter_list,
+                           extract_chapter_content, clean_chapter_text, safe_chapter_filename,
+                           image_extension)
+from novel.block_detection import BlockVerdict, classify_response, SNIFF_SIZE
+from novel.hosts import HostRegistry, PAGES, PACKS, FAILOVER_CONNECT_TIMEOUT
 from utils import get_app_base_dir
+import log_pipeline
+
+logger = logging.getLogger(__name__)
+
+LOGIN_PROBE_PATH = '/userdetail.php'  # 未登录时会跳转到登录页
+DEFAULT_REQUEST_TIMEOUT = 20  # 调用方没有指定超时的请求 (秒)
 
 class Wenku8Downloader:
-    def __init__(self, username='2497360927', password='testtest'):
-        self.base_url = 'https://www.wenku8.net/book/'
+    def __init__(self, username='2497360927', password='testtest', max_workers=4, max_connections_per_host=4,
+                 metadata_cache_ttl=METADATA_CACHE_TTL, max_requests_per_second=DEFAULT_MAX_RATE,
+                 max_image_workers=DEFAULT_MAX_IMAGE_WORKERS, search_cache_ttl=DEFAULT_SEARCH_TTL,
+                 search_cache_max_entries=SEARCH_CACHE_MAX_ENTRIES, bulk_volume_mode=True, mirrors=None):
+        # 主站页面和整卷文本下载服务器的镜像，请求自动选用最快的可用镜像并在失败时切换 (见 novel.hosts)
+        self.hosts = HostRegistry(mirrors)
+        self.request_timeout = DEFAULT_REQUEST_TIMEOUT
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
             'Referer': 'https://www.wenku8.net/',
             'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8' # Added Accept-Language
         })
-        self.print_lock = Lock()
-        self.search_cache = {}  # Cache for search results
+        # 下载进度以事件形式发出 (见 novel.progress)，日志只是其中一个订阅者
+        self.progress = ProgressEmitter()
+        self.progress.subscribe(LogSubscriber(__name__))
+        # 并发设置: max_workers 为章节下载线程数, max_connections_per_host 为每个主机同时进行的请求上限
+        self._host_semaphores = {}
+        self._host_semaphores_lock = Lock()
+        self.configure_concurrency(max_workers, max_connections_per_host)
+        # 所有请求共享的自适应限速器，取代原先固定的等待时间
+        self.rate_limiter = AdaptiveRateLimiter(max_rate=max_requests_per_second)
+        self.last_block_verdict = BlockVerdict.OK  # 最近一次请求的拦截判定
+        # 插图使用独立的连接池和并发上限，同一图片在多个章节中只下载一次
+        self.illustration_fetcher = IllustrationFetcher(self.session, max_image_workers, self.progress,
+                                                       rate_limiter=self.rate_limiter)
+        # 搜索结果的磁盘缓存 (SQLite)，按最近使用淘汰，重启后仍然有效
+        self.search_cache = SearchCache(max_entries=search_cache_max_entries, ttl=search_cache_ttl)
+        self._manifests = {}  # 卷目录 -> VolumeManifest
+        self._manifests_lock = Lock()
+        self.metadata_cache = MetadataCache(ttl=metadata_cache_ttl)  # 详情页和目录页的磁盘缓存
+        self.http_cache = HTTPCache()  # 目录页和章节页的 ETag / Last-Modified 验证缓存
+        self.bulk_volume_mode = bulk_volume_mode  # 先用一次请求获取整卷文本，只有无法切分的章节才逐章下载
         self.cover_cache_dir = os.path.join(get_app_base_dir(), 'novel_cache', 'covers')
         os.makedirs(self.cover_cache_dir, exist_ok=True)
+        # 搜索结果的封面和下一页在后台下载，搜索本身立即返回
+        self.cover_prefetcher = CoverPrefetcher(self._download_image)
+        # 多本小说同时下载时由界面设置共用的 ChapterBudget (见 novel.scheduler)，章节下载前先申请名额
+        self.chapter_budget = None
+        
+        # 登录推迟到第一次访问主站时进行 (见 ensure_login)，构造时不发出任何请求；
+        # 保存的 Cookie 有效时只需一次验证请求，无需重新登录
+        self.username = username if username else '2497360927'
+        self.password = password if password else 'testtest'
+        self.cookie_store = CookieStore()
+        self._login_lock = Lock()
+        self._login_state = None  # None: 尚未登录, True: 已登录, False: 登录失败
+        if self.cookie_store.load(self.session.cookies, self.username):
+            self._log("已载入保存的登录信息，首次请求时验证是否仍然有效")
         
-        # 尝试登录
-        username_to_use = username if username else '2497360927'
-        password_to_use = password if password else 'testtest'
+    def _log(self, message, level=logging.INFO):
+        """输出日志文字 (作为 MESSAGE 事件发给所有订阅者)"""
+        self.progress.message(message, level=level, source=__name__)
+
+    def configure_concurrency(self, max_workers, max_connections_per_host=None):
+        """设置章节并发数和每个主机的最大并发请求数"""
+        self.max_workers = max(1, int(max_workers))
+        if max_connections_per_host is None:
+            max_connections_per_host = self.max_workers
+        self.max_connections_per_host = max(1, int(max_connections_per_host))
+
+        # 连接池大小需不小于并发数，否则 urllib3 会丢弃多余的连接
+        pool_size = max(self.max_workers, self.max_connections_per_host)
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        # 旧的信号量由正在进行的请求自行释放，新请求使用新的上限
+        with self._host_semaphores_lock:
+            self._host_semaphores = {}
+
+    @contextmanager
+    def _host_slot(self, url):
+        """占用目标主机的一个并发名额"""
+        host = urlparse(url).netloc
+        with self._host_semaphores_lock:
+            semaphore = self._host_semaphores.get(host)
+            if semaphore is None:
+                semaphore = BoundedSemaphore(self.max_connections_per_host)
+                self._host_semaphores[host] = semaphore
+        with semaphore:
+            yield
+
+    def _get(self, url, revalidate=False, relogin=True, **kwargs):
+        """
+        受主机并发上限和限速器约束的 GET 请求，response.block_verdict 为拦截判定结果
+        revalidate: 使用 HTTP 验证缓存 (目录页和章节页)，页面未修改时返回本地保存的正文
+        relogin: 请求被跳转到登录页 (登录已失效) 时重新登录并重试一次
+        """
+        if self._requires_login(url):
+            self.ensure_login()
+        if revalidate:
+            cached = self.http_cache.fresh_body(url)
+            if cached:
+                return self._cached_response(url, *cached)
+            conditional_headers = self.http_cache.conditional_headers(url)
+            if conditional_headers:
+                kwargs['headers'] = {**kwargs.get('headers', {}), **conditional_headers}
+
+        response = self._send(url, **kwargs)
+
+        if relogin and self._login_state and 'login.php' in response.url and 'login.php' not in url:
+            self._log("登录已失效，重新登录...")
+            self.ensure_login(force=True)
+            kwargs.pop('headers', None)
+            return self._get(url, revalidate=revalidate, relogin=False, **kwargs)
+
+        if revalidate and response.status_code == 304:
+            cached = self.http_cache.not_modified(url)
+            if cached:
+                self._report_verdict(BlockVerdict.OK)
+                return self._cached_response(url, *cached, response=response)
+            # 本地正文已丢失，重新完整请求一次
+            kwargs.pop('headers', None)
+            return self._get(url, **kwargs)
+
+        self.progress.emit(EventType.BYTES_RECEIVED, value=len(response.content))
+        self._report_verdict(response.block_verdict)
+        if revalidate and not response.block_verdict.blocked:
+            self.http_cache.store(url, response.status_code, response.headers, response.content)
+        return response
+
+    def _send(self, url, method='GET', **kwargs):
+        """
+        按镜像的优先顺序发送请求 (默认 GET)：超时、连接失败或被拦截时换用同类的下一个镜像，
+        最后一个镜像仍失败时返回其响应或抛出其异常。response.block_verdict 为拦截判定结果
+        """
+        kwargs.setdefault('timeout', self.request_timeout)
+        targets = self.hosts.candidates(url)
+        for i, target in enumerate(targets):
+            has_fallback = i + 1 < len(targets)
+            request_kwargs = dict(kwargs)
+            timeout = kwargs.get('timeout')
+            if has_fallback and isinstance(timeout, (int, float)):
+                # 还有其他镜像可换时不必等满整个超时才发现连接不上
+                request_kwargs['timeout'] = (min(FAILOVER_CONNECT_TIMEOUT, timeout), timeout)
+            if self.hosts.class_of(target) == PAGES:
+                self._share_login_cookies(target)
+            self.rate_limiter.acquire()
+            try:
+                with self._host_slot(target):
+                    response = self.session.request(method, target, **request_kwargs)
+            except (requests.exceptions.Timeout, requests.exceptions.ConnectionError) as e:
+                self.hosts.report_failure(target, e.__class__.__name__)
+                if not has_fallback:
+                    raise
+                self._log(f"请求失败 ({e.__class__.__name__})，改用镜像 {urlparse(targets[i + 1]).netloc}: {target}",
+                          logging.WARNING)
+                continue
+            response.block_verdict = classify_response(
+                response.status_code, response.headers, response.content[:SNIFF_SIZE]
+            )
+            if not response.block_verdict.blocked:
+                self.hosts.report_success(target, response.elapsed.total_seconds())
+                return response
+            self.hosts.report_failure(target, response.block_verdict.value)
+            if not has_fallback:
+                return response
+            # 换用下一个镜像前先让限速器退避，不以全速访问新的镜像 (最终响应的判定由调用方报告)
+            self._report_verdict(response.block_verdict)
+            self._log(f"请求被拦截 ({response.block_verdict.value})，改用镜像 {urlparse(targets[i + 1]).netloc}: {target}",
+                      logging.WARNING)
+
+    def _share_login_cookies(self, url):
+        """登录 Cookie 只属于登录时所用镜像的域名，换用其他主站镜像前复制一份给该镜像"""
+        hostname = urlparse(url).hostname
+        jar = self.session.cookies
+
+        def matches(cookie, host):
+            domain = cookie.domain.lstrip('.')
+            return host == domain or host.endswith('.' + domain)
+
+        if any(matches(cookie, hostname) for cookie in jar):
+            return
+        mirror_hosts = {urlparse(base).hostname for base in self.hosts.mirrors(PAGES)} - {hostname}
+        for cookie in list(jar):
+            if any(matches(cookie, host) for host in mirror_hosts):
+                jar.set(cookie.name, cookie.value, domain=hostname, path=cookie.path)
+
+    @staticmethod
+    def _cached_response(url, body, headers, response=None):
+        """用HTTP缓存中的正文构造 (或替换 304 响应为) 普通的 200 响应"""
+        if response is None:
+            response = requests.Response()
+            response.url = url
+            response.headers = CaseInsensitiveDict()
+        response.status_code = 200
+        response.headers.update(headers)
+        response._content = body
+        response.block_verdict = BlockVerdict.OK
+        return response
+
+    @contextmanager
+    def _stream(self, url, **kwargs):
+        """流式 GET (用于图片)，读取正文期间一直占用主机并发名额"""
+        self.rate_limiter.acquire()
+        with self._host_slot(url):
+            response = self.session.get(url, stream=True, **kwargs)
+            try:
+                response.block_verdict = classify_response(response.status_code, response.headers)
+                self._report_verdict(response.block_verdict)
+                yield response
+            finally:
+                response.close()
 
-        if username_to_use and password_to_use:
-            if not self.login(username_to_use, password_to_use):
-                print("登录失败，后续操作可能无法正常进行。")
+    def _report_verdict(self, verdict):
+        """根据拦截判定调整限速器：被拦截时退避，其余视为正常"""
+        self.last_block_verdict = verdict
+        if verdict.blocked:
+            self.progress.emit(EventType.BLOCKED, value=verdict.value)
+            self.rate_limiter.on_throttle(verdict.value)
         else:
-            print("未提供用户名和密码，将尝试以未登录状态访问。")
-        
+            self.rate_limiter.on_success()
+
+    def _requires_login(self, url):
+        """访问主站页面前需要登录 (下载服务器和图片服务器不需要)"""
+        return self.hosts.class_of(url) == PAGES
+
+    @property
+    def logged_in(self):
+        return bool(self._login_state)
+
+    def ensure_login(self, force=False):
+        """
+        确保已登录，多个线程同时调用时只登录一次。
+        先用保存的 Cookie 访问账号页面验证，无效时再提交登录；登录失败后不再自动重试，
+        force=True 时忽略之前的结果重新验证并登录。返回是否已登录。
+        """
+        if self._login_state is not None and not force:
+            return self._login_state
+        with self._login_lock:
+            if self._login_state is not None and not force:
+                return self._login_state
+            if not force and len(self.session.cookies) and self._probe_login():
+                self._log("保存的登录信息仍然有效，无需重新登录")
+                self._login_state = True
+            elif self.username and self.password:
+                self._login_state = self.login(self.username, self.password)
+                if not self._login_state:
+                    self._log("登录失败，后续操作可能无法正常进行。")
+            else:
+                self._log("未提供用户名和密码，将尝试以未登录状态访问。")
+                self._login_state = False
+            if self._login_state:
+                self.save_cookies()
+            return self._login_state
+
+    def _probe_login(self):
+        """用一次账号页面请求验证当前 Cookie 是否仍处于登录状态"""
+        try:
+            response = self._send(self.hosts.url(PAGES, LOGIN_PROBE_PATH), timeout=15)
+        except requests.exceptions.RequestException as e:
+            self._log(f"验证登录状态失败: {e}")
+            return False
+        self._report_verdict(response.block_verdict)
+        if response.block_verdict.blocked or response.status_code != 200 or 'login.php' in response.url:
+            return False
+        response.encoding = 'gbk'
+        return '用户登录' not in response.text
+
+    def save_cookies(self):
+        """保存当前会话的 Cookie (包括 Cloudflare 验证 Cookie)，下次启动时复用"""
+        self.cookie_store.save(self.session.cookies, self.username)
+
     def login(self, username, password):
         """用户登录"""
-        login_url = 'https://www.wenku8.net/login.php?do=submit'
-        jumpurl = quote('https://www.wenku8.net/index.php') 
+        # 在当前最快的主站镜像上登录，换用其他镜像时由 _share_login_cookies 复制登录 Cookie
+        site_url = self.hosts.best(PAGES)
+        login_url = f'{site_url}/login.php?do=submit'
+        jumpurl = quote(f'{site_url}/index.php')
         login_url_with_jump = f"{login_url}&jumpurl={jumpurl}"
 
         login_data = {
@@ -52,39 +319,37 @@ class Wenku8Downloader:
         
         headers = {
             'Content-Type': 'application/x-www-form-urlencoded',
-            'Referer': 'https://www.wenku8.net/login.php'
+            'Referer': f'{site_url}/login.php'
         }
         
         try:
-            with self.print_lock:
-                print(f"尝试登录用户: {username}...")
-            response = self.session.post(login_url_with_jump, data=login_data, headers=headers)
+            self._log(f"尝试登录用户: {username}...")
+            # 与其他请求一样经过限速器、拦截判定和镜像切换
+            response = self._send(login_url_with_jump, method='POST', data=login_data, headers=headers)
+            self._report_verdict(response.block_verdict)
+            if response.block_verdict.blocked:
+                self._log(f"登录请求被拦截 ({response.block_verdict.value})")
+                return False
             response.encoding = 'gbk'
             
             if "<title>登录成功</title>" in response.text and "欢迎您到来！" in response.text:
-                with self.print_lock:
-                    print("登录成功!")
+                self._log("登录成功!")
                 return True
             elif response.url == jumpurl.replace('%3A', ':').replace('%2F', '/'):
-                with self.print_lock:
-                    print("登录成功 (通过URL跳转判断)! ")
+                self._log("登录成功 (通过URL跳转判断)! ")
                 return True
             elif "用户登录" not in response.text and "我的帐号" in response.text:
-                 with self.print_lock:
-                    print("登录成功 (通过页面内容判断)! ")
+                 self._log("登录成功 (通过页面内容判断)! ")
                  return True
             else:
-                with self.print_lock:
-                    print("登录失败。响应URL:", response.url)
+                self._log(f"登录失败。响应URL: {response.url}")
                 soup = BeautifulSoup(response.text, 'html.parser')
                 error_msg = soup.select_one('div[style*="color:red"]')
                 if error_msg:
-                    with self.print_lock:
-                        print(f"登录错误信息: {error_msg.get_text().strip()}")
+                    self._log(f"登录错误信息: {error_msg.get_text().strip()}")
                 return False
         except Exception as e:
-            with self.print_lock:
-                print(f"登录请求发生错误: {e}")
+            self._log(f"登录请求发生错误: {e}")
             return False
     
     def _download_image(self, image_url, novel_id):
@@ -102,517 +367,203 @@ class Wenku8Downloader:
             local_path = os.path.join(self.cover_cache_dir, local_filename)
 
             if os.path.exists(local_path):
-                with self.print_lock:
-                    print(f"封面图片已存在于缓存: {local_path}")
+                self._log(f"封面图片已存在于缓存: {local_path}")
                 return local_path
 
-            with self.print_lock:
-                print(f"正在下载封面图片: {image_url} 到 {local_path}")
-            
-            img_response = self.session.get(image_url, stream=True, timeout=10)
-            img_response.raise_for_status()
+            self._log(f"正在下载封面图片: {image_url} 到 {local_path}")
             
-            with open(local_path, 'wb') as f:
-                for chunk in img_response.iter_content(chunk_size=8192):
-                    f.write(chunk)
+            with self._stream(image_url, timeout=10) as img_response:
+                if img_response.block_verdict.blocked:
+                    self._log(f"下载封面图片被拦截 ({img_response.block_verdict.value}): {image_url}")
+                    return None
+                img_response.raise_for_status()
+                
+                # 先写入 .part 再改名，界面不会读到下载了一半的封面
+                with open(f"{local_path}.part", 'wb') as f:
+                    for chunk in img_response.iter_content(chunk_size=8192):
+                        f.write(chunk)
+            os.replace(f"{local_path}.part", local_path)
             
-            with self.print_lock:
-                print(f"封面图片下载成功: {local_path}")
+            self._log(f"封面图片下载成功: {local_path}")
             return local_path
         except requests.exceptions.RequestException as e:
-            with self.print_lock:
-                print(f"下载封面图片失败 {image_url}: {e}")
+            self._log(f"下载封面图片失败 {image_url}: {e}")
             return None
         except IOError as e:
-            with self.print_lock:
-                print(f"保存封面图片失败 {local_path}: {e}")
+            self._log(f"保存封面图片失败 {local_path}: {e}")
             return None
 
-    def search_novels(self, keyword=None, search_type='articlename', page_url=None):
+    def _cached_cover_path(self, image_url):
+        """封面已在缓存中时返回本地路径，否则返回 None"""
+        if not image_url:
+            return None
+        local_path = os.path.join(self.cover_cache_dir, image_url.split('/')[-1])
+        return local_path if os.path.exists(local_path) else None
+
+    def search_novels(self, keyword=None, search_type='articlename', page_url=None, on_cover_ready=None,
+                      prefetch_next_page=True):
         """
         搜索小说
         search_type: 'articlename' 按小说名搜索, 'author' 按作者名搜索
         page_url: 用于翻页的完整URL
+        on_cover_ready: 封面在后台下载完成后的回调 on_cover_ready(novel_id, cover_path)
+        prefetch_next_page: 是否在后台预先加载下一页结果及其封面
         Returns a dictionary with 'novels' list and 'pagination_info'.
         Each novel in the list is a dictionary with detailed info.
+        已缓存的封面直接填入 cover_image_path，其余为 None，下载完成后再填入并回调。
         """
         search_url_key = None
 
         if page_url:
             search_url = page_url
             search_url_key = page_url
-            print(f"正在获取搜索结果页面: {search_url}")
+            self._log(f"正在获取搜索结果页面: {search_url}")
         elif keyword:
-            print(f"正在搜索: {keyword} (类型: {search_type})")
+            self._log(f"正在搜索: {keyword} (类型: {search_type})")
             encoded_keyword = quote(keyword.encode('gbk'))
-            search_url = f'https://www.wenku8.net/modules/article/search.php?searchtype={search_type}&searchkey={encoded_keyword}'
+            search_url = self.hosts.url(
+                PAGES, f'/modules/article/search.php?searchtype={search_type}&searchkey={encoded_keyword}'
+            )
             search_url_key = search_url
         else:
-            print("错误：必须提供搜索关键词或页面URL")
+            self._log("错误：必须提供搜索关键词或页面URL")
             return {'novels': [], 'pagination_info': None}
 
         # Check cache first
-        if search_url_key in self.search_cache:
-            with self.print_lock:
-                print(f"从缓存加载搜索结果: {search_url_key}")
-            return self.search_cache[search_url_key]
+        result = self.search_cache.get(search_url_key)
+        if result is not None:
+            self._log(f"从缓存加载搜索结果: {search_url_key}")
+            for novel_info in result['novels']:
+                if not novel_info.get('cover_image_path'):  # 缓存时封面尚未下载完成
+                    novel_info['cover_image_path'] = self._cached_cover_path(novel_info.get('cover_image_url'))
+            self._prefetch_search_extras(result, on_cover_ready, prefetch_next_page)
+            return result
 
         try:
-            response = self.session.get(search_url)
+            response = self._get(search_url)
+            if response.block_verdict.blocked:
+                self._log(f"搜索请求被拦截 ({response.block_verdict.value})")
+                return {'novels': [], 'pagination_info': None}
             response.encoding = 'gbk'
             # with open('novel/error.html', 'w', encoding='utf-8') as f: # For debugging search page
             #     f.write(response.text)
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            novels = []
-            
-            # Try to select the main table containing search results first for robustness
-            search_result_table = soup.select_one('table.grid')
-            if search_result_table:
-                 novel_entries = search_result_table.select('td > div[style*="width:373px"]')
-            else: # Fallback to original direct selection if table.grid not found
-                 novel_entries = soup.select('td > div[style*="width:373px"]')
-
-            if not novel_entries and '/book/' not in response.url: # Check if not already a direct book page
-                # If no standard entries and not a direct book page, check for "没有找到记录"
-                no_results_msg = soup.find(string=re.compile("没有找到记录"))
-                if no_results_msg:
-                    with self.print_lock:
-                        print("搜索结果: 没有找到记录。")
-                    # Cache empty result for this search to avoid re-fetching
-                    self.search_cache[search_url_key] = {'novels': [], 'pagination_info': None}
-                    return {'novels': [], 'pagination_info': None}
-
-            if not novel_entries:
-                # Handle case where search might redirect to a single book's page
-                if '/book/' in response.url and response.url.endswith('.htm'):
-                    with self.print_lock:
-                        print("搜索可能直接导向了单个小说页面。正在尝试提取基本信息。")
-                    novel_info = {}
-                    novel_id_match = re.search(r'/book/(\d+)\.htm', response.url)
-                    if novel_id_match:
-                        novel_info['id'] = int(novel_id_match.group(1))
-
-                        title_elem = soup.select_one('div#title > h1') or \
-                                     soup.select_one('td span[style*="font-size:16px"] b') or \
-                                     soup.select_one('div#content table[width="90%"] tr > td[colspan="2"] > span > b')
-                        novel_info['name'] = title_elem.get_text().strip() if title_elem else f"Novel {novel_info['id']}"
-                        
-                        cover_elem = soup.select_one('#fmimg img') or \
-                                     soup.select_one('div#content td[width="20%"] img[src*="/image/"]')
-                        if cover_elem and cover_elem.get('src'):
-                            novel_info['cover_image_url'] = urljoin(response.url, cover_elem.get('src'))
-                            novel_info['cover_image_path'] = self._download_image(novel_info['cover_image_url'], novel_info['id'])
-                        else:
-                            novel_info['cover_image_url'] = None
-                            novel_info['cover_image_path'] = None
-                        
-                        # Default other fields for direct hits
-                        defaults = {
-                            'author': '详见小说页面', 'update_date': '详见小说页面', 'word_count': '详见小说页面',
-                            'status': '详见小说页面', 'animated': False, 'tags': [], 'intro': '详见小说页面',
-                        }
-                        for key, default_val in defaults.items():
-                            if key not in novel_info: novel_info[key] = default_val
-                        
-                        novels.append(novel_info)
-                        result = {'novels': novels, 'pagination_info': None}
-                        self.search_cache[search_url_key] = result # Cache this direct hit
-                        return result
-
-            for entry_div in novel_entries:
-                novel_info = {}
-                
-                link_element = entry_div.select_one('b > a[href*="/book/"]')
-                if not link_element:
-                    continue
-                
-                href = link_element.get('href')
-                title_text = link_element.get('title') or link_element.get_text()
-                novel_info['name'] = title_text.strip()
-                
-                novel_id_match = re.search(r'/book/(\d+)\.htm', href)
-                if not novel_id_match:
-                    continue
-                novel_info['id'] = int(novel_id_match.group(1))
-
-                # Cover Image
-                cover_img_element = entry_div.select_one('div[style*="width:95px"] img')
-                if cover_img_element and cover_img_element.get('src'):
-                    novel_info['cover_image_url'] = urljoin(response.url, cover_img_element.get('src'))
-                    novel_info['cover_image_path'] = self._download_image(novel_info['cover_image_url'], novel_info['id'])
-                else:
-                    novel_info['cover_image_url'] = None
-                    novel_info['cover_image_path'] = None
-
-                # Details from <p> tags
-                info_div = entry_div.select_one('div[style*="margin-top:2px"]')
-                if info_div:
-                    paragraphs = info_div.select('p')
-
-                    # Author
-                    if len(paragraphs) > 0:
-                        author_text = paragraphs[0].get_text().strip()
-                        novel_info['author'] = author_text.split('/')[0].replace('作者:', '').strip()
-                    else:
-                        novel_info['author'] = '未知作者'
-
-                    # Update, Word Count, Status, Animated
-                    if len(paragraphs) > 1:
-                        p_status_line = paragraphs[1]
-                        novel_info['animated'] = bool(p_status_line.select_one('span.hottext'))
-
-                        temp_status_soup = BeautifulSoup(str(p_status_line), 'html.parser')
-                        hottext_span = temp_status_soup.select_one('span.hottext')
-                        if hottext_span:
-                            hottext_span.decompose()
-                        status_text_cleaned = temp_status_soup.get_text().strip()
-                        
-                        parts = status_text_cleaned.split('/')
-                        novel_info['update_date'] = parts[0].replace('更新:', '').strip() if len(parts) > 0 else None
-                        novel_info['word_count'] = parts[1].replace('字数:', '').strip() if len(parts) > 1 else None
-                        raw_status = parts[2].strip() if len(parts) > 2 and parts[2].strip() else '未知状态'
-                        # Ensure status doesn't include "已动画化" if it was only in span
-                        novel_info['status'] = raw_status.replace("已动画化", "").strip("/") if novel_info['animated'] else raw_status
+            novels, pagination_info = parse_search_results(response.text, response.url)
 
-                    else:
-                        novel_info['update_date'] = None
-                        novel_info['word_count'] = None
-                        novel_info['status'] = '未知状态'
-                        novel_info['animated'] = False
-                    
-                    # Tags
-                    if len(paragraphs) > 2:
-                        tags_p = paragraphs[2]
-                        tags_span = tags_p.select_one('span')
-                        if tags_span:
-                            novel_info['tags'] = [tag.strip() for tag in tags_span.get_text().strip().split(' ') if tag.strip()]
-                        else: # Fallback if structure is different (e.g. no span)
-                            tag_text_content = tags_p.get_text().replace('Tags:', '').strip()
-                            novel_info['tags'] = [tag.strip() for tag in tag_text_content.split(' ') if tag.strip()] if tag_text_content else []
-                    else:
-                        novel_info['tags'] = []
-                    
-                    # Intro
-                    if len(paragraphs) > 3:
-                        novel_info['intro'] = paragraphs[3].get_text().replace('简介:', '').strip()
-                    else:
-                        novel_info['intro'] = '暂无简介'
-                else: # Fallback if info_div is not found
-                    novel_info.update({
-                        'author': '未知作者', 'update_date': None, 'word_count': None,
-                        'status': '未知状态', 'animated': False, 'tags': [], 'intro': '暂无简介'
-                    })
-                
-                novels.append(novel_info)
-
-            # Parse pagination info
-            pagination_info = {
-                'current_page': 1,
-                'total_pages': 1,
-                'next_page_url': None,
-                'prev_page_url': None,
-                'page_urls': {} # For direct page number access
-            }
-            
-            pages_div = soup.select_one('div.pages div#pagelink, div.pages') # Added div.pages as alternative
-            if pages_div:
-                page_stats_elem = pages_div.select_one('em#pagestats')
-                if page_stats_elem:
-                    stats_text = page_stats_elem.get_text().strip()
-                    page_match = re.match(r'(\d+)/(\d+)', stats_text)
-                    if page_match:
-                        pagination_info['current_page'] = int(page_match.group(1))
-                        pagination_info['total_pages'] = int(page_match.group(2))
-                
-                next_page_link_elem = pages_div.select_one('a.next[href]')
-                if next_page_link_elem:
-                    next_href = next_page_link_elem.get('href')
-                    if next_href:
-                        pagination_info['next_page_url'] = urljoin(response.url, next_href)
-
-                # Previous page link (often uses 'pgroup' for <, 'prev' might be specific)
-                # Using a more general approach for previous link
-                prev_page_link_elem = pages_div.select('a[href*="page="]') 
-                # Find the link that is likely the previous page relative to current
-                current_pg_num = pagination_info['current_page']
-                if current_pg_num > 1:
-                    for plink in prev_page_link_elem:
-                        try:
-                            # Check if it's the direct previous page number or a "<" type link
-                            if f"page={current_pg_num-1}" in plink.get('href') or (plink.get_text(strip=True) == '<' or plink.get_text(strip=True) == '<<'):
-                                # Ensure it's not the current page itself if text is just number
-                                if plink.get_text(strip=True) != str(current_pg_num):
-                                    # Check if the href is not just '#' or javascript:;
-                                    href_val = plink.get('href')
-                                    if href_val and href_val.strip() not in ['#', 'javascript:;']:
-                                        pagination_info['prev_page_url'] = urljoin(response.url, href_val)
-                                        # Prefer the link that explicitly says "page=X-1" if multiple match
-                                        if f"page={current_pg_num-1}" in href_val:
-                                            break 
-                        except:
-                            pass
-
-
-                # Extract all page number links for direct access
-                all_page_links = pages_div.select('a[href*="page="]')
-                for link in all_page_links:
-                    page_num_match = re.search(r'page=(\d+)', link.get('href'))
-                    link_text = link.get_text().strip()
-                    if page_num_match:
-                        try:
-                            pg_num = int(page_num_match.group(1))
-                            if link_text.isdigit() and int(link_text) == pg_num: # Ensure it's a direct page number link
-                                pagination_info['page_urls'][pg_num] = urljoin(response.url, link.get('href'))
-                        except ValueError:
-                            continue # Link text might be '<<', '>>', etc.
+            for novel_info in novels:
+                novel_info['cover_image_path'] = self._cached_cover_path(novel_info.get('cover_image_url'))
+
+            if pagination_info is None: # 没有找到记录或直接命中单本小说
+                result = {'novels': novels, 'pagination_info': None}
+                self.search_cache.set(search_url_key, result)
+                self._prefetch_search_extras(result, on_cover_ready, prefetch_next_page)
+                return result
             
             if not novels and not page_url: # Changed from original to check page_url
-                with self.print_lock:
-                    print("未找到相关小说。")
+                self._log("未找到相关小说。")
 
             result = {'novels': novels, 'pagination_info': pagination_info}
-            self.search_cache[search_url_key] = result # Store in cache
+            self.search_cache.set(search_url_key, result) # Store in cache
+            self._prefetch_search_extras(result, on_cover_ready, prefetch_next_page)
             return result
             
         except requests.exceptions.RequestException as e:
-            with self.print_lock:
-                print(f"搜索请求失败: {e}")
+            self._log(f"搜索请求失败: {e}")
             return {'novels': [], 'pagination_info': None}
         except Exception as e:
-            with self.print_lock:
-                print(f"搜索解析失败: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception(f"搜索解析失败: {e}")
             return {'novels': [], 'pagination_info': None}
     
-    def _is_cloudflare_error(self, text_content):
-        if not text_content:
-            return False
-        
-        # 编译正则表达式以提高效率和实现不区分大小写的匹配
-        error_patterns = [
-            re.compile(r"You are being rate limited", re.IGNORECASE),
-            re.compile(r"Error\\s+1015", re.IGNORECASE), 
-            re.compile(r"Ray ID:", re.IGNORECASE), 
-            re.compile(r"Cloudflare Ray ID:", re.IGNORECASE),
-            re.compile(r"Performance & security by Cloudflare", re.IGNORECASE),
-            re.compile(r"The owner of this website .* has banned you temporarily", re.IGNORECASE),
-            re.compile(r"Please enable cookies", re.IGNORECASE), # 常见于拦截页面
-            re.compile(r"Checking if the site connection is secure", re.IGNORECASE), # Cloudflare的JS挑战页面
-            re.compile(r"why_was_i_blocked", re.IGNORECASE), # Cloudflare拦截页面链接中的常见片段
-            re.compile(r"Enable JavaScript and cookies to continue", re.IGNORECASE) # 另一种JS挑战提示
-        ]
-        for pattern_re in error_patterns:
-            if pattern_re.search(text_content):
-                return True
-        return False
+    def _prefetch_search_extras(self, result, on_cover_ready, prefetch_next_page):
+        """后台下载本页封面；需要时再预加载下一页 (下一页不再继续向后预加载)"""
+        self.cover_prefetcher.prefetch(result['novels'], on_cover_ready)
+        next_page_url = (result.get('pagination_info') or {}).get('next_page_url')
+        if prefetch_next_page and next_page_url and next_page_url not in self.search_cache:
+            self.cover_prefetcher.warm(next_page_url, self._warm_search_page, next_page_url)
 
-    def get_novel_details(self, novel_id):
+    def _warm_search_page(self, page_url):
+        self._log(f"后台预加载下一页搜索结果: {page_url}")
+        self.search_novels(page_url=page_url, prefetch_next_page=False)
+        return page_url
+
+    def invalidate_metadata(self, novel_id=None):
+        """使小说详情和目录缓存失效；novel_id 为 None 时清空全部"""
+        self.metadata_cache.invalidate(novel_id)
+
+    @staticmethod
+    def _novel_id_from_catalog_url(catalog_url):
+        """从目录URL (如 /novel/2/2580/index.htm) 中提取小说ID"""
+        match = re.search(r'/novel/\d+/(\d+)/', catalog_url or '')
+        return int(match.group(1)) if match else None
+
+    def get_novel_details(self, novel_id, use_cache=True):
         """获取小说详细信息"""
-        url = f"{self.base_url}{novel_id}.htm"
+        if use_cache:
+            cached_details = self.metadata_cache.get(novel_id, 'details')
+            if cached_details:
+                self._log(f"从缓存加载小说详情: {novel_id}")
+                return cached_details
+
+        url = self.hosts.url(PAGES, f"/book/{novel_id}.htm")
         
         try:
-            response = self.session.get(url)
+            response = self._get(url)
+            if response.block_verdict.blocked:
+                self._log(f"获取小说详情被拦截 ({response.block_verdict.value})")
+                return None
             response.encoding = 'gbk'
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            title = f"Novel_{novel_id}"
-            title_span = soup.select_one('div#title > h1')
-            if not title_span:
-                title_span = soup.select_one('td span[style*="font-size:16px"] b')
-            if title_span:
-                title = title_span.get_text().strip()
-            else:
-                title_tag = soup.find('title')
-                if title_tag:
-                    title_text = title_tag.get_text().strip()
-                    if " - " in title_text:
-                        title = title_text.split(" - ")[0].strip()
-                    elif "-" in title_text:
-                        title = title_text.split("-")[0].strip()
-                    else:
-                        title = title_text
-            
-            author = "未知作者"
-            author_elem = soup.select_one('.author, #author') 
-            if author_elem:
-                author = author_elem.get_text().replace('作者：', '').strip()
-            else:
-                for td in soup.select('td'):
-                    text = td.get_text().strip()
-                    if text.startswith('小说作者：'):
-                        author = text.replace('小说作者：', '').strip()
-                        break
-            
-            catalog_url = None
-            catalog_link_elem = soup.find('a', string=re.compile(r"小说目录"))
-            if catalog_link_elem and catalog_link_elem.get('href'):
-                catalog_href = catalog_link_elem.get('href')
-                catalog_url = urljoin(response.url, catalog_href)
-            
-            if not catalog_url:
-                with self.print_lock:
-                     print(f"警告: 未能在页面上动态找到小说ID {novel_id} 的目录链接。将尝试使用默认模式，但这可能不准确。")
-
-            if not catalog_url:
-                with self.print_lock:
-                    print(f"错误: 无法确定小说ID {novel_id} 的目录URL。下载可能失败。")
-            else:
-                 print(f"解析结果: 标题='{title}', 作者='{author}', 目录URL='{catalog_url}'")
-            
-            return {
-                'id': novel_id,
-                'title': title,
-                'author': author,
-                'catalog_url': catalog_url
-            }
+            details = parse_novel_details(response.text, response.url, novel_id)
+            if details['catalog_url']:
+                self.metadata_cache.set(novel_id, 'details', details)
+            return details
             
         except Exception as e:
-            print(f"获取小说详情失败: {e}")
+            self._log(f"获取小说详情失败: {e}")
             return None
     
-    def get_chapter_list(self, catalog_url):
+    def get_chapter_list(self, catalog_url, novel_id=None, use_cache=True):
         """获取章节列表，按卷分组"""
+        if novel_id is None:
+            novel_id = self._novel_id_from_catalog_url(catalog_url)
+        if use_cache:
+            cached_volumes = self.metadata_cache.get(novel_id, 'volumes')
+            if cached_volumes:
+                self._log(f"从缓存加载章节列表: {novel_id}")
+                return cached_volumes
+
         try:
-            response = self.session.get(catalog_url)
-            response.encoding = 'gbk'
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            volumes = []  # 存储卷信息的列表
-            current_volume = None
-            
-            table = soup.select_one('table.css')
-            if not table:
-                print("未找到章节表格")
+            response = self._get(catalog_url, revalidate=True)
+            if response.block_verdict.blocked:
+                self._log(f"获取章节列表被拦截 ({response.block_verdict.value})")
                 return []
-            
-            for row in table.select('tr'):
-                # 检查是否是卷标题行
-                volume_td = row.select_one('td.vcss[colspan="4"]')
-                if volume_td:
-                    volume_title = volume_td.get_text().strip()
-                    print(f"找到卷: {volume_title}")
-                    
-                    # 创建新的卷
-                    current_volume = {
-                        'title': volume_title,
-                        'chapters': []
-                    }
-                    volumes.append(current_volume)
-                    continue
-                
-                # 处理章节行
-                chapter_tds = row.select('td.ccss')
-                for td in chapter_tds:
-                    link = td.select_one('a')
-                    if link and link.get('href'):
-                        href = link.get('href')
-                        chapter_title = link.get_text().strip()
-                        
-                        if not chapter_title or chapter_title == ' ':
-                            continue
-                        
-                        if href.startswith('http'):
-                            chapter_url = href
-                        else:
-                            base_url = catalog_url.rsplit('/', 1)[0]
-                            chapter_url = f"{base_url}/{href}"
-                        
-                        chapter_info = {
-                            'title': chapter_title,
-                            'url': chapter_url
-                        }
-                        
-                        # 如果当前没有卷，创建一个默认卷
-                        if current_volume is None:
-                            current_volume = {
-                                'title': '默认卷',
-                                'chapters': []
-                            }
-                            volumes.append(current_volume)
-                        
-                        current_volume['chapters'].append(chapter_info)
-            
-            total_chapters = sum(len(vol['chapters']) for vol in volumes)
-            print(f"总共找到 {len(volumes)} 卷，{total_chapters} 个章节")
+            response.encoding = 'gbk'
+            volumes = parse_chapter_list(response.text, catalog_url)
+            if volumes:
+                self.metadata_cache.set(novel_id, 'volumes', volumes)
             return volumes
             
         except Exception as e:
-            print(f"获取章节列表失败: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception(f"获取章节列表失败: {e}")
             return []
     
     def download_chapter(self, chapter, output_dir, novel_id): # Added novel_id for robust aid in fallback
         """下载单个章节，包括文本和图片"""
         try:
-            with self.print_lock:
-                print(f"正在处理章节: {chapter['title']} (URL: {chapter['url']})")
-            response = self.session.get(chapter['url'], timeout=20)
-            response.encoding = 'gbk'
+            self.progress.emit(EventType.CHAPTER_STARTED, chapter=chapter['title'])
+            self._log(f"正在处理章节: {chapter['title']} (URL: {chapter['url']})")
+            response = self._get(chapter['url'], revalidate=True, timeout=20)
             
-            # 立刻检查是否为Cloudflare错误页面
-            initial_content_check = response.text
-            if self._is_cloudflare_error(initial_content_check):
-                with self.print_lock:
-                    print(f"  ✗ 页面被Cloudflare拦截 (初始加载): {chapter['title']}")
+            # 立刻检查是否为Cloudflare拦截页面，无需解码整个页面
+            if response.block_verdict.blocked:
+                self._log(f"  ✗ 页面被Cloudflare拦截 ({response.block_verdict.value}): {chapter['title']}", logging.WARNING)
                 return False # 触发重试
+            response.encoding = 'gbk'
                 
-            soup = BeautifulSoup(response.text, 'html.parser')
-            text_content = ""
-            image_urls_to_download = []
-
-            # 1. Identify the main content area
-            main_content_area = None
-            # Ordered by preference, #content is often the one for wenku8
-            content_selectors = ['#content', '#contentmain', 'div[id="content"]', '.content'] 
-            for selector in content_selectors:
-                candidate = soup.select_one(selector)
-                if candidate:
-                    main_content_area = candidate
-                    break
-            
-            if not main_content_area:
-                main_content_area = soup.body if soup.body else soup # Fallback to whole body
-
-            # 2. Extract Image URLs from the identified content area
-            if main_content_area:
-                image_elements = main_content_area.select('div.divimage img.imagecontent')
-                if not image_elements: # Broader search if specific one fails within content area
-                    image_elements = main_content_area.select('img.imagecontent')
-                
-                for img_tag in image_elements:
-                    img_src = img_tag.get('src')
-                    if img_src:
-                        full_img_url = urljoin(chapter['url'], img_src)
-                        if full_img_url not in image_urls_to_download:
-                            image_urls_to_download.append(full_img_url)
-            
-            with self.print_lock:
-                if image_urls_to_download:
-                    print(f"  找到 {len(image_urls_to_download)} 张图片待下载。")
-                else:
-                    print(f"  未在该章节页面找到主要图片元素。")
-
-            # 3. Extract Text Content from a cleaned version of the content area
-            if main_content_area:
-                text_extraction_soup = BeautifulSoup(str(main_content_area), 'html.parser')
-                elements_to_remove_for_text = 'div.divimage, ul#contentdp, div.chapter_turnpage, div#contentadv, script, style'
-                if 'div[align="center"] > table' in str(text_extraction_soup): # Remove potential ad tables
-                    elements_to_remove_for_text += ', div[align="center"] > table'
-
-                for element_to_remove in text_extraction_soup.select(elements_to_remove_for_text):
-                    element_to_remove.decompose()
-                
-                text_content = text_extraction_soup.get_text(separator='\n', strip=True)
-                text_content = re.sub(r'\n{2,}', '\n\n', text_content)
+            text_content, image_urls_to_download = extract_chapter_content(response.text, chapter['url'])
             
-            # 检查提取的文本是否为Cloudflare错误
-            if self._is_cloudflare_error(text_content):
-                with self.print_lock:
-                    print(f"  ✗ 提取的文本内容为Cloudflare错误页面: {chapter['title']}")
-                return False # 触发重试
+            if image_urls_to_download:
+                self._log(f"  找到 {len(image_urls_to_download)} 张图片待下载。")
+            else:
+                self._log(f"  未在该章节页面找到主要图片元素。")
 
             # 4. Handle fallback for text if primary extraction is unsatisfactory
             primary_text_unsatisfactory = (
@@ -623,8 +574,7 @@ class Wenku8Downloader:
             )
 
             if primary_text_unsatisfactory:
-                with self.print_lock:
-                    print(f"  主要文本提取不满意或为空，尝试备用下载...")
+                self._log(f"  主要文本提取不满意或为空，尝试备用下载...")
                 original_text_content_before_fallback = text_content 
                 
                 try:
@@ -637,7 +587,7 @@ class Wenku8Downloader:
                          # vid is typically the last numeric part of chapter url path
                         chapter_filename_part = path_segments[-1]
                         # Extract digits from chapter_filename_part, as it might be '12345.htm' or just '12345'
-                        vid_match = re.search(r'(\\d+)', chapter_filename_part)
+                        vid_match = re.search(r'(\d+)', chapter_filename_part)
                         if vid_match:
                             vid = vid_match.group(1)
                         else: # Fallback if no number in last segment, less likely
@@ -651,211 +601,115 @@ class Wenku8Downloader:
 
                     _content_from_dl = ""
                     # Attempt 1: packtxt.php
-                    alt_url_packtxt = f"http://dl.wenku8.com/packtxt.php?aid={aid}&vid={vid}"
-                    with self.print_lock: print(f"    ↪ 尝试备用 (packtxt): {alt_url_packtxt}")
-                    
+                    alt_url_packtxt = self.hosts.url(PACKS, f"/packtxt.php?aid={aid}&vid={vid}")
+                    self._log(f"    ↪ 尝试备用 (packtxt): {alt_url_packtxt}")
                     try:
-                        alt_response_packtxt = self.session.get(alt_url_packtxt, timeout=15)
-                        alt_response_packtxt.raise_for_status()
-                        # Try common encodings, gbk is often used for packtxt
-                        for encoding in ['gbk', 'utf-8']:
-                            alt_response_packtxt.encoding = encoding
-                            temp_dl_text = alt_response_packtxt.text
-                            if self._is_cloudflare_error(temp_dl_text):
-                                with self.print_lock: print(f"      备用 (packtxt) 返回Cloudflare错误页面。")
-                                _content_from_dl = "CLOUDFLARE_ERROR_PAGE" # 标记为错误
-                                break
-                            if temp_dl_text and len(temp_dl_text.strip()) > 50:
-                                _content_from_dl = temp_dl_text.strip()
-                                break
+                        alt_response_packtxt = self._get(alt_url_packtxt, timeout=15)
+                        if alt_response_packtxt.block_verdict.blocked:
+                            self._log(f"      备用 (packtxt) 返回Cloudflare错误页面。")
+                            _content_from_dl = "CLOUDFLARE_ERROR_PAGE" # 标记为错误
+                        else:
+                            alt_response_packtxt.raise_for_status()
+                            # Try common encodings, gbk is often used for packtxt
+                            for encoding in ['gbk', 'utf-8']:
+                                alt_response_packtxt.encoding = encoding
+                                temp_dl_text = alt_response_packtxt.text
+                                if temp_dl_text and len(temp_dl_text.strip()) > 50:
+                                    _content_from_dl = temp_dl_text.strip()
+                                    break
                     except requests.exceptions.RequestException as e_packtxt:
-                        with self.print_lock: print(f"      备用 (packtxt) 请求失败: {e_packtxt}")
-                    
+                        self._log(f"      备用 (packtxt) 请求失败: {e_packtxt}")
                     # Attempt 2: pack.php (if packtxt failed or content too short or was Cloudflare error)
                     if not _content_from_dl or len(_content_from_dl) < 50 or _content_from_dl == "CLOUDFLARE_ERROR_PAGE":
                         if _content_from_dl == "CLOUDFLARE_ERROR_PAGE": _content_from_dl = "" # 重置
-                        alt_url_pack = f"http://dl.wenku8.com/pack.php?aid={aid}&vid={vid}"
-                        with self.print_lock: print(f"    ↪ 尝试备用 (pack): {alt_url_pack}")
+                        alt_url_pack = self.hosts.url(PACKS, f"/pack.php?aid={aid}&vid={vid}")
+                        self._log(f"    ↪ 尝试备用 (pack): {alt_url_pack}")
                         try:
-                            alt_response_pack = self.session.get(alt_url_pack, timeout=15)
-                            alt_response_pack.raise_for_status()
-                            alt_response_pack.encoding = 'utf-8' # pack.php is usually HTML with UTF-8
-                            alt_soup_pack = BeautifulSoup(alt_response_pack.text, 'html.parser')
-                            body_pack = alt_soup_pack.body
-                            if body_pack:
-                                temp_dl_text_pack = body_pack.get_text(separator='\n', strip=True)
-                                if self._is_cloudflare_error(temp_dl_text_pack):
-                                    with self.print_lock: print(f"      备用 (pack) 返回Cloudflare错误页面。")
-                                    _content_from_dl = "CLOUDFLARE_ERROR_PAGE"
-                                else:
+                            alt_response_pack = self._get(alt_url_pack, timeout=15)
+                            if alt_response_pack.block_verdict.blocked:
+                                self._log(f"      备用 (pack) 返回Cloudflare错误页面。")
+                                _content_from_dl = "CLOUDFLARE_ERROR_PAGE"
+                            else:
+                                alt_response_pack.raise_for_status()
+                                alt_response_pack.encoding = 'utf-8' # pack.php is usually HTML with UTF-8
+                                alt_soup_pack = BeautifulSoup(alt_response_pack.text, 'html.parser')
+                                body_pack = alt_soup_pack.body
+                                if body_pack:
+                                    temp_dl_text_pack = body_pack.get_text(separator='\n', strip=True)
                                     _content_from_dl = re.sub(r'\n{2,}', '\n\n', temp_dl_text_pack)
                         except requests.exceptions.RequestException as e_pack:
-                             with self.print_lock: print(f"      备用 (pack) 请求失败: {e_pack}")
-                    
+                             self._log(f"      备用 (pack) 请求失败: {e_pack}")
                     if _content_from_dl and _content_from_dl != "CLOUDFLARE_ERROR_PAGE" and len(_content_from_dl.strip()) > 50:
                         text_content = _content_from_dl
-                        with self.print_lock: print(f"    ✓ 备用下载文本成功。")
+                        self._log(f"    ✓ 备用下载文本成功。")
                     else:
                         # If fallback also fails & no images were initially found, restore original short/problematic text
                         if not image_urls_to_download and primary_text_unsatisfactory :
                             text_content = original_text_content_before_fallback
-                        with self.print_lock: print(f"    ✗ 备用下载文本失败或内容不足或为Cloudflare错误。")
+                        self._log(f"    ✗ 备用下载文本失败或内容不足或为Cloudflare错误。", logging.WARNING)
                         if _content_from_dl == "CLOUDFLARE_ERROR_PAGE": # 如果备用下载是CF错误，则整个下载失败
                             return False
                 
                 except ValueError as ve:
-                    with self.print_lock: print(f"    ✗ 备用下载预处理失败 (aid/vid提取): {ve}")
+                    self._log(f"    ✗ 备用下载预处理失败 (aid/vid提取): {ve}", logging.WARNING)
                     if not image_urls_to_download and primary_text_unsatisfactory: text_content = original_text_content_before_fallback
                 except Exception as e_fallback: # Catch any other error during fallback
-                    with self.print_lock: print(f"    ✗ 备用下载文本时发生未知错误: {e_fallback}")
+                    self._log(f"    ✗ 备用下载文本时发生未知错误: {e_fallback}", logging.WARNING)
                     if not image_urls_to_download and primary_text_unsatisfactory: text_content = original_text_content_before_fallback
 
-            # 5. Final content validation (Check again for Cloudflare error before saving)
-            if self._is_cloudflare_error(text_content):
-                with self.print_lock:
-                    print(f"  ✗ 最终文本内容为Cloudflare错误页面，将不保存: {chapter['title']}")
-                return False # 标记下载失败以进行重试
-                
+            # 5. Final content validation (页面和备用接口的响应都已在 _get 中检查过是否被拦截)
             final_text_content_stripped = text_content.strip()
             if not final_text_content_stripped and not image_urls_to_download:
-                with self.print_lock:
-                    print(f"✗ 无法获取章节内容 (文本和图片均无或无效): {chapter['title']}")
+                self._log(f"✗ 无法获取章节内容 (文本和图片均无或无效): {chapter['title']}", logging.WARNING)
                 return False
             
             if len(final_text_content_stripped) < 20 and not image_urls_to_download: # Stricter short text check
-                 with self.print_lock:
-                    print(f"✗ 文本内容过短 (<20 chars) 且无图片: {chapter['title']}")
+                 self._log(f"✗ 文本内容过短 (<20 chars) 且无图片: {chapter['title']}", logging.WARNING)
                  return False
 
             # 6. Clean up final text content
             if final_text_content_stripped:
-                cleanup_patterns = [
-                    '本文来自 轻小说文库(http://www.wenku8.com)',
-                    '台版 转自 轻之国度', # This might be desirable for some, but for generic cleanup, remove
-                    '最新最全的日本动漫轻小说 轻小说文库(http://www.wenku8.com) 为你一网打尽！',
-                    '更多精彩热门日本轻小说、动漫小说，轻小说文库(http://www.wenku8.com) 为你一网打尽！',
-                    'www.wenku8.com',
-                    'wenku8.com',
-                    '轻小说文库',
-                    # Regex patterns for more complex cleanup
-                    r'^插图来源[:：]?.*$',
-                    r'^文字来源[:：]?.*$',
-                    r'^(?=.*轻之国度)(?=.*仅供试阅).*$', # Line with "轻之国度" and "仅供试阅"
-                    r'^(?=.*LKID)(?=.*录入).*$',      # Line with LKID and 录入
-                    r'^\s*扫图：.*$',
-                    r'^\s*录入：.*$',
-                    r'^\s*校对：.*$',
-                    r'^\s*翻译：.*$',
-                    r'^\s*润色：.*$',
-                    r'^\s*修图：.*$',
-                    r'^\s*转自：.*$',
-                    r'^\s*仅供个人学习交流使用，禁作商业用途.*$',
-                    r'^\s*下载后请在24小时内删除，LK不负担任何责任.*$',
-                    r'^\s*请尊重翻译、扫图、录入、校对的辛勤劳动，转载请保留信息.*$',
-                    r'^\s*本文特别严禁转载至SF轻小说频道及轻小说文库测(.*)$', # SF and wenku8 repost warning
-                    r'^\s*──────────────$', # Separator lines
-                    r'^\s*━━━━━━━━━━━━$',
-                    r'^\s*＊＊＊$',
-                    r'(?i)novel Horizons - Présente', # French scanlation group
-                    r'(?i)Par Ln Vol.(.*)Traduction(.*)'
-                ]
-                current_text_to_clean = final_text_content_stripped
-                for pattern in cleanup_patterns:
-                    try:
-                        if any(c in pattern for c in r'.*+?^$[]{}()|\\\\'): # Basic check if it's a regex
-                             current_text_to_clean = re.sub(pattern, '', current_text_to_clean, flags=re.MULTILINE).strip()
-                        else: # Simple string replace
-                            current_text_to_clean = current_text_to_clean.replace(pattern, '').strip()
-                    except re.error as e_re:
-                        with self.print_lock: print(f"  警告: 清理规则 '{pattern}' 正则表达式错误: {e_re}")
-
-                text_content = re.sub(r'\n{3,}', '\n\n', current_text_to_clean.strip())
+                text_content = clean_chapter_text(final_text_content_stripped)
             else:
                 text_content = ""
 
             # 7. Save chapter text and images
             # Sanitize chapter title for file/dir names: remove problematic chars, limit length
-            safe_chapter_title = re.sub(r'[<>:"/\\|?*]', '_', chapter['title'])
-            safe_chapter_title = re.sub(r'[\\s\\.\\(\\)]+', '_', safe_chapter_title) # Replace whitespace, dots, parens with underscore
-            safe_chapter_title = re.sub(r'_+', '_', safe_chapter_title) # Consolidate multiple underscores
-            safe_chapter_title = safe_chapter_title.strip('_')
-            if len(safe_chapter_title) > 60: # Limit length to avoid issues with long paths
-                safe_chapter_title = safe_chapter_title[:60].strip('_')
-            if not safe_chapter_title: # If title becomes empty after sanitization
-                safe_chapter_title = f"chapter_{chapter['url'].split('/')[-1].replace('.htm','')}"
-
+            safe_chapter_title = safe_chapter_filename(chapter)
 
             text_file_saved_successfully = False
-            image_files_references = []
+            text_filename = None
+            text_hash = None
+            image_files_references = [
+                f"{safe_chapter_title}_img_{i+1}.{image_extension(img_url)}"
+                for i, img_url in enumerate(image_urls_to_download)
+            ]
 
             if text_content: # 只有当文本内容不是Cloudflare错误时才保存
                 text_filename = f"{safe_chapter_title}.txt"
-                text_filepath = os.path.join(output_dir, text_filename)
                 try:
-                    with open(text_filepath, 'w', encoding='utf-8') as f:
-                        f.write(f"# {chapter['title']}\n\n")
-                        f.write(text_content)
+                    text_hash = save_chapter_text(chapter, output_dir, text_content, image_files_references)
                     text_file_saved_successfully = True
                 except IOError as e_io_text:
-                    with self.print_lock: print(f"  ✗ 保存文本文件失败 {text_filename}: {e_io_text}")
-            
-            # Download and save images
-            downloaded_image_count = 0
-            for i, img_url in enumerate(image_urls_to_download):
-                try:
-                    # Determine image extension
-                    img_original_filename = img_url.split('/')[-1].split('?')[0].split('#')[0]
-                    img_ext = 'jpg' # Default
-                    if '.' in img_original_filename:
-                        candidate_ext = img_original_filename.split('.')[-1].lower()
-                        if len(candidate_ext) <= 4 and candidate_ext.isalnum() and candidate_ext not in ['php', 'html', 'htm']:
-                            img_ext = candidate_ext
-                    
-                    img_filename_for_ref = f"{safe_chapter_title}_img_{i+1}.{img_ext}"
-                    img_filepath = os.path.join(output_dir, img_filename_for_ref)
-                    image_files_references.append(img_filename_for_ref) # Add to list for text file ref
+                    self._log(f"  ✗ 保存文本文件失败 {text_filename}: {e_io_text}", logging.WARNING)
+            # Download and save images (并发下载，耗时取决于最慢的一张)
+            if image_urls_to_download:
+                self._log(f"    ↪ 并发下载 {len(image_urls_to_download)} 张图片")
+            image_results = self.illustration_fetcher.fetch_all([
+                (img_url, os.path.join(output_dir, img_filename_for_ref))
+                for img_url, img_filename_for_ref in zip(image_urls_to_download, image_files_references)
+            ])
+            image_records = [
+                {'url': img_url, 'file': img_filename_for_ref, 'done': done}
+                for img_url, img_filename_for_ref, done in zip(image_urls_to_download, image_files_references, image_results)
+            ]
+            downloaded_image_count = sum(image_results)
 
-                    if os.path.exists(img_filepath) and os.path.getsize(img_filepath) > 0:
-                        with self.print_lock: print(f"    ✓ 图片已存在且有效: {img_filename_for_ref}")
-                        downloaded_image_count += 1
-                        continue
+            if text_file_saved_successfully or downloaded_image_count:
+                self._manifest_for(output_dir).record(
+                    chapter, text_filename if text_file_saved_successfully else None, text_hash, image_records
+                )
 
-                    with self.print_lock: print(f"    ↪ 下载图片 ({i+1}/{len(image_urls_to_download)}): {img_url} -> {img_filename_for_ref}")
-                    
-                    img_response = self.session.get(img_url, stream=True, timeout=30)
-                    img_response.raise_for_status()
-                    
-                    with open(img_filepath, 'wb') as f_img:
-                        for chunk in img_response.iter_content(chunk_size=8192):
-                            f_img.write(chunk)
-                    
-                    if os.path.exists(img_filepath) and os.path.getsize(img_filepath) > 0:
-                         downloaded_image_count += 1
-                         with self.print_lock: print(f"    ✓ 图片下载成功: {img_filename_for_ref}")
-                    else:
-                         with self.print_lock: print(f"    ✗ 图片下载后文件无效或为0字节: {img_filename_for_ref}")
-                         if os.path.exists(img_filepath): os.remove(img_filepath)
-                    time.sleep(0.3) # Small polite delay
-                except requests.exceptions.Timeout:
-                    with self.print_lock: print(f"    ✗ 下载图片超时: {img_url}")
-                except requests.exceptions.RequestException as req_e:
-                    with self.print_lock: print(f"    ✗ 下载图片网络请求失败 {img_url}: {req_e}")
-                except IOError as io_e:
-                    with self.print_lock: print(f"    ✗ 保存图片文件失败 {img_filename_for_ref}: {io_e}")
-                except Exception as e_img: # Catch any other error during image processing
-                    with self.print_lock: print(f"    ✗ 处理图片时发生未知错误 {img_url}: {e_img}")
-
-            # If text file was saved and there were images, append image references to text file
-            if text_file_saved_successfully and image_files_references:
-                text_filepath = os.path.join(output_dir, f"{safe_chapter_title}.txt") # Reconstruct path
-                try:
-                    with open(text_filepath, 'a', encoding='utf-8') as f:
-                        f.write("\n\n--- (本章节包含插图) ---\n")
-                        for img_ref in image_files_references:
-                            f.write(f"[插图: {img_ref}]\n")
-                except IOError as e_io_append:
-                     with self.print_lock: print(f"  警告: 追加图片引用到文本文件失败 {text_filepath}: {e_io_append}")
-            
             # Final status determination
             overall_success = False
             status_message_parts = []
@@ -879,165 +733,294 @@ class Wenku8Downloader:
 
 
             if overall_success:
-                 with self.print_lock:
-                    print(f"  ✓ 处理完成: {chapter['title']} ({', '.join(status_message_parts) if status_message_parts else '内容为空'})")
+                 self._log(f"  ✓ 处理完成: {chapter['title']} ({', '.join(status_message_parts) if status_message_parts else '内容为空'})")
             else:
                  # This implies:
                  # 1. No text was successfully saved (either not present, or save failed)
                  # AND
                  # 2. EITHER no images were expected OR all expected images failed to download.
-                 with self.print_lock:
-                    print(f"  ✗ 下载失败 (无有效内容输出): {chapter['title']}")
+                 self._log(f"  ✗ 下载失败 (无有效内容输出): {chapter['title']}", logging.WARNING)
             return overall_success
             
         except requests.exceptions.Timeout:
-            with self.print_lock:
-                print(f"✗ 处理章节超时: {chapter['title']} (URL: {chapter['url']})")
+            self._log(f"✗ 处理章节超时: {chapter['title']} (URL: {chapter['url']})", logging.WARNING)
             return False
         except requests.exceptions.RequestException as e_req:
-            with self.print_lock:
-                print(f"✗ 处理章节时网络请求错误: {chapter['title']} - {e_req}")
+            self._log(f"✗ 处理章节时网络请求错误: {chapter['title']} - {e_req}", logging.WARNING)
             return False
         except Exception as e:
-            with self.print_lock:
-                print(f"✗ 下载章节时发生意外错误: {chapter['title']} - {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception(f"✗ 下载章节时发生意外错误: {chapter['title']} - {e}")
             return False
     
-    def download_volume(self, novel_id, volume_index, output_dir='./novels', max_retries=3, retry_delay=5):
-        """下载指定卷的所有章节"""
+    def _fetch_volume_text(self, novel_id, vid):
+        """通过 packtxt.php 一次获取整卷文本，失败或被拦截时返回 None"""
+        url = self.hosts.url(PACKS, f"/packtxt.php?aid={novel_id}&vid={vid}")
+        try:
+            response = self._get(url, timeout=30)
+            if response.block_verdict.blocked:
+                self._log(f"  整卷文本请求被拦截 ({response.block_verdict.value})，改为逐章下载")
+                return None
+            response.raise_for_status()
+        except requests.exceptions.RequestException as e:
+            self._log(f"  整卷文本请求失败，改为逐章下载: {e}")
+            return None
+        for encoding in ['gbk', 'utf-8']:
+            response.encoding = encoding
+            text = response.text
+            if '\ufffd' not in text[:4096]:
+                return text
+        return response.text
+
+    def _bulk_download_volume(self, volume, volume_dir, novel_id):
+        """
+        整卷下载: 用一次请求获取整卷文本并按目录标题切分保存 (见 novel.volume_text)。
+        已保存的章节记入下载清单，之后逐章下载时会被跳过；返回保存的章节数。
+        """
+        vid = volume.get('vid')
+        if not self.bulk_volume_mode or not vid or not str(novel_id).isdigit():
+            return 0
+        chapters = self._prefixed_chapters(volume)
+        manifest = self._manifest_for(volume_dir)
+        pending = pending_chapters(manifest, chapters)
+        if not pending:
+            return 0
+
+        self._log(f"整卷下载: {volume['title']} (vid={vid})")
+        volume_text = self._fetch_volume_text(novel_id, vid)
+        if not volume_text:
+            return 0
+        return save_volume_text(volume_text, [chapter['title'] for chapter in volume['chapters']], chapters,
+                                pending, volume_dir, manifest, log=self._log)
+
+    def _manifest_for(self, volume_dir):
+        """获取卷目录对应的下载清单，同一目录共用一个实例"""
+        key = os.path.abspath(volume_dir)
+        with self._manifests_lock:
+            manifest = self._manifests.get(key)
+            if manifest is None:
+                manifest = VolumeManifest(volume_dir)
+                self._manifests[key] = manifest
+            return manifest
+
+    def _flush_manifests(self):
+        """把所有下载清单中尚未写入的记录写入文件"""
+        with self._manifests_lock:
+            manifests = list(self._manifests.values())
+        for manifest in manifests:
+            manifest.flush()
+
+    def _resume_chapter_images(self, chapter, volume_dir):
+        """章节文本已保存时，只补下载清单中缺失的插图"""
+        manifest = self._manifest_for(volume_dir)
+        entry = manifest.get(chapter)
+        missing = manifest.missing_images(entry)
+        self._log(f"继续未完成的章节: {chapter['title']} (缺少 {len(missing)} 张插图)")
+        results = self.illustration_fetcher.fetch_all(
+            [(image['url'], os.path.join(volume_dir, image['file'])) for image in missing]
+        )
+        for image, done in zip(missing, results):
+            if done:
+                manifest.mark_image_done(chapter, image['file'])
+        return manifest.is_complete(chapter)
+
+    def _download_chapter_with_retries(self, chapter, volume_dir, novel_id, max_retries, retry_delay):
+        """下载单个章节，失败时按 retry_delay 间隔重试；请求节奏由限速器控制"""
+        manifest = self._manifest_for(volume_dir)
+        if manifest.is_complete(chapter):
+            self.progress.emit(EventType.CHAPTER_SKIPPED, chapter=chapter['title'])
+            self._log(f"已下载，跳过: {chapter['title']}")
+            return True
+        if manifest.is_partial(chapter) and self._resume_chapter_images(chapter, volume_dir):
+            self.progress.emit(EventType.CHAPTER_FINISHED, chapter=chapter['title'], value=True)
+            return True
+
+        retries = 0
+        while retries < max_retries:
+            if retries > 0:
+                self.progress.emit(EventType.RETRY, chapter=chapter['title'], value=retries)
+                self._log(f"正在重试下载: {chapter['title']} (尝试 {retries}/{max_retries-1})")
+                time.sleep(retry_delay)
+
+            if self.download_chapter(chapter, volume_dir, novel_id):
+                self.progress.emit(EventType.CHAPTER_FINISHED, chapter=chapter['title'], value=True)
+                return True
+            retries += 1
+
+        self.progress.emit(EventType.CHAPTER_FINISHED, chapter=chapter['title'], value=False)
+        self._log(f"✗ 下载失败 (已达最大重试次数): {chapter['title']}", logging.WARNING)
+        return False
+
+    def _download_chapter_in_budget(self, budget_key, chapter, volume_dir, novel_id, max_retries, retry_delay):
+        """
+        在全局章节名额内下载一个章节；所属任务已取消时不再下载，返回 False。
+        线程池中发出的进度事件归属于 budget_key 对应的任务。
+        """
+        with self.progress.bind(budget_key):
+            if self.chapter_budget is None or budget_key is None:
+                return self._download_chapter_with_retries(chapter, volume_dir, novel_id, max_retries, retry_delay)
+            with self.chapter_budget.slot(budget_key) as granted:
+                if not granted:
+                    return False
+                return self._download_chapter_with_retries(chapter, volume_dir, novel_id, max_retries, retry_delay)
+
+    def _download_chapters_parallel(self, jobs, novel_id, max_retries, retry_delay, max_workers=None, budget_key=None,
+                                    announce_start=True):
+        """
+        使用线程池并发下载章节。
+        jobs: [(chapter_with_prefix, volume_dir), ...]，序号前缀在提交前已确定，因此与完成顺序无关。
+        budget_key: 在 chapter_budget 中登记的任务标识，多本小说同时下载时共享章节名额
+        announce_start: 为 False 时不发出 DOWNLOAD_STARTED (调用方已按整个下载范围发出过)
+        Returns a list of booleans aligned with jobs.
+        """
+        workers = max(1, min(max_workers or self.max_workers, len(jobs) or 1))
+        results = [False] * len(jobs)
+        done_count = 0
+        start_time = time.time()
+        cache_stats_before = self.http_cache.snapshot()
+        if announce_start:
+            self.progress.emit(EventType.DOWNLOAD_STARTED, value=len(jobs))
+
+        try:
+            with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+                future_to_index = {
+                    executor.submit(self._download_chapter_in_budget, budget_key, chapter, volume_dir, novel_id,
+                                    max_retries, retry_delay): index
+                    for index, (chapter, volume_dir) in enumerate(jobs)
+                }
+                for future in concurrent.futures.as_completed(future_to_index):
+                    index = future_to_index[future]
+                    chapter = jobs[index][0]
+                    done_count += 1
+                    try:
+                        results[index] = bool(future.result())
+                    except Exception as e:
+                        self.progress.emit(EventType.CHAPTER_FINISHED, chapter=chapter['title'], value=False)
+                        self._log(f"✗ 下载章节时发生意外错误: {chapter['title']} - {e}", logging.WARNING)
+
+                    elapsed = time.time() - start_time
+                    rate = done_count / elapsed if elapsed > 0 else 0.0
+                    self._log(f"进度: {done_count}/{len(jobs)} 个章节 ({rate:.2f} 章/秒)")
+        finally:
+            self._flush_manifests()
+
+        elapsed = time.time() - start_time
+        total_success = sum(results)
+        rate = total_success / elapsed if elapsed > 0 else 0.0
+        self._log(f"并发下载结束: {total_success}/{len(jobs)} 个章节成功, 用时 {elapsed:.1f} 秒, "
+                  f"平均 {rate:.2f} 章/秒 (线程数: {workers}, 每主机并发: {self.max_connections_per_host}, "
+                  f"当前限速: {self.rate_limiter.rate:.2f} 次/秒)")
+        self._log(self.http_cache.report(since=cache_stats_before))
+        self.progress.emit(EventType.DOWNLOAD_FINISHED, value=total_success)
+        return results
+
+    @staticmethod
+    def _prefixed_chapters(volume):
+        """为卷内章节添加序号前缀以保持顺序"""
+        return [
+            {'title': f"{i:03d}_{chapter['title']}", 'url': chapter['url']}
+            for i, chapter in enumerate(volume['chapters'], 1)
+        ]
+
+    def count_volume_chapters(self, novel_id, volume_indices):
+        """指定各卷的章节总数，找不到的卷不计入；无法获取目录时返回 0"""
         novel = self.get_novel_details(novel_id)
         if not novel or not novel['catalog_url']:
-            print("无法获取小说信息或目录链接")
+            return 0
+        volumes = self.get_chapter_list(novel['catalog_url'], novel_id) or []
+        return sum(len(volumes[i]['chapters']) for i in volume_indices if 0 <= i < len(volumes))
+
+    def download_volume(self, novel_id, volume_index, output_dir='./novels', max_retries=3, retry_delay=5, max_workers=None,
+                        budget_key=None, announce_start=True):
+        """
+        下载指定卷的所有章节。
+        连续下载多卷时先按 count_volume_chapters 的总数发出一次 DOWNLOAD_STARTED，
+        再以 announce_start=False 逐卷下载，进度条不会在换卷时回退
+        """
+        novel = self.get_novel_details(novel_id)
+        if not novel or not novel['catalog_url']:
+            self._log("无法获取小说信息或目录链接")
             return False
         
-        volumes = self.get_chapter_list(novel['catalog_url'])
+        volumes = self.get_chapter_list(novel['catalog_url'], novel_id)
         if not volumes or volume_index >= len(volumes):
-            print(f"无法找到指定的卷 (索引: {volume_index})")
+            self._log(f"无法找到指定的卷 (索引: {volume_index})")
             return False
         
         volume = volumes[volume_index]
-        print(f"开始下载: 《{novel['title']}》- {volume['title']}")
+        self._log(f"开始下载: 《{novel['title']}》- {volume['title']}")
         
         # 创建输出目录
         safe_volume_title = re.sub(r'[<>:"/\\|?*]', '_', volume['title'])
         volume_dir = os.path.join(output_dir, safe_volume_title)
         os.makedirs(volume_dir, exist_ok=True)
+        self._bulk_download_volume(volume, volume_dir, novel_id)
         
-        # 下载章节
-        success_count = 0
-        for i, chapter in enumerate(volume['chapters'], 1):
-            # 添加序号前缀以保持顺序
-            chapter_with_prefix = {
-                'title': f"{i:03d}_{chapter['title']}",
-                'url': chapter['url']
-            }
-            
-            retries = 0
-            downloaded_successfully = False
-            while retries < max_retries and not downloaded_successfully:
-                if retries > 0:
-                    with self.print_lock:
-                        print(f"正在重试下载: {chapter['title']} (尝试 {retries}/{max_retries-1})")
-                    time.sleep(retry_delay)
-                
-                downloaded_successfully = self.download_chapter(chapter_with_prefix, volume_dir, novel_id)
-                
-                if downloaded_successfully:
-                    success_count += 1
-                    time.sleep(retry_delay)
-                else:
-                    retries += 1
-            
-            if not downloaded_successfully:
-                with self.print_lock:
-                    print(f"✗ 下载失败 (已达最大重试次数): {chapter['title']}")
+        # 并发下载章节 (整卷文本中已保存的章节会被跳过)
+        jobs = [(chapter, volume_dir) for chapter in self._prefixed_chapters(volume)]
+        results = self._download_chapters_parallel(
+            jobs, novel_id, max_retries, retry_delay, max_workers=max_workers, budget_key=budget_key,
+            announce_start=announce_start
+        )
+        success_count = sum(results)
 
-        print(f"\n卷下载完成! 成功下载 {success_count}/{len(volume['chapters'])} 个章节")
-        print(f"文件保存在: {volume_dir}")
-        
-        # 自动修复下载的TXT文件
-        fix_all_txt_files(volume_dir)        
+        self._log(f"\n卷下载完成! 成功下载 {success_count}/{len(volume['chapters'])} 个章节")
+        self._log(f"文件保存在: {volume_dir}")
         return success_count > 0
     
-    def download_novel(self, novel_id, output_dir='./novels', max_retries=3, retry_delay=5):
+    def download_novel(self, novel_id, output_dir='./novels', max_retries=3, retry_delay=5, max_workers=None,
+                       budget_key=None):
         """下载整本小说"""
         novel = self.get_novel_details(novel_id)
         if not novel or not novel['catalog_url']:
-            print("无法获取小说信息或目录链接")
+            self._log("无法获取小说信息或目录链接")
             return False
         
-        print(f"开始下载: 《{novel['title']}》 作者: {novel['author']}")
+        self._log(f"开始下载: 《{novel['title']}》 作者: {novel['author']}")
         
         # 创建输出目录
-        safe_title = re.sub(r'[<>:"/\\|?*]', '_', novel['title'])
         novel_dir = output_dir
         os.makedirs(novel_dir, exist_ok=True)
         
         # 获取章节列表
-        volumes = self.get_chapter_list(novel['catalog_url'])
+        volumes = self.get_chapter_list(novel['catalog_url'], novel_id)
         if not volumes:
-            print("无法获取章节列表")
+            self._log("无法获取章节列表")
             return False
         
         total_chapters = sum(len(vol['chapters']) for vol in volumes)
-        print(f"找到 {len(volumes)} 卷，{total_chapters} 个章节，开始下载...")
-        
-        # 按卷下载
-        total_success = 0
-        all_volume_dirs = []  # 存储所有卷的目录路径
+        self._log(f"找到 {len(volumes)} 卷，{total_chapters} 个章节，开始下载...")
         
-        for vol_idx, volume in enumerate(volumes):
-            print(f"\n开始下载卷: {volume['title']}")
-            
-            # 创建卷目录
+        # 所有卷的章节放入同一个线程池，卷与卷之间也并行下载
+        jobs = []
+        volume_ranges = []  # 存储每卷的目录路径及其在 jobs 中的位置
+        for volume in volumes:
             safe_volume_title = re.sub(r'[<>:"/\\|?*]', '_', volume['title'])
             volume_dir = os.path.join(novel_dir, safe_volume_title)
             os.makedirs(volume_dir, exist_ok=True)
-            all_volume_dirs.append(volume_dir)
-            
-            success_count = 0
-            for i, chapter in enumerate(volume['chapters'], 1):
-                # 添加序号前缀以保持顺序
-                chapter_with_prefix = {
-                    'title': f"{i:03d}_{chapter['title']}",
-                    'url': chapter['url']
-                }
-                
-                retries = 0
-                downloaded_successfully = False
-                while retries < max_retries and not downloaded_successfully:
-                    if retries > 0:
-                        with self.print_lock:
-                            print(f"正在重试下载: {chapter['title']} (尝试 {retries}/{max_retries-1})")
-                        time.sleep(retry_delay)
-                    
-                    downloaded_successfully = self.download_chapter(chapter_with_prefix, volume_dir, novel_id)
-                    
-                    if downloaded_successfully:
-                        success_count += 1
-                        time.sleep(2)  # 每个章节下载后等待2秒
-                    else:
-                        retries += 1
-                
-                if not downloaded_successfully:
-                    with self.print_lock:
-                        print(f"✗ 下载失败 (已达最大重试次数): {chapter['title']}")
-            
+            self._bulk_download_volume(volume, volume_dir, novel_id)
+            first_job = len(jobs)
+            jobs.extend((chapter, volume_dir) for chapter in self._prefixed_chapters(volume))
+            volume_ranges.append((volume_dir, first_job, len(jobs)))
+
+        results = self._download_chapters_parallel(
+            jobs, novel_id, max_retries, retry_delay, max_workers=max_workers, budget_key=budget_key
+        )
+
+        total_success = 0
+        for volume, (volume_dir, first_job, last_job) in zip(volumes, volume_ranges):
+            success_count = sum(results[first_job:last_job])
             total_success += success_count
-            print(f"卷 {volume['title']} 下载完成: {success_count}/{len(volume['chapters'])} 个章节")
-            
-            # 对当前卷的TXT文件进行修复
-            fix_all_txt_files(volume_dir)
+            self._log(f"卷 {volume['title']} 下载完成: {success_count}/{len(volume['chapters'])} 个章节")
 
-        print(f"\n小说下载完成! 总共成功下载 {total_success}/{total_chapters} 个章节")
-        print(f"文件保存在: {novel_dir}")
+        self._log(f"\n小说下载完成! 总共成功下载 {total_success}/{total_chapters} 个章节")
+        self._log(f"文件保存在: {novel_dir}")
         
         return total_success > 0
 
 def main():
+    log_pipeline.setup_logging()
     downloader = Wenku8Downloader()
+    downloader.hosts.start_probing()
 
     while True:
         print("\n" + "="*50)
@@ -1105,7 +1088,7 @@ def main():
                                 # 显示章节信息并允许选择下载方式
                                 novel_details = downloader.get_novel_details(selected_novel['id'])
                                 if novel_details and novel_details['catalog_url']:
-                                    volumes = downloader.get_chapter_list(novel_details['catalog_url'])
+                                    volumes = downloader.get_chapter_list(novel_details['catalog_url'], selected_novel['id'])
                                     if volumes:
                                         print(f"\n《{novel_details['title']}》章节信息:")
                                         for i, volume in enumerate(volumes):
@@ -1157,7 +1140,7 @@ def main():
                     # Display chapter info and allow choice for single ID download
                     novel_details_single = downloader.get_novel_details(novel_id)
                     if novel_details_single and novel_details_single['catalog_url']:
-                        volumes_single = downloader.get_chapter_list(novel_details_single['catalog_url'])
+                        volumes_single = downloader.get_chapter_list(novel_details_single['catalog_url'], novel_id)
                         if volumes_single:
                             print(f"\n《{novel_details_single['title']}》章节信息:")
                             for i, volume_s in enumerate(volumes_single):
@@ -1192,6 +1175,7 @@ def main():
                 print("请输入有效的数字ID (可使用空格或逗号分隔多个ID)")
         
         elif choice == '4':
+            downloader.save_cookies()
             print("感谢使用，再见!")
             break
         
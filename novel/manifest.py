@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+卷目录下的下载清单和原子写入。
+
+每个卷目录中有一个 .manifest.json，按章节URL记录已保存的文本文件 (文件名、sha256、大小和修改时间)
+及插图的下载状态 (格式见 VolumeManifest)。重新下载、暂停后继续时:
+  - 文本与记录一致且插图齐全的章节直接跳过；
+  - 文本已保存但缺少插图的章节只补下载插图；
+  - 文本被截断或改动过的章节重新下载。
+章节文本都经 atomic_write_lines 先写 .part 文件再替换，中断后不会留下写了一半的文件。
+
+    from novel.manifest import VolumeManifest
+    manifest = VolumeManifest(volume_dir)
+    if not manifest.is_complete(chapter): ...
+    manifest.record(chapter, text_file, sha256, images)
+    manifest.flush()
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+from threading import Lock
+
+from novel.parsing import safe_chapter_filename
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILENAME = '.manifest.json'
+FLUSH_EVERY = 16  # 累计这么多次修改后写一次清单文件，其余在 flush() 时写入
+HASH_CHUNK_SIZE = 256 * 1024
+# 章节文本末尾的插图引用行 (见 novel.volume_text.save_chapter_text)
+_IMAGE_REFERENCE = re.compile(r'^\[插图: (.+)\]$', re.MULTILINE)
+
+
+def atomic_write_lines(path, lines):
+    """
+    逐行写入临时文件再替换 (行之间以换行分隔)，避免中断后留下写了一半的文件。
+    返回写入内容的 sha256
+    """
+    digest = hashlib.sha256()
+    tmp_path = f"{path}.part"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        for index, line in enumerate(lines):
+            chunk = f"\n{line}" if index else line
+            f.write(chunk)
+            digest.update(chunk.encode('utf-8'))
+    os.replace(tmp_path, path)
+    return digest.hexdigest()
+
+
+def text_file_sha256(path):
+    """按文本读取 (换行统一为 \\n) 计算 sha256，与 atomic_write_lines 返回的值一致"""
+    digest = hashlib.sha256()
+    with open(path, 'r', encoding='utf-8') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), ''):
+            digest.update(chunk.encode('utf-8'))
+    return digest.hexdigest()
+
+
+class VolumeManifest:
+    """
+    卷目录下的下载清单 (.manifest.json)，按章节URL记录已完成的章节:
+        {"chapters": {"<url>": {"title": ..., "text_file": ..., "sha256": ..., "size": ..., "mtime": ...,
+                                "images": [{"url": ..., "file": ..., "done": true}, ...],
+                                "timestamp": ...}}}
+    重新下载时跳过已完成的章节，只补下载缺失的插图。
+    文本文件先比较大小和修改时间，修改时间变了才重新计算 sha256，被截断或改动过的章节会重新下载。
+    修改先保存在内存中，每 FLUSH_EVERY 次写一次文件，下载结束时需调用 flush()；
+    中途崩溃丢失的记录在查询时由卷目录中已写完的文本文件补回 (文本文件都是整体替换写入的)。
+    """
+
+    def __init__(self, volume_dir):
+        self.volume_dir = volume_dir
+        self.path = os.path.join(volume_dir, MANIFEST_FILENAME)
+        self._lock = Lock()
+        self._dirty = 0  # 尚未写入文件的修改次数
+        self.chapters = {}
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self.chapters = json.load(f).get('chapters', {})
+            except (IOError, ValueError) as e:
+                logger.warning(f"读取下载清单失败，将重新下载该卷 {self.path}: {e}")
+                self.chapters = {}
+        # 清单中没有记录的文本文件，查询到对应章节时补回记录
+        recorded = {entry.get('text_file') for entry in self.chapters.values()}
+        try:
+            self._unrecorded = {name for name in os.listdir(volume_dir)
+                                if name.endswith('.txt') and name not in recorded}
+        except OSError:
+            self._unrecorded = set()
+
+    def _save(self):
+        """调用方需持有锁"""
+        self._dirty = 0
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'chapters': self.chapters}, f, ensure_ascii=False, indent=1)
+            os.replace(tmp_path, self.path)
+        except IOError as e:
+            logger.warning(f"保存下载清单失败 {self.path}: {e}")
+
+    def _changed(self):
+        """记录一次修改，累计到 FLUSH_EVERY 次时写入文件，调用方需持有锁"""
+        self._dirty += 1
+        if self._dirty >= FLUSH_EVERY:
+            self._save()
+
+    def flush(self):
+        """把尚未写入的修改写入清单文件"""
+        with self._lock:
+            if self._dirty:
+                self._save()
+
+    def _file_ok(self, filename):
+        path = os.path.join(self.volume_dir, filename)
+        return os.path.exists(path) and os.path.getsize(path) > 0
+
+    def _recover(self, chapter):
+        """
+        按卷目录中已写完的文本文件补回章节记录，调用方需持有锁。
+        文本引用的插图都在时才补回 (缺失插图的下载地址无从得知，只能整章重新下载)
+        """
+        text_file = f"{safe_chapter_filename(chapter)}.txt"
+        if text_file not in self._unrecorded:
+            return None
+        self._unrecorded.discard(text_file)
+        path = os.path.join(self.volume_dir, text_file)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                images = _IMAGE_REFERENCE.findall(f.read())
+            if not all(self._file_ok(image) for image in images):
+                return None
+            stat = os.stat(path)
+            sha256 = text_file_sha256(path)
+        except (OSError, ValueError):
+            return None
+        entry = {
+            'title': chapter['title'],
+            'text_file': text_file,
+            'sha256': sha256,
+            'size': stat.st_size,
+            'mtime': stat.st_mtime,
+            'images': [{'url': None, 'file': image, 'done': True} for image in images],
+            'timestamp': time.time()
+        }
+        self.chapters[chapter['url']] = entry
+        self._changed()
+        return entry
+
+    def _text_ok(self, entry):
+        """
+        章节文本文件与记录一致：大小相同，且修改时间相同或内容的 sha256 相同，调用方需持有锁。
+        没有大小和修改时间的旧记录直接比较 sha256，两者都没有时只检查文件非空
+        """
+        path = os.path.join(self.volume_dir, entry['text_file'])
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return False
+        if not stat.st_size or ('size' in entry and stat.st_size != entry['size']):
+            return False
+        if stat.st_mtime == entry.get('mtime') or not entry.get('sha256'):
+            return True
+        try:
+            if text_file_sha256(path) != entry['sha256']:
+                return False
+        except (OSError, ValueError):
+            return False
+        # 内容未变，只是修改时间变了 (如复制过目录)，更新记录免得下次再算
+        entry['size'], entry['mtime'] = stat.st_size, stat.st_mtime
+        self._changed()
+        return True
+
+    def get(self, chapter):
+        """
+        章节的记录 (副本)；文本文件与记录不一致时返回 None，该章节需要重新下载。
+        """
+        with self._lock:
+            entry = self.chapters.get(chapter['url']) or self._recover(chapter)
+            if entry and entry.get('text_file') and not self._text_ok(entry):
+                return None
+            return json.loads(json.dumps(entry)) if entry else None
+
+    def missing_images(self, entry):
+        """返回清单条目中尚未下载或文件已丢失的插图"""
+        return [image for image in entry.get('images', []) if not image.get('done') or not self._file_ok(image['file'])]
+
+    def is_complete(self, chapter):
+        """章节文本文件存在且全部插图都已下载"""
+        entry = self.get(chapter)
+        if not entry:
+            return False
+        return not self.missing_images(entry)
+
+    def is_partial(self, chapter):
+        """章节文本已保存，但仍有插图缺失，可以只补下载插图"""
+        entry = self.get(chapter)
+        if not entry or not entry.get('images'):
+            return False
+        missing = self.missing_images(entry)
+        # 由文本文件补回的记录没有插图地址，无法只补下载插图
+        return bool(missing) and all(image.get('url') for image in missing)
+
+    def record(self, chapter, text_file, sha256, images):
+        """
+        记录章节下载结果。
+        images: [{"url": ..., "file": ..., "done": bool}, ...]
+        """
+        entry = {
+            'title': chapter['title'],
+            'text_file': text_file,
+            'sha256': sha256,
+            'images': images,
+            'timestamp': time.time()
+        }
+        if text_file:
+            try:
+                stat = os.stat(os.path.join(self.volume_dir, text_file))
+                entry['size'], entry['mtime'] = stat.st_size, stat.st_mtime
+            except OSError:
+                pass
+        with self._lock:
+            self.chapters[chapter['url']] = entry
+            self._unrecorded.discard(text_file)
+            self._changed()
+
+    def mark_image_done(self, chapter, image_file):
+        with self._lock:
+            entry = self.chapters.get(chapter['url'])
+            if not entry:
+                return
+            for image in entry.get('images', []):
+                if image['file'] == image_file:
+                    image['done'] = True
+            entry['timestamp'] = time.time()
+            self._changed()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import json
+import logging
+import os
+import time
+from threading import Lock
+
+from utils import get_app_base_dir
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL = 6 * 60 * 60  # 默认缓存6小时
+
+
+class MetadataCache:
+    """
+    小说元数据磁盘缓存，按小说ID保存详情页和目录页的解析结果。
+
+    每本小说对应一个 JSON 文件，内容形如:
+        {"details": {"value": {...}, "timestamp": 1700000000.0},
+         "volumes": {"value": [...], "timestamp": 1700000000.0}}
+    """
+
+    def __init__(self, cache_dir=None, ttl=DEFAULT_TTL):
+        self.cache_dir = cache_dir or os.path.join(get_app_base_dir(), 'novel_cache', 'metadata')
+        self.ttl = ttl
+        self._lock = Lock()
+        self._memory = {}  # novel_id -> 已加载的缓存内容
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _path(self, novel_id):
+        return os.path.join(self.cache_dir, f"{novel_id}.json")
+
+    def _load(self, novel_id):
+        """读取某本小说的缓存，调用方需持有锁"""
+        key = str(novel_id)
+        if key in self._memory:
+            return self._memory[key]
+        entry = {}
+        path = self._path(key)
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    entry = json.load(f)
+            except (IOError, ValueError):
+                entry = {}
+        self._memory[key] = entry
+        return entry
+
+    def get(self, novel_id, field):
+        """获取缓存字段 ('details' 或 'volumes')，不存在或已过期时返回None"""
+        if novel_id is None:
+            return None
+        with self._lock:
+            record = self._load(novel_id).get(field)
+        if not record:
+            return None
+        if self.ttl is not None and time.time() - record.get('timestamp', 0) > self.ttl:
+            return None
+        return record.get('value')
+
+    def set(self, novel_id, field, value):
+        """写入缓存字段，并以原子方式保存到磁盘"""
+        if novel_id is None:
+            return
+        key = str(novel_id)
+        with self._lock:
+            entry = dict(self._load(key))
+            entry[field] = {'value': value, 'timestamp': time.time()}
+            self._memory[key] = entry
+            path = self._path(key)
+            tmp_path = f"{path}.tmp"
+            try:
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(entry, f, ensure_ascii=False)
+                os.replace(tmp_path, path)
+            except IOError as e:
+                logger.warning(f"写入元数据缓存失败 {path}: {e}")
+
+    def invalidate(self, novel_id=None):
+        """使某本小说的缓存失效；novel_id 为 None 时清空全部缓存"""
+        with self._lock:
+            if novel_id is None:
+                keys = [name[:-len('.json')] for name in os.listdir(self.cache_dir) if name.endswith('.json')]
+                self._memory.clear()
+            else:
+                keys = [str(novel_id)]
+                self._memory.pop(str(novel_id), None)
+            for key in keys:
+                try:
+                    os.remove(self._path(key))
+                except FileNotFoundError:
+                    pass
+                except OSError as e:
+                    logger.warning(f"删除元数据缓存失败 {key}: {e}")
+
+    def clear(self):
+        """清空全部元数据缓存"""
+        self.invalidate()
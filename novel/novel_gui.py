@@ -3,8 +3,10 @@
 
 import sys
 import os
+import logging
 import re
 import shutil
+import itertools
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QLabel, QVBoxLayout, QHBoxLayout, QWidget, 
                              QMenuBar, QStatusBar, QLineEdit, QPushButton, QListWidget, QTabWidget,
                              QGroupBox, QFormLayout, QSpinBox, QCheckBox, QComboBox, QFileDialog,
@@ -18,15 +20,28 @@ import time
 
 # 导入您的下载器类
 from novel.main import Wenku8Downloader
+from novel.hosts import DEFAULT_MIRRORS, PAGES, PACKS
+from novel.metadata_cache import MetadataCache
+from novel.search_cache import SearchCache
+from novel.scheduler import ChapterBudget, PRIORITY_NAMES, PRIORITY_NORMAL, PRIORITY_HIGH
+from novel.progress import EventType, ProgressTracker, format_duration
 from novel.epub_converter import txt_to_epub
 
 from utils import get_app_base_dir
+import log_pipeline
 import novel.config as config
 from novel.settings import load_settings, save_settings
 load_success, load_msg = load_settings()
 print(load_msg)
 INITIAL_SETTINGS = config.SETTINGS.copy() if hasattr(config, 'SETTINGS') and config.SETTINGS else {}
 
+logger = logging.getLogger(__name__)
+
+
+def _gui_log_filter(record):
+    """界面日志显示本界面的日志，以及下载器各模块的警告和错误"""
+    return record.name.startswith(__name__) or record.levelno >= logging.WARNING
+
 def parse_volume_range(range_text, max_volumes):
     """
     解析卷范围字符串，返回卷索引列表
@@ -292,6 +307,22 @@ class ChapterInfoDialog(QDialog):
         self.accept()
 
 
+class LoginWorker(QThread):
+    """在后台验证保存的登录信息或登录，避免界面卡住"""
+    login_finished = pyqtSignal(bool)
+
+    def __init__(self, downloader, parent=None):
+        super().__init__(parent)
+        self.downloader = downloader
+
+    def run(self):
+        try:
+            self.login_finished.emit(self.downloader.ensure_login())
+        except Exception as e:
+            logger.warning(f"登录时发生错误: {e}")
+            self.login_finished.emit(False)
+
+
 class NetworkWorker(QThread):
     search_complete = pyqtSignal(dict)
     novel_details_ready = pyqtSignal(dict)
@@ -314,7 +345,8 @@ class NetworkWorker(QThread):
                 result = self.downloader.search_novels(
                     keyword=keyword, 
                     search_type=search_type,
-                    page_url=page_url
+                    page_url=page_url,
+                    on_cover_ready=self.kwargs.get('on_cover_ready')
                 )
                 self.search_complete.emit(result)
                 
@@ -328,7 +360,8 @@ class NetworkWorker(QThread):
             
             elif self.operation_type == "chapter_list":
                 catalog_url = self.kwargs.get('catalog_url')
-                chapters = self.downloader.get_chapter_list(catalog_url)
+                novel_id = self.kwargs.get('novel_id')
+                chapters = self.downloader.get_chapter_list(catalog_url, novel_id)
                 self.chapter_list_ready.emit(chapters)
                     
         except Exception as e:
@@ -336,10 +369,11 @@ class NetworkWorker(QThread):
 
 class DownloadWorker(QThread):
     progress_update = pyqtSignal(str)
+    progress_event = pyqtSignal(object)  # 本任务的 ProgressEvent (不含文字日志)
     download_complete = pyqtSignal(bool, str)
     
     def __init__(self, downloader, novel_id, novel_name, output_dir, max_retries, 
-                 download_type='full', volume_indices=None, parent=None):
+                 download_type='full', volume_indices=None, task_key=None, parent=None):
         super().__init__(parent)
         self.downloader = downloader
         self.novel_id = novel_id
@@ -348,9 +382,27 @@ class DownloadWorker(QThread):
         self.max_retries = max_retries
         self.download_type = download_type
         self.volume_indices = volume_indices or []
+        self.task_key = task_key  # 在下载器的 chapter_budget 中登记的任务标识
         self.is_cancelled = False
     
     def run(self):
+        if self.downloader is None:
+            self.download_complete.emit(False, f"下载《{self.novel_name}》失败: 请先登录")
+            return
+        
+        # 下载器的进度事件在各个下载线程中发出，只把属于本任务的事件转发到界面线程
+        def forward(event):
+            if event.task == self.task_key and event.type is not EventType.MESSAGE:
+                self.progress_event.emit(event)
+        
+        self.downloader.progress.subscribe(forward)
+        try:
+            with self.downloader.progress.bind(self.task_key):
+                self._run_download()
+        finally:
+            self.downloader.progress.unsubscribe(forward)
+    
+    def _run_download(self):
         try:
             safe_novel_name = re.sub(r'[\\\\/:*?\"<>|]', '_', self.novel_name)
             novel_specific_output_dir = os.path.join(self.output_dir, safe_novel_name)
@@ -361,7 +413,8 @@ class DownloadWorker(QThread):
                 success = self.downloader.download_novel(
                     self.novel_id,
                     output_dir=novel_specific_output_dir,
-                    max_retries=self.max_retries
+                    max_retries=self.max_retries,
+                    budget_key=self.task_key
                 )
             elif self.download_type in ['volume', 'range'] and self.volume_indices:
                 if len(self.volume_indices) == 1:
@@ -372,13 +425,19 @@ class DownloadWorker(QThread):
                         self.novel_id,
                         volume_index,
                         output_dir=novel_specific_output_dir,
-                        max_retries=self.max_retries
+                        max_retries=self.max_retries,
+                        budget_key=self.task_key
                     )
                 else:
                     # 多卷下载
                     volume_names = [f"第{i+1}卷" for i in self.volume_indices]
                     self.progress_update.emit(f"开始下载小说多卷 ID: {self.novel_id} ({', '.join(volume_names)}) ({self.novel_name}) 到 {novel_specific_output_dir}")
                     success = True
+                    # 按整个范围的章节数发出一次开始事件，逐卷下载时不再各自发出
+                    self.downloader.progress.emit(
+                        EventType.DOWNLOAD_STARTED,
+                        value=self.downloader.count_volume_chapters(self.novel_id, self.volume_indices)
+                    )
                     
                     for volume_index in self.volume_indices:
                         if self.is_cancelled:
@@ -389,7 +448,9 @@ class DownloadWorker(QThread):
                             self.novel_id,
                             volume_index,
                             output_dir=novel_specific_output_dir,
-                            max_retries=self.max_retries
+                            max_retries=self.max_retries,
+                            budget_key=self.task_key,
+                            announce_start=False
                         )
                         
                         if not volume_success:
@@ -420,6 +481,9 @@ class DownloadWorker(QThread):
     
     def cancel(self):
         self.is_cancelled = True
+        # 尚未开始的章节不再申请名额，正在下载的章节完成后任务即结束
+        if self.downloader and self.downloader.chapter_budget is not None:
+            self.downloader.chapter_budget.cancel(self.task_key)
 
 class EpubExportWorker(QThread):
     export_progress = pyqtSignal(str)
@@ -448,6 +512,9 @@ class EpubExportWorker(QThread):
             self.export_finished.emit(False, f"EPUB 转换过程中发生错误: {e}")
     
 class MainWindow(QMainWindow):
+    cover_ready = pyqtSignal(str, str)  # 后台封面下载完成: (小说ID, 封面路径)
+    log_lines = pyqtSignal(list)  # 日志线程每批输出的日志行
+
     def __init__(self):
         super().__init__()
         self.setWindowTitle("轻小说文库下载器")
@@ -455,8 +522,17 @@ class MainWindow(QMainWindow):
         
         # 初始化变量
         self.downloader = None
+        self.login_worker = None
         self.network_worker = None
-        self.download_worker = None
+        self.active_downloads = {}  # 任务标识 -> (DownloadWorker, 下载任务)
+        self.pausing_downloads = {}  # 已暂停但线程尚未结束的任务标识 -> DownloadWorker
+        self.queue_running = False
+        self._task_keys = itertools.count(1)
+        self._queue_display_tasks = []  # 与队列列表各行对应的下载任务
+        # 下载进行中定时刷新进度条、速率和剩余时间
+        self.progress_refresh_timer = QTimer(self)
+        self.progress_refresh_timer.setInterval(500)
+        self.progress_refresh_timer.timeout.connect(self._update_download_progress)
         self.epub_export_worker = None
         self.current_search_results = []
         self.current_pagination_info = None
@@ -465,11 +541,21 @@ class MainWindow(QMainWindow):
         
         # 默认设置
         self.settings = INITIAL_SETTINGS
+        # 同时下载的多本小说共用的章节并发名额，按优先级加权公平分配
+        self.chapter_budget = ChapterBudget(self.settings.get('max_workers', 4))
         
         self._create_menu_bar()
         self._create_status_bar()
         self._init_ui()
         self._load_settings()
+        # 封面由下载器的后台线程下载，通过信号回到界面线程更新
+        self.cover_ready.connect(self._handle_cover_ready)
+        # 日志由日志线程成批交给界面，每批只追加和滚动一次
+        log_pipeline.setup_logging(self.settings.get('log_levels', ''))
+        self.log_lines.connect(self._append_log_lines)
+        self.gui_log_handler = log_pipeline.CallbackHandler(self.log_lines.emit)
+        self.gui_log_handler.addFilter(_gui_log_filter)
+        log_pipeline.add_handler(self.gui_log_handler, name_filter='novel')
         
     def _create_menu_bar(self):
         menu_bar = self.menuBar()
@@ -665,9 +751,17 @@ class MainWindow(QMainWindow):
         self.clear_queue_button = QPushButton("清空队列")
         self.clear_queue_button.clicked.connect(self._clear_queue)
         
+        self.raise_priority_button = QPushButton("提高优先级")
+        self.raise_priority_button.clicked.connect(lambda: self._change_queue_priority(1))
+        
+        self.lower_priority_button = QPushButton("降低优先级")
+        self.lower_priority_button.clicked.connect(lambda: self._change_queue_priority(-1))
+        
         queue_control_layout.addWidget(self.start_queue_button)
         queue_control_layout.addWidget(self.pause_queue_button)
         queue_control_layout.addWidget(self.clear_queue_button)
+        queue_control_layout.addWidget(self.raise_priority_button)
+        queue_control_layout.addWidget(self.lower_priority_button)
         queue_control_layout.addStretch()
         
         queue_control_group.setLayout(queue_control_layout)
@@ -689,12 +783,14 @@ class MainWindow(QMainWindow):
         
         self.current_download_label = QLabel("当前下载: 无")
         self.download_progress_bar = QProgressBar()
+        self.download_rate_label = QLabel("")
         self.download_status_text = QTextEdit()
         self.download_status_text.setMaximumHeight(150)
         self.download_status_text.setReadOnly(True)
         
         progress_layout.addWidget(self.current_download_label)
         progress_layout.addWidget(self.download_progress_bar)
+        progress_layout.addWidget(self.download_rate_label)
         progress_layout.addWidget(QLabel("下载日志:"))
         progress_layout.addWidget(self.download_status_text)
         
@@ -836,6 +932,52 @@ class MainWindow(QMainWindow):
         
         download_layout.addRow("最大重试次数:", self.max_retries_spinbox)
         
+        self.max_workers_spinbox = QSpinBox()
+        self.max_workers_spinbox.setRange(1, 16)
+        self.max_workers_spinbox.setValue(4)
+        self.max_workers_spinbox.setToolTip("同时下载多本小说时，所有小说合计的章节数上限")
+        download_layout.addRow("同时下载章节数:", self.max_workers_spinbox)
+        
+        self.max_parallel_novels_spinbox = QSpinBox()
+        self.max_parallel_novels_spinbox.setRange(1, 8)
+        self.max_parallel_novels_spinbox.setValue(2)
+        download_layout.addRow("队列同时下载小说数:", self.max_parallel_novels_spinbox)
+        
+        self.max_connections_per_host_spinbox = QSpinBox()
+        self.max_connections_per_host_spinbox.setRange(1, 16)
+        self.max_connections_per_host_spinbox.setValue(4)
+        download_layout.addRow("每个站点最大并发请求:", self.max_connections_per_host_spinbox)
+        
+        self.max_requests_per_second_spinbox = QSpinBox()
+        self.max_requests_per_second_spinbox.setRange(1, 50)
+        self.max_requests_per_second_spinbox.setValue(10)
+        self.max_requests_per_second_spinbox.setToolTip("请求速率会根据站点响应自动调节，遇到限流时自动降速")
+        download_layout.addRow("每秒最大请求数:", self.max_requests_per_second_spinbox)
+        
+        self.max_image_workers_spinbox = QSpinBox()
+        self.max_image_workers_spinbox.setRange(1, 16)
+        self.max_image_workers_spinbox.setValue(6)
+        download_layout.addRow("同时下载插图数:", self.max_image_workers_spinbox)
+        
+        self.bulk_volume_mode_checkbox = QCheckBox("整卷获取文本 (减少请求数，插图章节仍逐章下载)")
+        self.bulk_volume_mode_checkbox.setChecked(True)
+        download_layout.addRow(self.bulk_volume_mode_checkbox)
+        
+        self.page_mirrors_edit = QLineEdit()
+        self.page_mirrors_edit.setPlaceholderText("https://www.wenku8.net, https://www.wenku8.cc")
+        self.page_mirrors_edit.setToolTip("多个地址用逗号分隔，自动选用延迟最低的可用镜像，超时或被拦截时切换到下一个")
+        download_layout.addRow("主站镜像:", self.page_mirrors_edit)
+        
+        self.pack_mirrors_edit = QLineEdit()
+        self.pack_mirrors_edit.setPlaceholderText("http://dl.wenku8.com")
+        self.pack_mirrors_edit.setToolTip("整卷文本下载服务器，多个地址用逗号分隔")
+        download_layout.addRow("下载服务器镜像:", self.pack_mirrors_edit)
+        
+        self.log_levels_edit = QLineEdit()
+        self.log_levels_edit.setPlaceholderText("如 novel.image_fetcher=WARNING, novel.main=DEBUG")
+        self.log_levels_edit.setToolTip("按模块设置日志级别 (DEBUG/INFO/WARNING/ERROR)，留空使用默认级别 INFO")
+        download_layout.addRow("日志级别:", self.log_levels_edit)
+        
         download_group.setLayout(download_layout)
         scroll_layout.addWidget(download_group)
         
@@ -845,6 +987,36 @@ class MainWindow(QMainWindow):
         self.clear_cache_button = QPushButton("清除封面缓存")
         self.clear_cache_button.clicked.connect(self._confirm_clear_cache)
         cache_layout.addWidget(self.clear_cache_button)
+        
+        metadata_ttl_layout = QHBoxLayout()
+        metadata_ttl_layout.addWidget(QLabel("目录缓存有效期:"))
+        self.metadata_cache_ttl_spinbox = QSpinBox()
+        self.metadata_cache_ttl_spinbox.setRange(0, 24 * 30)
+        self.metadata_cache_ttl_spinbox.setSuffix(" 小时 (0=不缓存)")
+        self.metadata_cache_ttl_spinbox.setValue(6)
+        metadata_ttl_layout.addWidget(self.metadata_cache_ttl_spinbox)
+        metadata_ttl_layout.addStretch()
+        cache_layout.addLayout(metadata_ttl_layout)
+        
+        search_cache_layout = QHBoxLayout()
+        search_cache_layout.addWidget(QLabel("搜索缓存有效期:"))
+        self.search_cache_ttl_spinbox = QSpinBox()
+        self.search_cache_ttl_spinbox.setRange(0, 24 * 30)
+        self.search_cache_ttl_spinbox.setSuffix(" 小时 (0=不缓存)")
+        self.search_cache_ttl_spinbox.setValue(24)
+        search_cache_layout.addWidget(self.search_cache_ttl_spinbox)
+        search_cache_layout.addWidget(QLabel("最多缓存:"))
+        self.search_cache_max_entries_spinbox = QSpinBox()
+        self.search_cache_max_entries_spinbox.setRange(10, 5000)
+        self.search_cache_max_entries_spinbox.setSuffix(" 页")
+        self.search_cache_max_entries_spinbox.setValue(200)
+        search_cache_layout.addWidget(self.search_cache_max_entries_spinbox)
+        search_cache_layout.addStretch()
+        cache_layout.addLayout(search_cache_layout)
+        
+        self.clear_metadata_cache_button = QPushButton("清除小说目录和搜索缓存")
+        self.clear_metadata_cache_button.clicked.connect(self._clear_metadata_cache)
+        cache_layout.addWidget(self.clear_metadata_cache_button)
         cache_group.setLayout(cache_layout)
         scroll_layout.addWidget(cache_group)
 
@@ -865,6 +1037,18 @@ class MainWindow(QMainWindow):
         self.password_edit.setText(self.settings.get('password', ''))
         self.output_dir_edit.setText(self.settings.get('output_dir', ''))
         self.max_retries_spinbox.setValue(self.settings.get('max_retries', 3))
+        self.max_workers_spinbox.setValue(self.settings.get('max_workers', 4))
+        self.max_parallel_novels_spinbox.setValue(self.settings.get('max_parallel_novels', 2))
+        self.max_connections_per_host_spinbox.setValue(self.settings.get('max_connections_per_host', 4))
+        self.max_requests_per_second_spinbox.setValue(self.settings.get('max_requests_per_second', 10))
+        self.max_image_workers_spinbox.setValue(self.settings.get('max_image_workers', 6))
+        self.bulk_volume_mode_checkbox.setChecked(self.settings.get('bulk_volume_mode', True))
+        self.metadata_cache_ttl_spinbox.setValue(self.settings.get('metadata_cache_ttl_hours', 6))
+        self.search_cache_ttl_spinbox.setValue(self.settings.get('search_cache_ttl_hours', 24))
+        self.search_cache_max_entries_spinbox.setValue(self.settings.get('search_cache_max_entries', 200))
+        self.page_mirrors_edit.setText(self.settings.get('page_mirrors', ''))
+        self.pack_mirrors_edit.setText(self.settings.get('pack_mirrors', ''))
+        self.log_levels_edit.setText(self.settings.get('log_levels', ''))
         self.auto_login_checkbox.setChecked(self.settings.get('auto_login', True))
         
         # 如果设置了自动登录，则尝试登录
@@ -879,11 +1063,40 @@ class MainWindow(QMainWindow):
             'output_dir': self.output_dir_edit.text().strip(),
             'output_epub_dir': self.epub_output_dir_edit.text().strip(),
             'max_retries': self.max_retries_spinbox.value(),
+            'max_workers': self.max_workers_spinbox.value(),
+            'max_parallel_novels': self.max_parallel_novels_spinbox.value(),
+            'max_connections_per_host': self.max_connections_per_host_spinbox.value(),
+            'max_requests_per_second': self.max_requests_per_second_spinbox.value(),
+            'max_image_workers': self.max_image_workers_spinbox.value(),
+            'bulk_volume_mode': self.bulk_volume_mode_checkbox.isChecked(),
+            'metadata_cache_ttl_hours': self.metadata_cache_ttl_spinbox.value(),
+            'search_cache_ttl_hours': self.search_cache_ttl_spinbox.value(),
+            'search_cache_max_entries': self.search_cache_max_entries_spinbox.value(),
+            'page_mirrors': self.page_mirrors_edit.text().strip(),
+            'pack_mirrors': self.pack_mirrors_edit.text().strip(),
+            'log_levels': self.log_levels_edit.text().strip(),
             'auto_login': self.auto_login_checkbox.isChecked()
         })
 
         save_settings(self.settings)
         
+        # 立即应用新的并发设置和日志级别
+        log_pipeline.set_levels(self.settings['log_levels'])
+        self.chapter_budget.resize(self.settings['max_workers'])
+        self._dispatch_queue()
+        if self.downloader:
+            self.downloader.configure_concurrency(
+                self.settings['max_workers'],
+                self.settings['max_connections_per_host']
+            )
+            self.downloader.metadata_cache.ttl = self.settings['metadata_cache_ttl_hours'] * 3600
+            self.downloader.search_cache.ttl = self.settings['search_cache_ttl_hours'] * 3600
+            self.downloader.search_cache.max_entries = self.settings['search_cache_max_entries']
+            self.downloader.rate_limiter.max_rate = self.settings['max_requests_per_second']
+            self.downloader.illustration_fetcher.configure(self.settings['max_image_workers'])
+            self.downloader.hosts.set_mirrors(self._mirror_settings())
+            self.downloader.bulk_volume_mode = self.settings['bulk_volume_mode']
+        
         # 创建输出目录
         output_dir = self.settings['output_dir']
         if output_dir:
@@ -898,6 +1111,13 @@ class MainWindow(QMainWindow):
         if directory:
             self.output_dir_edit.setText(directory)
     
+    def _mirror_settings(self):
+        """设置中的镜像列表，留空时使用默认镜像"""
+        return {
+            PAGES: self.settings.get('page_mirrors') or DEFAULT_MIRRORS[PAGES],
+            PACKS: self.settings.get('pack_mirrors') or DEFAULT_MIRRORS[PACKS],
+        }
+    
     def _handle_login(self):
         """处理登录"""
         username = self.settings.get('username') or self.username_edit.text().strip()
@@ -907,26 +1127,49 @@ class MainWindow(QMainWindow):
             QMessageBox.warning(self, "登录失败", "请先填写用户名和密码")
             return
             
-        try:
-            self.login_button.setEnabled(False)
-            self.login_status_label.setText("登录中...")
-            self.login_status_label.setStyleSheet("color: orange; font-weight: bold;")
-            
-            # 创建下载器实例
-            self.downloader = Wenku8Downloader(username=username, password=password)
+        if self.login_worker and self.login_worker.isRunning():
+            return
             
+        self.login_button.setEnabled(False)
+        self.login_status_label.setText("登录中...")
+        self.login_status_label.setStyleSheet("color: orange; font-weight: bold;")
+        
+        # 创建下载器实例 (不发出请求)，登录在后台线程中进行
+        if self.downloader:
+            self.downloader.cover_prefetcher.shutdown()
+            self.downloader.hosts.stop()
+        self.downloader = Wenku8Downloader(
+            username=username,
+            password=password,
+            max_workers=self.settings.get('max_workers', 4),
+            max_connections_per_host=self.settings.get('max_connections_per_host', 4),
+            max_requests_per_second=self.settings.get('max_requests_per_second', 10),
+            max_image_workers=self.settings.get('max_image_workers', 6),
+            metadata_cache_ttl=self.settings.get('metadata_cache_ttl_hours', 6) * 3600,
+            search_cache_ttl=self.settings.get('search_cache_ttl_hours', 24) * 3600,
+            search_cache_max_entries=self.settings.get('search_cache_max_entries', 200),
+            bulk_volume_mode=self.settings.get('bulk_volume_mode', True),
+            mirrors=self._mirror_settings()
+        )
+        self.downloader.chapter_budget = self.chapter_budget
+        self.downloader.hosts.start_probing()
+        
+        self.login_worker = LoginWorker(self.downloader, parent=self)
+        self.login_worker.login_finished.connect(self._handle_login_finished)
+        self.login_worker.start()
+    
+    def _handle_login_finished(self, success):
+        """后台登录完成"""
+        if success:
             self.login_status_label.setText("已登录")
             self.login_status_label.setStyleSheet("color: green; font-weight: bold;")
             self.login_button.setText("重新登录")
-            
             self.status_bar.showMessage("登录成功", 3000)
-            
-        except Exception as e:
+        else:
             self.login_status_label.setText("登录失败")
             self.login_status_label.setStyleSheet("color: red; font-weight: bold;")
-            self.status_bar.showMessage(f"登录失败: {e}", 5000)
-        finally:
-            self.login_button.setEnabled(True)
+            self.status_bar.showMessage("登录失败，请检查用户名和密码", 5000)
+        self.login_button.setEnabled(True)
     
     def _trigger_search(self):
         """触发搜索"""
@@ -961,7 +1204,8 @@ class MainWindow(QMainWindow):
             parent=self,
             keyword=keyword,
             search_type=search_type,
-            page_url=page_url
+            page_url=page_url,
+            on_cover_ready=lambda novel_id, cover_path: self.cover_ready.emit(str(novel_id), cover_path)
         )
         
         self.network_worker.search_complete.connect(self._handle_search_results)
@@ -1048,21 +1292,7 @@ class MainWindow(QMainWindow):
         self.novel_author_label.setText("作者: 加载中...")
         self.novel_description.setPlainText("双击查看章节信息和下载选项...")
         
-        # Load cover image
-        cover_path = novel_data.get('cover_image_path')
-        if cover_path and os.path.exists(cover_path):
-            pixmap = QPixmap(cover_path)
-            if not pixmap.isNull():
-                self.novel_cover_label.setPixmap(pixmap.scaled(
-                    self.novel_cover_label.size(), 
-                    Qt.AspectRatioMode.KeepAspectRatio, 
-                    Qt.TransformationMode.SmoothTransformation
-                ))
-            else:
-                self.novel_cover_label.setText("无法加载封面")
-        else:
-            self.novel_cover_label.setText("无封面")
-            self.novel_cover_label.setPixmap(QPixmap())
+        self._show_cover(novel_data.get('cover_image_path'))
 
         self.add_to_queue_button.setEnabled(True)
         self.download_now_button.setEnabled(True)
@@ -1082,6 +1312,34 @@ class MainWindow(QMainWindow):
         self.network_worker.error.connect(self._handle_network_error)
         self.network_worker.finished.connect(self._clear_network_worker)
         self.network_worker.start()
+
+    def _show_cover(self, cover_path):
+        """显示封面图片"""
+        if cover_path and os.path.exists(cover_path):
+            pixmap = QPixmap(cover_path)
+            if not pixmap.isNull():
+                self.novel_cover_label.setPixmap(pixmap.scaled(
+                    self.novel_cover_label.size(), 
+                    Qt.AspectRatioMode.KeepAspectRatio, 
+                    Qt.TransformationMode.SmoothTransformation
+                ))
+            else:
+                self.novel_cover_label.setText("无法加载封面")
+        else:
+            self.novel_cover_label.setText("无封面")
+            self.novel_cover_label.setPixmap(QPixmap())
+
+    def _handle_cover_ready(self, novel_id, cover_path):
+        """后台封面下载完成，更新对应的搜索结果；若该小说正被选中则刷新封面"""
+        for row in range(self.results_list.count()):
+            item = self.results_list.item(row)
+            novel_data = item.data(Qt.ItemDataRole.UserRole)
+            if not novel_data or str(novel_data.get('id')) != novel_id:
+                continue
+            novel_data['cover_image_path'] = cover_path
+            item.setData(Qt.ItemDataRole.UserRole, novel_data)
+            if item is self.results_list.currentItem():
+                self._show_cover(cover_path)
     
     def _handle_novel_details(self, details):
         """处理小说详情"""
@@ -1130,7 +1388,8 @@ class MainWindow(QMainWindow):
                     "chapter_list",
                     self.downloader,
                     parent=self,
-                    catalog_url=details['catalog_url']
+                    catalog_url=details['catalog_url'],
+                    novel_id=novel_data['id']
                 )
                 
                 def on_chapters_ready(volumes):
@@ -1160,56 +1419,50 @@ class MainWindow(QMainWindow):
         self.network_worker.finished.connect(lambda: None)  # 这里不清空，因为可能有后续操作
         self.network_worker.start()
     
+    @staticmethod
+    def _describe_volumes(volume_indices):
+        """下载范围的描述文字"""
+        if not volume_indices:
+            return "整本小说"
+        if len(volume_indices) == 1:
+            return f"第{volume_indices[0]+1}卷"
+        volume_names = [f"第{i+1}卷" for i in volume_indices]
+        return f"({', '.join(volume_names)})"
+    
+    def _is_duplicate_task(self, novel_data, volume_indices):
+        """相同的下载任务是否已在队列中或正在下载"""
+        tasks = self.download_queue + [task for _, task in self.active_downloads.values()]
+        return any(
+            task['novel_data']['id'] == novel_data['id'] and task.get('volume_indices') == volume_indices
+            for task in tasks
+        )
+    
     def _add_novel_to_queue(self, novel_data, volume_indices):
         """将小说（带卷选择）添加到下载队列"""
         # 检查是否已在队列中
-        for existing_item in self.download_queue:
-            if (existing_item['novel_data']['id'] == novel_data['id'] and 
-                existing_item.get('volume_indices') == volume_indices):
-                self.status_bar.showMessage("该下载任务已在队列中", 3000)
-                return
+        if self._is_duplicate_task(novel_data, volume_indices):
+            self.status_bar.showMessage("该下载任务已在队列中", 3000)
+            return
         
         # 创建下载任务
         download_task = {
             'novel_data': novel_data,
             'volume_indices': volume_indices,
-            'download_type': 'full' if not volume_indices else ('volume' if len(volume_indices) == 1 else 'range')
+            'download_type': 'full' if not volume_indices else ('volume' if len(volume_indices) == 1 else 'range'),
+            'priority': PRIORITY_NORMAL
         }
         
         self.download_queue.append(download_task)
+        self._update_queue_display()
         
-        # 生成描述
-        if not volume_indices:
-            desc = "整本小说"
-        elif len(volume_indices) == 1:
-            desc = f"第{volume_indices[0]+1}卷"
-        else:
-            volume_names = [f"第{i+1}卷" for i in volume_indices]
-            desc = f"({', '.join(volume_names)})"
-        
-        # 更新队列列表
-        queue_item = QListWidgetItem(
-            f"《{novel_data['name']}》 {desc} - 等待下载"
-        )
-        queue_item.setData(Qt.ItemDataRole.UserRole, download_task)
-        self.queue_list.addItem(queue_item)
-        
+        desc = self._describe_volumes(volume_indices)
         self.status_bar.showMessage(f"已添加《{novel_data['name']}》 {desc} 到下载队列", 3000)
+        
+        # 队列下载进行中时，新任务在有空位时自动开始
+        self._dispatch_queue()
     
     def _start_download_from_dialog(self, novel_data, volume_indices):
         """从对话框开始下载"""
-        if self.download_worker and self.download_worker.isRunning():
-            reply = QMessageBox.question(
-                self, 
-                "下载中", 
-                "当前有下载任务正在进行，是否要停止当前下载并开始新的下载？",
-                QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
-            )
-            if reply == QMessageBox.StandardButton.Yes:
-                self._pause_download()
-            else:
-                return
-        
         download_type = 'full' if not volume_indices else ('volume' if len(volume_indices) == 1 else 'range')
         self._start_single_download(novel_data, download_type, volume_indices)
     
@@ -1234,102 +1487,130 @@ class MainWindow(QMainWindow):
         novel_data = current_item.data(Qt.ItemDataRole.UserRole)
         if not novel_data:
             return
-            
-        if self.download_worker and self.download_worker.isRunning():
-            reply = QMessageBox.question(
-                self, 
-                "下载中", 
-                "当前有下载任务正在进行，是否要停止当前下载并开始新的下载？",
-                QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
-            )
-            if reply == QMessageBox.StandardButton.Yes:
-                self._pause_download()
-            else:
-                return
                 
         self._start_single_download(novel_data, 'full', [])
     
-    def _start_single_download(self, novel_data, download_type='full', volume_indices=None):
-        """开始单个下载"""
+    def _start_single_download(self, novel_data, download_type='full', volume_indices=None, priority=PRIORITY_HIGH):
+        """
+        立即开始下载，与正在进行的下载同时进行 (共用全局章节名额)。
+        立即下载的任务默认为高优先级，能分到更多的章节名额。
+        """
         if not self.settings.get('output_dir'):
             QMessageBox.warning(self, "设置错误", "请先在设置中指定输出目录")
             self._open_settings_tab()
             return
         
         volume_indices = volume_indices or []
-        novel_name = novel_data.get('name', f"UnknownNovel_{novel_data['id']}")
+        if self._is_duplicate_task(novel_data, volume_indices):
+            self.status_bar.showMessage("该下载任务已在队列中或正在下载", 3000)
+            return
         
-        # 生成描述
-        if download_type == 'full':
-            download_desc = "整本小说"
-        elif len(volume_indices) == 1:
-            download_desc = f"第{volume_indices[0]+1}卷"
-        else:
-            volume_names = [f"第{i+1}卷" for i in volume_indices]
-            download_desc = f"({', '.join(volume_names)})"
+        self._launch_download({
+            'novel_data': novel_data,
+            'volume_indices': volume_indices,
+            'download_type': download_type,
+            'priority': priority
+        })
         
-        self.current_download_label.setText(f"当前下载: 《{novel_name}》{download_desc}")
-        self.download_progress_bar.setRange(0, 0)  # 不确定进度
+        # 切换到下载队列标签页
+        self.tab_widget.setCurrentWidget(self.queue_tab)
+    
+    def _launch_download(self, download_task):
+        """为下载任务启动一个 DownloadWorker，并在章节名额调度器中登记"""
+        novel_data = download_task['novel_data']
+        novel_name = novel_data.get('name', f"UnknownNovel_{novel_data['id']}")
+        task_key = next(self._task_keys)
+        download_task['key'] = task_key
+        download_task['tracker'] = ProgressTracker()
+        self.chapter_budget.register(task_key, download_task['priority'])
         
-        self.download_worker = DownloadWorker(
+        download_worker = DownloadWorker(
             self.downloader,
             novel_data['id'],
             novel_name,
             self.settings['output_dir'],
             self.settings.get('max_retries', 3),
-            download_type,
-            volume_indices,
+            download_task['download_type'],
+            download_task['volume_indices'],
+            task_key=task_key,
             parent=self
         )
         
-        self.download_worker.progress_update.connect(self._handle_download_progress)
-        self.download_worker.download_complete.connect(self._handle_download_complete)
-        self.download_worker.start()
+        download_worker.progress_update.connect(self._handle_download_progress)
+        download_worker.progress_event.connect(
+            lambda event, task_key=task_key: self._handle_progress_event(task_key, event)
+        )
+        download_worker.download_complete.connect(
+            lambda success, message, task_key=task_key: self._handle_download_complete(task_key, success, message)
+        )
+        download_worker.finished.connect(
+            lambda task_key=task_key: self._handle_worker_finished(task_key)
+        )
+        self.active_downloads[task_key] = (download_worker, download_task)
+        download_worker.start()
         
         self.pause_queue_button.setEnabled(True)
-        self.start_queue_button.setEnabled(False)
-        
-        # 切换到下载队列标签页
-        self.tab_widget.setCurrentWidget(self.queue_tab)
+        self.progress_refresh_timer.start()
+        self._update_download_progress()
+        self._update_queue_display()
     
     def _start_queue_download(self):
-        """开始队列下载"""
+        """开始队列下载，同时下载的小说数不超过设置的上限"""
         if not self.download_queue:
             self.status_bar.showMessage("下载队列为空", 3000)
             return
-            
-        if self.download_worker and self.download_worker.isRunning():
-            self.status_bar.showMessage("已有下载任务在进行中", 3000)
+        
+        if not self.settings.get('output_dir'):
+            QMessageBox.warning(self, "设置错误", "请先在设置中指定输出目录")
+            self._open_settings_tab()
             return
-            
-        # 取出队列中的第一个
-        download_task = self.download_queue.pop(0)
-        novel_data = download_task['novel_data']
-        volume_indices = download_task['volume_indices']
-        download_type = download_task['download_type']
         
-        # 更新队列显示
-        self._update_queue_display()
+        self.queue_running = True
+        self.start_queue_button.setEnabled(False)
+        self.pause_queue_button.setEnabled(True)
+        self._dispatch_queue()
         
-        self._start_single_download(novel_data, download_type, volume_indices)
+        # 切换到下载队列标签页
+        self.tab_widget.setCurrentWidget(self.queue_tab)
+    
+    def _dispatch_queue(self):
+        """按优先级 (相同优先级按加入顺序) 从队列中取出任务，直到同时下载的小说数达到上限"""
+        if not self.queue_running:
+            return
+        max_parallel_novels = self.settings.get('max_parallel_novels', 2)
+        while len(self.active_downloads) + len(self.pausing_downloads) < max_parallel_novels:
+            # 已暂停但线程尚未结束的任务等线程结束后再开始，免得两个线程同时写同一部小说
+            ready_tasks = [task for task in self.download_queue if task.get('key') not in self.pausing_downloads]
+            if not ready_tasks:
+                break
+            download_task = max(ready_tasks, key=lambda task: task['priority'])
+            self.download_queue.remove(download_task)
+            self._launch_download(download_task)
+        self._update_queue_display()
     
     def _pause_download(self):
-        """暂停/取消下载"""
-        if self.download_worker and self.download_worker.isRunning():
-            self.download_worker.cancel()
-            self.download_worker.wait()  # 等待线程结束
+        """暂停下载：取消所有进行中的任务并放回队列开头，继续下载时跳过已完成的章节"""
+        self.queue_running = False
+        running = list(self.active_downloads.items())
+        for task_key, (download_worker, _) in running:
+            download_worker.cancel()  # 正在下载的章节结束后线程退出，见 _handle_worker_finished
+            self.pausing_downloads[task_key] = download_worker
+        self.active_downloads.clear()
+        self.download_queue[:0] = [download_task for _, (_, download_task) in running]
             
-        self.current_download_label.setText("当前下载: 无")
+        self.progress_refresh_timer.stop()
+        self._update_download_progress()
         self.download_progress_bar.setRange(0, 100)
         self.download_progress_bar.setValue(0)
         
         self.pause_queue_button.setEnabled(False)
         self.start_queue_button.setEnabled(True)
+        self._update_queue_display()
         
         self.status_bar.showMessage("下载已暂停", 3000)
     
     def _clear_queue(self):
-        """清空下载队列"""
+        """清空下载队列 (不影响正在下载的任务)"""
         reply = QMessageBox.question(
             self,
             "清空队列",
@@ -1339,54 +1620,139 @@ class MainWindow(QMainWindow):
         
         if reply == QMessageBox.StandardButton.Yes:
             self.download_queue.clear()
-            self.queue_list.clear()
+            self._update_queue_display()
             self.status_bar.showMessage("下载队列已清空", 3000)
     
+    def _change_queue_priority(self, step):
+        """调整所选任务的优先级；正在下载的任务立即按新的优先级分配章节名额"""
+        row = self.queue_list.currentRow()
+        if row < 0 or row >= len(self._queue_display_tasks):
+            return
+        download_task = self._queue_display_tasks[row]
+        levels = sorted(PRIORITY_NAMES)
+        index = min(max(levels.index(download_task['priority']) + step, 0), len(levels) - 1)
+        download_task['priority'] = levels[index]
+        if download_task.get('key') in self.active_downloads:
+            self.chapter_budget.set_priority(download_task['key'], download_task['priority'])
+        self._update_queue_display()
+        self.queue_list.setCurrentRow(self._queue_display_tasks.index(download_task))
+    
+    def _handle_progress_event(self, task_key, event):
+        """汇总下载任务的进度事件；失败、重试和拦截写入下载日志"""
+        entry = self.active_downloads.get(task_key)
+        if entry is None:
+            return
+        download_task = entry[1]
+        download_task['tracker'].update(event)
+        novel_name = download_task['novel_data']['name']
+        if event.type is EventType.CHAPTER_FINISHED and not event.value:
+            self._handle_download_progress(f"《{novel_name}》章节下载失败: {event.chapter}")
+        elif event.type is EventType.RETRY:
+            self._handle_download_progress(f"《{novel_name}》重试章节 (第{event.value}次): {event.chapter}")
+        elif event.type is EventType.BLOCKED:
+            self._handle_download_progress(f"《{novel_name}》请求被站点拦截 ({event.value})，已自动降速")
+    
+    def _update_download_progress(self):
+        """根据各任务的进度事件显示完成章节数、下载速度和预计剩余时间"""
+        running = [download_task for _, download_task in self.active_downloads.values()]
+        if not running:
+            self.current_download_label.setText("当前下载: 无")
+            self.download_rate_label.setText("")
+            return
+        
+        now = time.time()
+        trackers = [download_task['tracker'] for download_task in running]
+        parts = []
+        for download_task, tracker in zip(running, trackers):
+            part = f"《{download_task['novel_data']['name']}》"
+            if tracker.total:
+                part += f" {tracker.done}/{tracker.total}"
+            parts.append(part)
+        self.current_download_label.setText(f"当前下载 ({len(running)}): {'、'.join(parts)}")
+        
+        total = sum(tracker.total for tracker in trackers)
+        if total:
+            self.download_progress_bar.setRange(0, total)
+            self.download_progress_bar.setValue(min(total, sum(tracker.done for tracker in trackers)))
+        else:
+            self.download_progress_bar.setRange(0, 0)  # 章节列表获取完成前无法确定进度
+        
+        etas = [tracker.eta(now) for tracker in trackers]
+        eta = None if None in etas else max(etas)
+        status = (f"速度: {sum(tracker.chapter_rate(now) for tracker in trackers):.2f} 章/秒, "
+                  f"{sum(tracker.byte_rate(now) for tracker in trackers) / 1024:.0f} KB/秒  "
+                  f"预计剩余: {format_duration(eta)}")
+        retries = sum(tracker.retries for tracker in trackers)
+        blocks = sum(tracker.blocks for tracker in trackers)
+        if retries:
+            status += f"  重试 {retries} 次"
+        if blocks:
+            status += f"  被拦截 {blocks} 次"
+        self.download_rate_label.setText(status)
+    
     def _update_queue_display(self):
-        """更新队列显示"""
+        """更新队列显示：正在下载的任务在前，等待中的任务按开始顺序排列"""
         self.queue_list.clear()
-        for i, download_task in enumerate(self.download_queue):
+        running = [download_task for _, download_task in self.active_downloads.values()]
+        waiting = sorted(self.download_queue, key=lambda task: -task['priority'])
+        self._queue_display_tasks = running + waiting
+        for i, download_task in enumerate(self._queue_display_tasks):
             novel_data = download_task['novel_data']
-            volume_indices = download_task['volume_indices']
-            
-            # 生成描述
-            if not volume_indices:
-                desc = "整本小说"
-            elif len(volume_indices) == 1:
-                desc = f"第{volume_indices[0]+1}卷"
+            desc = self._describe_volumes(download_task['volume_indices'])
+            priority = PRIORITY_NAMES.get(download_task['priority'], '普通')
+            if i < len(running):
+                text = f"[下载中] 《{novel_data['name']}》 {desc} - 优先级: {priority}"
             else:
-                volume_names = [f"第{i+1}卷" for i in volume_indices]
-                desc = f"({', '.join(volume_names)})"
-            
-            queue_item = QListWidgetItem(
-                f"{i+1}. 《{novel_data['name']}》 {desc} - 等待下载"
-            )
+                text = f"{i - len(running) + 1}. 《{novel_data['name']}》 {desc} - 优先级: {priority} - 等待下载"
+            queue_item = QListWidgetItem(text)
             queue_item.setData(Qt.ItemDataRole.UserRole, download_task)
             self.queue_list.addItem(queue_item)
     
     def _handle_download_progress(self, message):
         """处理下载进度更新"""
-        self.download_status_text.append(f"[{time.strftime('%H:%M:%S')}] {message}")
+        logger.info(message)
         self.status_bar.showMessage(message)
-        
-        # 自动滚动到底部
+    
+    def _append_log_lines(self, lines):
+        """把一批日志行追加到下载日志并滚动到底部"""
+        self.download_status_text.append('\n'.join(lines))
         cursor = self.download_status_text.textCursor()
         cursor.movePosition(cursor.MoveOperation.End)
         self.download_status_text.setTextCursor(cursor)
     
-    def _handle_download_complete(self, success, message):
-        """处理下载完成"""
-        self.download_progress_bar.setRange(0, 100)
-        self.download_progress_bar.setValue(100 if success else 0)
+    def _handle_worker_finished(self, task_key):
+        """下载线程结束：已暂停的任务此时才释放章节名额，并可以重新开始"""
+        if self.pausing_downloads.pop(task_key, None) is None:
+            return
+        self.chapter_budget.unregister(task_key)
+        self._dispatch_queue()
+    
+    def _handle_download_complete(self, task_key, success, message):
+        """处理单个任务下载完成，队列下载进行中时接着开始下一个任务"""
+        if self.active_downloads.pop(task_key, None) is None:
+            return  # 已暂停的任务
+        self.chapter_budget.unregister(task_key)
         
-        self.download_status_text.append(f"[{time.strftime('%H:%M:%S')}] {message}")
+        logger.log(logging.INFO if success else logging.WARNING, message)
         
         if success:
-            self.status_bar.showMessage("下载完成！", 5000)
+            self.status_bar.showMessage(message, 5000)
         else:
             self.status_bar.showMessage("下载失败", 5000)
-            
-        self.current_download_label.setText("当前下载: 无")
+        
+        self._dispatch_queue()
+        self._update_download_progress()
+        self._update_queue_display()
+        if self.active_downloads:
+            return
+        
+        self.progress_refresh_timer.stop()
+        self.download_progress_bar.setRange(0, 100)
+        self.download_progress_bar.setValue(100 if success else 0)
+        if not self.download_queue:
+            self.queue_running = False
+        if self.queue_running:
+            return
         self.pause_queue_button.setEnabled(False)
         self.start_queue_button.setEnabled(True)
         
@@ -1504,7 +1870,12 @@ class MainWindow(QMainWindow):
             self.network_worker.quit()
             self.network_worker.wait()
             
-        if self.download_worker and self.download_worker.isRunning():
+        if self.login_worker and self.login_worker.isRunning():
+            self.login_worker.wait()
+            
+        running_workers = [worker for worker, _ in self.active_downloads.values() if worker.isRunning()]
+        running_workers += [worker for worker in self.pausing_downloads.values() if worker.isRunning()]
+        if running_workers:
             reply = QMessageBox.question(
                 self,
                 "确认退出",
@@ -1516,10 +1887,17 @@ class MainWindow(QMainWindow):
                 event.ignore()
                 return
                 
-            self.download_worker.cancel()
-            self.download_worker.wait()
+            for download_worker in running_workers:
+                download_worker.cancel()
+            for download_worker in running_workers:
+                download_worker.wait()
             
+        if self.downloader:
+            self.downloader.cover_prefetcher.shutdown()
+            self.downloader.hosts.stop()
+            self.downloader.save_cookies()
         self._clear_novel_cache_directory(silent=True)
+        log_pipeline.remove_handler(self.gui_log_handler)
         event.accept()
 
     def _confirm_clear_cache(self):
@@ -1533,6 +1911,20 @@ class MainWindow(QMainWindow):
         if reply == QMessageBox.StandardButton.Yes:
             self._clear_novel_cache_directory()
 
+    def _clear_metadata_cache(self):
+        """清除小说详情、目录和搜索结果缓存，下次浏览或下载时重新获取"""
+        if self.downloader:
+            stats = self.downloader.search_cache.stats()
+            self.downloader.invalidate_metadata()
+            self.downloader.search_cache.clear()
+            self.status_bar.showMessage(
+                f"小说目录和搜索缓存已清除 (本次搜索缓存命中 {stats['hits']} 次，未命中 {stats['misses']} 次)", 5000
+            )
+            return
+        MetadataCache().clear()
+        SearchCache().clear()
+        self.status_bar.showMessage("小说目录和搜索缓存已清除", 3000)
+
     def _clear_novel_cache_directory(self, silent=False):
         """Clears the novel cover cache directory."""
         cache_dir_to_clear = self.cover_cache_dir_path
@@ -1540,6 +1932,8 @@ class MainWindow(QMainWindow):
         if os.path.exists(cache_dir_to_clear):
             try:
                 shutil.rmtree(cache_dir_to_clear)
+                if self.downloader:
+                    self.downloader.cover_prefetcher.forget()
                 if not silent:
                     QMessageBox.information(self, "缓存已清除", f"缓存文件夹 '{cache_dir_to_clear}' 已成功删除。")
                 self.status_bar.showMessage("封面缓存已清除", 3000)
@@ -0,0 +1,538 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+轻小说文库页面解析函数。
+
+这些函数只处理已经获取到的 HTML 文本，不发起网络请求，
+因此同步下载器 (novel.main) 和异步引擎 (novel.async_engine) 可以共用。
+"""
+
+import bisect
+import logging
+import re
+from urllib.parse import urljoin
+from bs4 import BeautifulSoup
+from lxml import html as lxml_html
+
+from novel.cleanup_rules import get_cleanup_rules
+
+logger = logging.getLogger(__name__)
+
+
+def parse_search_results(html, response_url):
+    """
+    解析搜索结果页面 (或搜索直接跳转到的小说页面)。
+    Returns (novels, pagination_info). 封面只解析出 cover_image_url，由调用方负责下载。
+    pagination_info 为 None 表示没有找到记录或直接命中单本小说。
+    """
+    soup = BeautifulSoup(html, 'html.parser')
+
+    novels = []
+
+    # Try to select the main table containing search results first for robustness
+    search_result_table = soup.select_one('table.grid')
+    if search_result_table:
+         novel_entries = search_result_table.select('td > div[style*="width:373px"]')
+    else: # Fallback to original direct selection if table.grid not found
+         novel_entries = soup.select('td > div[style*="width:373px"]')
+
+    if not novel_entries and '/book/' not in response_url: # Check if not already a direct book page
+        # If no standard entries and not a direct book page, check for "没有找到记录"
+        no_results_msg = soup.find(string=re.compile("没有找到记录"))
+        if no_results_msg:
+            logger.info("搜索结果: 没有找到记录。")
+            return [], None
+
+    if not novel_entries:
+        # Handle case where search might redirect to a single book's page
+        if '/book/' in response_url and response_url.endswith('.htm'):
+            logger.info("搜索可能直接导向了单个小说页面。正在尝试提取基本信息。")
+            novel_info = {}
+            novel_id_match = re.search(r'/book/(\d+)\.htm', response_url)
+            if novel_id_match:
+                novel_info['id'] = int(novel_id_match.group(1))
+
+                title_elem = soup.select_one('div#title > h1') or \
+                             soup.select_one('td span[style*="font-size:16px"] b') or \
+                             soup.select_one('div#content table[width="90%"] tr > td[colspan="2"] > span > b')
+                novel_info['name'] = title_elem.get_text().strip() if title_elem else f"Novel {novel_info['id']}"
+
+                cover_elem = soup.select_one('#fmimg img') or \
+                             soup.select_one('div#content td[width="20%"] img[src*="/image/"]')
+                if cover_elem and cover_elem.get('src'):
+                    novel_info['cover_image_url'] = urljoin(response_url, cover_elem.get('src'))
+                else:
+                    novel_info['cover_image_url'] = None
+
+                # Default other fields for direct hits
+                defaults = {
+                    'author': '详见小说页面', 'update_date': '详见小说页面', 'word_count': '详见小说页面',
+                    'status': '详见小说页面', 'animated': False, 'tags': [], 'intro': '详见小说页面',
+                }
+                for key, default_val in defaults.items():
+                    if key not in novel_info: novel_info[key] = default_val
+
+                novels.append(novel_info)
+                return novels, None
+
+    for entry_div in novel_entries:
+        novel_info = {}
+
+        link_element = entry_div.select_one('b > a[href*="/book/"]')
+        if not link_element:
+            continue
+
+        href = link_element.get('href')
+        title_text = link_element.get('title') or link_element.get_text()
+        novel_info['name'] = title_text.strip()
+
+        novel_id_match = re.search(r'/book/(\d+)\.htm', href)
+        if not novel_id_match:
+            continue
+        novel_info['id'] = int(novel_id_match.group(1))
+
+        # Cover Image
+        cover_img_element = entry_div.select_one('div[style*="width:95px"] img')
+        if cover_img_element and cover_img_element.get('src'):
+            novel_info['cover_image_url'] = urljoin(response_url, cover_img_element.get('src'))
+        else:
+            novel_info['cover_image_url'] = None
+
+        # Details from <p> tags
+        info_div = entry_div.select_one('div[style*="margin-top:2px"]')
+        if info_div:
+            paragraphs = info_div.select('p')
+
+            # Author
+            if len(paragraphs) > 0:
+                author_text = paragraphs[0].get_text().strip()
+                novel_info['author'] = author_text.split('/')[0].replace('作者:', '').strip()
+            else:
+                novel_info['author'] = '未知作者'
+
+            # Update, Word Count, Status, Animated
+            if len(paragraphs) > 1:
+                p_status_line = paragraphs[1]
+                novel_info['animated'] = bool(p_status_line.select_one('span.hottext'))
+
+                temp_status_soup = BeautifulSoup(str(p_status_line), 'html.parser')
+                hottext_span = temp_status_soup.select_one('span.hottext')
+                if hottext_span:
+                    hottext_span.decompose()
+                status_text_cleaned = temp_status_soup.get_text().strip()
+
+                parts = status_text_cleaned.split('/')
+                novel_info['update_date'] = parts[0].replace('更新:', '').strip() if len(parts) > 0 else None
+                novel_info['word_count'] = parts[1].replace('字数:', '').strip() if len(parts) > 1 else None
+                raw_status = parts[2].strip() if len(parts) > 2 and parts[2].strip() else '未知状态'
+                # Ensure status doesn't include "已动画化" if it was only in span
+                novel_info['status'] = raw_status.replace("已动画化", "").strip("/") if novel_info['animated'] else raw_status
+
+            else:
+                novel_info['update_date'] = None
+                novel_info['word_count'] = None
+                novel_info['status'] = '未知状态'
+                novel_info['animated'] = False
+
+            # Tags
+            if len(paragraphs) > 2:
+                tags_p = paragraphs[2]
+                tags_span = tags_p.select_one('span')
+                if tags_span:
+                    novel_info['tags'] = [tag.strip() for tag in tags_span.get_text().strip().split(' ') if tag.strip()]
+                else: # Fallback if structure is different (e.g. no span)
+                    tag_text_content = tags_p.get_text().replace('Tags:', '').strip()
+                    novel_info['tags'] = [tag.strip() for tag in tag_text_content.split(' ') if tag.strip()] if tag_text_content else []
+            else:
+                novel_info['tags'] = []
+
+            # Intro
+            if len(paragraphs) > 3:
+                novel_info['intro'] = paragraphs[3].get_text().replace('简介:', '').strip()
+            else:
+                novel_info['intro'] = '暂无简介'
+        else: # Fallback if info_div is not found
+            novel_info.update({
+                'author': '未知作者', 'update_date': None, 'word_count': None,
+                'status': '未知状态', 'animated': False, 'tags': [], 'intro': '暂无简介'
+            })
+
+        novels.append(novel_info)
+
+    # Parse pagination info
+    pagination_info = {
+        'current_page': 1,
+        'total_pages': 1,
+        'next_page_url': None,
+        'prev_page_url': None,
+        'page_urls': {} # For direct page number access
+    }
+
+    pages_div = soup.select_one('div.pages div#pagelink, div.pages') # Added div.pages as alternative
+    if pages_div:
+        page_stats_elem = pages_div.select_one('em#pagestats')
+        if page_stats_elem:
+            stats_text = page_stats_elem.get_text().strip()
+            page_match = re.match(r'(\d+)/(\d+)', stats_text)
+            if page_match:
+                pagination_info['current_page'] = int(page_match.group(1))
+                pagination_info['total_pages'] = int(page_match.group(2))
+
+        next_page_link_elem = pages_div.select_one('a.next[href]')
+        if next_page_link_elem:
+            next_href = next_page_link_elem.get('href')
+            if next_href:
+                pagination_info['next_page_url'] = urljoin(response_url, next_href)
+
+        # Previous page link (often uses 'pgroup' for <, 'prev' might be specific)
+        # Using a more general approach for previous link
+        prev_page_link_elem = pages_div.select('a[href*="page="]') 
+        # Find the link that is likely the previous page relative to current
+        current_pg_num = pagination_info['current_page']
+        if current_pg_num > 1:
+            for plink in prev_page_link_elem:
+                try:
+                    # Check if it's the direct previous page number or a "<" type link
+                    if f"page={current_pg_num-1}" in plink.get('href') or (plink.get_text(strip=True) == '<' or plink.get_text(strip=True) == '<<'):
+                        # Ensure it's not the current page itself if text is just number
+                        if plink.get_text(strip=True) != str(current_pg_num):
+                            # Check if the href is not just '#' or javascript:;
+                            href_val = plink.get('href')
+                            if href_val and href_val.strip() not in ['#', 'javascript:;']:
+                                pagination_info['prev_page_url'] = urljoin(response_url, href_val)
+                                # Prefer the link that explicitly says "page=X-1" if multiple match
+                                if f"page={current_pg_num-1}" in href_val:
+                                    break 
+                except:
+                    pass
+
+
+        # Extract all page number links for direct access
+        all_page_links = pages_div.select('a[href*="page="]')
+        for link in all_page_links:
+            page_num_match = re.search(r'page=(\d+)', link.get('href'))
+            link_text = link.get_text().strip()
+            if page_num_match:
+                try:
+                    pg_num = int(page_num_match.group(1))
+                    if link_text.isdigit() and int(link_text) == pg_num: # Ensure it's a direct page number link
+                        pagination_info['page_urls'][pg_num] = urljoin(response_url, link.get('href'))
+                except ValueError:
+                    continue # Link text might be '<<', '>>', etc.
+
+    return novels, pagination_info
+
+
+def parse_novel_details(html, response_url, novel_id):
+    """解析小说详情页，返回包含标题、作者和目录URL的字典"""
+    soup = BeautifulSoup(html, 'html.parser')
+
+    title = f"Novel_{novel_id}"
+    title_span = soup.select_one('div#title > h1')
+    if not title_span:
+        title_span = soup.select_one('td span[style*="font-size:16px"] b')
+    if title_span:
+        title = title_span.get_text().strip()
+    else:
+        title_tag = soup.find('title')
+        if title_tag:
+            title_text = title_tag.get_text().strip()
+            if " - " in title_text:
+                title = title_text.split(" - ")[0].strip()
+            elif "-" in title_text:
+                title = title_text.split("-")[0].strip()
+            else:
+                title = title_text
+
+    author = "未知作者"
+    author_elem = soup.select_one('.author, #author') 
+    if author_elem:
+        author = author_elem.get_text().replace('作者：', '').strip()
+    else:
+        for td in soup.select('td'):
+            text = td.get_text().strip()
+            if text.startswith('小说作者：'):
+                author = text.replace('小说作者：', '').strip()
+                break
+
+    catalog_url = None
+    catalog_link_elem = soup.find('a', string=re.compile(r"小说目录"))
+    if catalog_link_elem and catalog_link_elem.get('href'):
+        catalog_href = catalog_link_elem.get('href')
+        catalog_url = urljoin(response_url, catalog_href)
+
+    if not catalog_url:
+        logger.warning(f"警告: 未能在页面上动态找到小说ID {novel_id} 的目录链接。将尝试使用默认模式，但这可能不准确。")
+
+    if not catalog_url:
+        logger.warning(f"错误: 无法确定小说ID {novel_id} 的目录URL。下载可能失败。")
+    else:
+        logger.info(f"解析结果: 标题='{title}', 作者='{author}', 目录URL='{catalog_url}'")
+
+    return {
+        'id': novel_id,
+        'title': title,
+        'author': author,
+        'catalog_url': catalog_url
+    }
+
+
+def parse_chapter_list(html, catalog_url):
+    """解析目录页，返回按卷分组的章节列表"""
+    soup = BeautifulSoup(html, 'html.parser')
+
+    volumes = []  # 存储卷信息的列表
+    current_volume = None
+
+    table = soup.select_one('table.css')
+    if not table:
+        logger.warning("未找到章节表格")
+        return []
+
+    for row in table.select('tr'):
+        # 检查是否是卷标题行
+        volume_td = row.select_one('td.vcss[colspan="4"]')
+        if volume_td:
+            volume_title = volume_td.get_text().strip()
+            logger.info(f"找到卷: {volume_title}")
+
+            # 创建新的卷
+            current_volume = {
+                'title': volume_title,
+                'chapters': []
+            }
+            # 卷ID (如 <td class="vcss" colspan="4" vid="12345">)，用于整卷下载文本
+            if volume_td.get('vid', '').isdigit():
+                current_volume['vid'] = volume_td['vid']
+            volumes.append(current_volume)
+            continue
+
+        # 处理章节行
+        chapter_tds = row.select('td.ccss')
+        for td in chapter_tds:
+            link = td.select_one('a')
+            if link and link.get('href'):
+                href = link.get('href')
+                chapter_title = link.get_text().strip()
+
+                if not chapter_title or chapter_title == ' ':
+                    continue
+
+                if href.startswith('http'):
+                    chapter_url = href
+                else:
+                    base_url = catalog_url.rsplit('/', 1)[0]
+                    chapter_url = f"{base_url}/{href}"
+
+                chapter_info = {
+                    'title': chapter_title,
+                    'url': chapter_url
+                }
+
+                # 如果当前没有卷，创建一个默认卷
+                if current_volume is None:
+                    current_volume = {
+                        'title': '默认卷',
+                        'chapters': []
+                    }
+                    volumes.append(current_volume)
+
+                current_volume['chapters'].append(chapter_info)
+
+    total_chapters = sum(len(vol['chapters']) for vol in volumes)
+    logger.info(f"总共找到 {len(volumes)} 卷，{total_chapters} 个章节")
+    return volumes
+
+
+_WHITESPACE = re.compile(r'\s+')
+# 插图章节需要从章节页面获取图片，不使用整卷文本
+_ILLUSTRATION_TITLE = re.compile(r'插图|插画|彩页|彩插')
+MIN_BULK_CHAPTER_LENGTH = 20
+
+
+def _title_key(text):
+    return _WHITESPACE.sub('', text).lower()
+
+
+def split_volume_text(text, titles):
+    """
+    按目录中的章节标题切分整卷文本 (packtxt.php 返回的内容)。
+    titles: 卷内各章节的原始标题，按目录顺序
+    返回与 titles 对齐的列表，元素为章节正文；以下情况为 None，应逐章从页面下载:
+        - 在文本中找不到该章节标题
+        - 下一章的标题找不到 (无法确定本章结束位置)
+        - 插图章节或正文过短
+        - 正文中还有与目录标题相同的行 (如卷首目录被算进了某一章，无法确定边界)
+    """
+    lines = text.splitlines()
+    line_keys = [_title_key(line) for line in lines]
+    line_indices = {}  # 标题键 -> 出现的行号 (升序)
+    for index, key in enumerate(line_keys):
+        line_indices.setdefault(key, []).append(index)
+    # 按目录顺序逐个匹配，每个标题只在上一个匹配到的标题之后查找，
+    # 正文中提前出现的同名行 (如卷首目录、前文提到后面的章节名) 不会打乱章节顺序
+    positions = []
+    search_from = 0
+    for title in titles:
+        key = _title_key(title)
+        candidates = line_indices.get(key, []) if key else []
+        i = bisect.bisect_left(candidates, search_from)
+        position = candidates[i] if i < len(candidates) else None
+        positions.append(position)
+        if position is not None:
+            search_from = position + 1
+
+    title_keys = {_title_key(title) for title in titles} - {''}
+    contents = []
+    for i, (title, position) in enumerate(zip(titles, positions)):
+        if position is None or _ILLUSTRATION_TITLE.search(title):
+            contents.append(None)
+            continue
+        if i + 1 < len(positions):
+            end = positions[i + 1]
+            if end is None:
+                contents.append(None)
+                continue
+        else:
+            end = len(lines)
+        if any(key in title_keys for key in line_keys[position + 1:end]):
+            contents.append(None)
+            continue
+        content = '\n'.join(lines[position + 1:end]).strip()
+        contents.append(content if len(content) >= MIN_BULK_CHAPTER_LENGTH else None)
+    return contents
+
+
+# 提取正文时跳过的元素: (标签, 属性, 取值)，class 按空格分隔匹配
+_SKIPPED_CONTENT_ELEMENTS = (
+    ('div', 'class', 'divimage'),
+    ('ul', 'id', 'contentdp'),
+    ('div', 'class', 'chapter_turnpage'),
+    ('div', 'id', 'contentadv'),
+    ('script', None, None),
+    ('style', None, None),
+)
+_CONTENT_CONTAINER_XPATHS = (
+    '//*[@id="content"]',
+    '//*[@id="contentmain"]',
+    '//*[contains(concat(" ", normalize-space(@class), " "), " content ")]',
+)
+_CONTENT_MARKER = re.compile(r'<div[^>]+id=["\']?content["\'\s>]', re.IGNORECASE)
+
+
+def _has_class(element, class_name):
+    return class_name in (element.get('class') or '').split()
+
+
+def _is_skipped_element(element):
+    tag = element.tag
+    for skip_tag, attr, value in _SKIPPED_CONTENT_ELEMENTS:
+        if tag != skip_tag:
+            continue
+        if attr is None:
+            return True
+        if attr == 'class' and _has_class(element, value):
+            return True
+        if attr == 'id' and element.get('id') == value:
+            return True
+    return False
+
+
+def _parse_html(html):
+    try:
+        return lxml_html.fromstring(html)
+    except ValueError:  # 带 XML 编码声明的字符串
+        return lxml_html.fromstring(html.encode('utf-8'), parser=lxml_html.HTMLParser(encoding='utf-8'))
+
+
+def extract_chapter_content(html, page_url, restrict_to_content=True):
+    """
+    从章节页面中提取正文和插图。
+    只用 lxml 解析一次，并在一次遍历中同时收集文本和插图地址。
+    restrict_to_content: 页面中存在 <div id="content"> 时，从该处开始解析，跳过页头和导航。
+    Returns (text_content, image_urls).
+    """
+    if restrict_to_content:
+        marker = _CONTENT_MARKER.search(html)
+        if marker:
+            html = html[marker.start():]
+    if not html.strip():
+        return "", []
+    root = _parse_html(html)
+
+    # 1. Identify the main content area
+    main_content_area = None
+    for xpath in _CONTENT_CONTAINER_XPATHS:
+        candidates = root.xpath(xpath)
+        if candidates:
+            main_content_area = candidates[0]
+            break
+    if main_content_area is None:
+        body = root.find('.//body') if root.tag != 'body' else root
+        main_content_area = body if body is not None else root
+
+    # 2 & 3. 一次遍历: 收集插图并提取正文，跳过广告、脚本和插图容器内的文字
+    text_parts = []
+    divimage_images = []
+    other_images = []
+
+    def add_text(value):
+        if value:
+            value = value.strip()
+            if value:
+                text_parts.append(value)
+
+    def walk(element, skipped, in_divimage):
+        if not isinstance(element.tag, str):  # 注释和处理指令没有正文
+            return
+        if element.tag == 'img' and _has_class(element, 'imagecontent') and element.get('src'):
+            (divimage_images if in_divimage else other_images).append(element.get('src'))
+        skipped = skipped or _is_skipped_element(element)
+        in_divimage = in_divimage or (element.tag == 'div' and _has_class(element, 'divimage'))
+        if not skipped:
+            add_text(element.text)
+        for child in element:
+            walk(child, skipped, in_divimage)
+            if not skipped:
+                add_text(child.tail)
+
+    walk(main_content_area, False, False)
+
+    image_urls_to_download = []
+    for img_src in divimage_images or other_images:
+        full_img_url = urljoin(page_url, img_src)
+        if full_img_url not in image_urls_to_download:
+            image_urls_to_download.append(full_img_url)
+
+    text_content = re.sub(r'\n{2,}', '\n\n', '\n'.join(text_parts))
+    return text_content, image_urls_to_download
+
+
+def clean_chapter_text(text_content):
+    """去除章节正文中的站点水印、录入信息等多余内容，规则见 novel.cleanup_rules"""
+    return get_cleanup_rules().apply(text_content)
+
+
+def safe_chapter_filename(chapter):
+    """将章节标题转换为安全的文件名 (不含扩展名)"""
+    safe_chapter_title = re.sub(r'[<>:"/\\|?*]', '_', chapter['title'])
+    safe_chapter_title = re.sub(r'[\\s\\.\\(\\)]+', '_', safe_chapter_title) # Replace whitespace, dots, parens with underscore
+    safe_chapter_title = re.sub(r'_+', '_', safe_chapter_title) # Consolidate multiple underscores
+    safe_chapter_title = safe_chapter_title.strip('_')
+    if len(safe_chapter_title) > 60: # Limit length to avoid issues with long paths
+        safe_chapter_title = safe_chapter_title[:60].strip('_')
+    if not safe_chapter_title: # If title becomes empty after sanitization
+        safe_chapter_title = f"chapter_{chapter['url'].split('/')[-1].replace('.htm','')}"
+    return safe_chapter_title
+
+
+def image_extension(img_url):
+    """根据图片URL推断扩展名，默认为 jpg"""
+    img_original_filename = img_url.split('/')[-1].split('?')[0].split('#')[0]
+    img_ext = 'jpg' # Default
+    if '.' in img_original_filename:
+        candidate_ext = img_original_filename.split('.')[-1].lower()
+        if len(candidate_ext) <= 4 and candidate_ext.isalnum() and candidate_ext not in ['php', 'html', 'htm']:
+            img_ext = candidate_ext
+    return img_ext
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+下载进度事件。
+
+下载器在各个环节发出带类型的 ProgressEvent，订阅者自行决定如何展示：
+日志 (LogSubscriber，经 log_pipeline 输出到控制台、文件和界面) 只是其中一个订阅者，
+界面用 ProgressTracker 汇总出已完成章节数、速率和预计剩余时间。
+订阅者在发出事件的线程中被调用，应尽快返回。
+
+多本小说共用一个下载器时，用 bind(task) 把当前线程的事件归到某个下载任务，
+事件的 task 字段即为该任务的标识。
+"""
+
+import logging
+import sys
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+from enum import Enum
+from threading import Lock, local
+
+
+class EventType(Enum):
+    MESSAGE = 'message'                      # 日志文字 (message)，value 为日志级别，source 为模块名
+    DOWNLOAD_STARTED = 'download_started'    # 开始一批章节，value 为章节数
+    CHAPTER_STARTED = 'chapter_started'
+    CHAPTER_FINISHED = 'chapter_finished'    # value 为是否成功
+    CHAPTER_SKIPPED = 'chapter_skipped'      # 之前已下载完成
+    BYTES_RECEIVED = 'bytes_received'        # value 为字节数
+    RETRY = 'retry'                          # value 为第几次重试
+    BLOCKED = 'blocked'                      # value 为拦截类型 (BlockVerdict.value)
+    DOWNLOAD_FINISHED = 'download_finished'  # 一批章节结束，value 为成功的章节数
+
+
+ProgressEvent = namedtuple('ProgressEvent', ['type', 'task', 'chapter', 'value', 'message', 'timestamp', 'source'],
+                           defaults=(None,))
+
+
+class ProgressEmitter:
+    """进度事件的发布者，订阅者为接收 ProgressEvent 的可调用对象"""
+
+    def __init__(self):
+        self._subscribers = ()
+        self._lock = Lock()
+        self._local = local()
+
+    def subscribe(self, callback):
+        with self._lock:
+            self._subscribers = self._subscribers + (callback,)
+        return callback
+
+    def unsubscribe(self, callback):
+        with self._lock:
+            self._subscribers = tuple(subscriber for subscriber in self._subscribers if subscriber is not callback)
+
+    @contextmanager
+    def bind(self, task):
+        """在此范围内当前线程发出的事件都属于 task (task 为 None 时不改变)"""
+        if task is None:
+            yield
+            return
+        previous = getattr(self._local, 'task', None)
+        self._local.task = task
+        try:
+            yield
+        finally:
+            self._local.task = previous
+
+    def current_task(self):
+        return getattr(self._local, 'task', None)
+
+    def emit(self, event_type, chapter=None, value=None, message='', task=None, source=None):
+        event = ProgressEvent(event_type, task if task is not None else self.current_task(),
+                              chapter, value, message, time.time(), source)
+        for subscriber in self._subscribers:
+            try:
+                subscriber(event)
+            except Exception as e:
+                sys.stderr.write(f"进度事件处理出错: {e}\n")
+
+    def message(self, message, task=None, level=logging.INFO, source=None):
+        self.emit(EventType.MESSAGE, value=level, message=message, task=task, source=source)
+
+
+class LogSubscriber:
+    """把日志文字交给 logging，记录到事件来源模块的 logger (没有来源时用 default_logger)"""
+
+    def __init__(self, default_logger='novel'):
+        self.default_logger = default_logger
+
+    def __call__(self, event):
+        if event.type is EventType.MESSAGE:
+            logging.getLogger(event.source or self.default_logger).log(event.value or logging.INFO, event.message)
+
+
+class ProgressTracker:
+    """汇总一个下载任务的进度事件：章节完成数、下载字节数、速率和预计剩余时间"""
+
+    def __init__(self):
+        self._lock = Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.total = 0
+            self.finished = 0
+            self.failed = 0
+            self.skipped = 0
+            self.bytes = 0
+            self.retries = 0
+            self.blocks = 0
+            self.started_at = None
+            self.updated_at = None
+
+    def update(self, event):
+        with self._lock:
+            if self.started_at is None:
+                self.started_at = event.timestamp
+            self.updated_at = event.timestamp
+            if event.type is EventType.DOWNLOAD_STARTED:
+                self.total += event.value or 0
+            elif event.type is EventType.CHAPTER_FINISHED:
+                if event.value:
+                    self.finished += 1
+                else:
+                    self.failed += 1
+            elif event.type is EventType.CHAPTER_SKIPPED:
+                self.skipped += 1
+            elif event.type is EventType.BYTES_RECEIVED:
+                self.bytes += event.value or 0
+            elif event.type is EventType.RETRY:
+                self.retries += 1
+            elif event.type is EventType.BLOCKED:
+                self.blocks += 1
+
+    @property
+    def done(self):
+        return self.finished + self.failed + self.skipped
+
+    def elapsed(self, now=None):
+        if self.started_at is None:
+            return 0.0
+        return max(0.0, (now or time.time()) - self.started_at)
+
+    def chapter_rate(self, now=None):
+        """实际下载的章节/秒 (不含跳过的章节)"""
+        elapsed = self.elapsed(now)
+        return (self.finished + self.failed) / elapsed if elapsed > 0 else 0.0
+
+    def byte_rate(self, now=None):
+        elapsed = self.elapsed(now)
+        return self.bytes / elapsed if elapsed > 0 else 0.0
+
+    def eta(self, now=None):
+        """预计剩余秒数，还无法估计时返回 None"""
+        remaining = self.total - self.done
+        if remaining <= 0:
+            return 0.0
+        rate = self.chapter_rate(now)
+        return remaining / rate if rate > 0 else None
+
+
+def format_duration(seconds):
+    """把秒数格式化为 m:ss 或 h:mm:ss，None 显示为 --:--"""
+    if seconds is None:
+        return '--:--'
+    seconds = int(round(seconds))
+    hours, seconds = divmod(seconds, 3600)
+    minutes, seconds = divmod(seconds, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes}:{seconds:02d}"
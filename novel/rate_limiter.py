@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import asyncio
+import logging
+import time
+from threading import Lock
+
+DEFAULT_INITIAL_RATE = 2.0      # 初始请求速率 (次/秒)
+DEFAULT_MIN_RATE = 0.2
+DEFAULT_MAX_RATE = 10.0
+DEFAULT_INCREASE = 0.1          # 每次正常响应后增加的速率
+DEFAULT_DECREASE_FACTOR = 0.5   # 被限流时速率乘以该系数
+DEFAULT_COOLDOWN = 30.0         # 被限流后暂停请求的秒数
+
+logger = logging.getLogger(__name__)
+
+
+class AdaptiveRateLimiter:
+    """
+    AIMD 令牌桶限速器，由同步下载器的所有线程和异步引擎共享。
+
+    页面正常返回时速率线性增加 (additive increase)；检测到 Cloudflare 1015、
+    429 或 503 时速率按比例下降 (multiplicative decrease)，并在冷却期内暂停发放令牌。
+    """
+
+    def __init__(self, initial_rate=DEFAULT_INITIAL_RATE, min_rate=DEFAULT_MIN_RATE, max_rate=DEFAULT_MAX_RATE,
+                 increase=DEFAULT_INCREASE, decrease_factor=DEFAULT_DECREASE_FACTOR, cooldown=DEFAULT_COOLDOWN,
+                 burst=2):
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.decrease_factor = decrease_factor
+        self.cooldown = cooldown
+        self.capacity = max(1.0, float(burst))
+        self._rate = min(max(initial_rate, min_rate), max_rate)
+        self._tokens = self.capacity
+        self._last = time.monotonic()   # 令牌数对应的时间点，冷却期间会被推到冷却结束时
+        self._blocked_until = 0.0
+        self._lock = Lock()
+        self.throttle_count = 0
+
+    @property
+    def rate(self):
+        return self._rate
+
+    def _refill(self, now):
+        if now > self._last:
+            self._tokens = min(self.capacity, self._tokens + (now - self._last) * self._rate)
+            self._last = now
+
+    def reserve(self):
+        """预定一个令牌，返回调用方需要等待的秒数"""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._tokens -= 1
+            wait = max(0.0, self._last - now)
+            if self._tokens < 0:
+                wait += -self._tokens / self._rate
+            return wait
+
+    def acquire(self):
+        """阻塞直到可以发出下一个请求"""
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self):
+        """acquire 的协程版本，等待期间不阻塞事件循环"""
+        wait = self.reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def on_success(self):
+        """请求正常完成，线性提高速率"""
+        with self._lock:
+            if time.monotonic() >= self._blocked_until:
+                self._rate = min(self.max_rate, self._rate + self.increase)
+
+    def on_throttle(self, reason=''):
+        """检测到限流，速率减半并进入冷却期；冷却期内的重复信号只计一次"""
+        with self._lock:
+            now = time.monotonic()
+            if now < self._blocked_until:
+                return
+            self._refill(now)
+            self._rate = max(self.min_rate, self._rate * self.decrease_factor)
+            self._blocked_until = now + self.cooldown
+            self._tokens = min(self._tokens, 0.0)
+            self._last = max(self._last, self._blocked_until)
+            self.throttle_count += 1
+            rate = self._rate
+        logger.warning(f"检测到限流{f' ({reason})' if reason else ''}，暂停 {self.cooldown:g} 秒，速率降至 {rate:.2f} 次/秒")
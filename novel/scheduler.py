@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import itertools
+from contextlib import contextmanager
+from threading import Condition
+
+PRIORITY_LOW = 1
+PRIORITY_NORMAL = 2
+PRIORITY_HIGH = 4
+PRIORITY_NAMES = {PRIORITY_HIGH: '高', PRIORITY_NORMAL: '普通', PRIORITY_LOW: '低'}
+
+
+class ChapterBudget:
+    """
+    多本小说同时下载时共用的全局章节并发名额。
+
+    同时下载的章节总数不超过 max_chapters；有多本小说在等待名额时，
+    空出的名额交给 "正在下载章节数 / 优先级" 最小的小说，即按优先级加权公平分配：
+    优先级为高 (4) 的小说大约得到普通 (2) 的两倍名额，只有一本小说时它可以用满全部名额。
+    主机级别的并发和限速仍由共用的 Wenku8Downloader 负责。
+    """
+
+    def __init__(self, max_chapters):
+        self.max_chapters = max(1, int(max_chapters))
+        self._cond = Condition()
+        self._tasks = {}  # key -> {'priority', 'running', 'waiting', 'cancelled', 'order'}
+        self._running = 0
+        self._order = itertools.count()
+
+    def register(self, key, priority=PRIORITY_NORMAL):
+        """登记一个下载任务；重复登记时更新优先级并撤销取消状态"""
+        with self._cond:
+            task = self._tasks.get(key)
+            if task is None:
+                self._tasks[key] = {'priority': max(1, int(priority)), 'running': 0, 'waiting': 0,
+                                    'cancelled': False, 'order': next(self._order)}
+            else:
+                task['priority'] = max(1, int(priority))
+                task['cancelled'] = False
+            self._cond.notify_all()
+
+    def unregister(self, key):
+        with self._cond:
+            self._tasks.pop(key, None)
+            self._cond.notify_all()
+
+    def set_priority(self, key, priority):
+        with self._cond:
+            task = self._tasks.get(key)
+            if task is not None:
+                task['priority'] = max(1, int(priority))
+                self._cond.notify_all()
+
+    def cancel(self, key):
+        """取消任务：正在等待和之后申请的名额都会被拒绝，已在下载的章节不受影响"""
+        with self._cond:
+            task = self._tasks.get(key)
+            if task is not None:
+                task['cancelled'] = True
+                self._cond.notify_all()
+
+    def resize(self, max_chapters):
+        with self._cond:
+            self.max_chapters = max(1, int(max_chapters))
+            self._cond.notify_all()
+
+    def _next_key(self):
+        """等待中的任务里最应该得到下一个名额的任务，调用方需持有锁"""
+        candidates = [
+            (task['running'] / task['priority'], -task['priority'], task['order'], key)
+            for key, task in self._tasks.items() if task['waiting'] and not task['cancelled']
+        ]
+        return min(candidates)[3] if candidates else None
+
+    @contextmanager
+    def slot(self, key):
+        """
+        占用一个章节名额，得到 True；任务已取消时得到 False，调用方应跳过该章节。
+        未登记的任务按普通优先级自动登记。
+        """
+        with self._cond:
+            task = self._tasks.get(key)
+            if task is None:
+                self.register(key)
+                task = self._tasks[key]
+            task['waiting'] += 1
+            try:
+                while not task['cancelled'] and not (self._running < self.max_chapters and self._next_key() == key):
+                    self._cond.wait()
+            finally:
+                task['waiting'] -= 1
+            granted = not task['cancelled']
+            if granted:
+                task['running'] += 1
+                self._running += 1
+            self._cond.notify_all()  # 还有空余名额时让下一个任务继续申请
+        try:
+            yield granted
+        finally:
+            if granted:
+                with self._cond:
+                    task['running'] -= 1
+                    self._running -= 1
+                    self._cond.notify_all()
+
+    def snapshot(self):
+        """返回 {key: (正在下载章节数, 等待中的章节数, 优先级)}"""
+        with self._cond:
+            return {key: (task['running'], task['waiting'], task['priority']) for key, task in self._tasks.items()}
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import json
+import logging
+import os
+import sqlite3
+import time
+from collections import OrderedDict
+from threading import Lock
+
+from utils import get_app_base_dir
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SEARCH_TTL = 24 * 60 * 60  # 默认缓存24小时
+DEFAULT_MAX_ENTRIES = 200  # 最多缓存的搜索结果页数
+MEMORY_ENTRIES = 32  # 内存中保留的最近使用页数
+
+
+class SearchCache:
+    """
+    搜索结果缓存，按搜索URL (含翻页URL) 保存 {'novels': [...], 'pagination_info': {...}}，
+    其中每本小说带有封面URL和封面本地路径。
+
+    结果保存在 SQLite 数据库中，重启后仍然有效；超过 max_entries 时淘汰最久未使用的页，
+    超过 ttl 秒的结果视为过期。最近使用的若干页同时保留在内存中，
+    后台线程对其中小说信息的修改 (如封面下载完成) 对之后的读取直接可见。
+    """
+
+    def __init__(self, db_path=None, max_entries=DEFAULT_MAX_ENTRIES, ttl=DEFAULT_SEARCH_TTL):
+        self.db_path = db_path or os.path.join(get_app_base_dir(), 'novel_cache', 'search_cache.sqlite3')
+        self.max_entries = max(1, int(max_entries))
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = Lock()
+        self._memory = OrderedDict()  # url -> (result, timestamp)
+        self._db = None
+        try:
+            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+            self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS search_results ('
+                'url TEXT PRIMARY KEY, value TEXT NOT NULL, timestamp REAL NOT NULL, last_used REAL NOT NULL)'
+            )
+            self._db.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"打开搜索缓存数据库失败，仅在内存中缓存 {self.db_path}: {e}")
+            self._db = None
+
+    def _expired(self, timestamp):
+        return self.ttl is not None and time.time() - timestamp > self.ttl
+
+    def _db_execute(self, sql, params=()):
+        """执行一条语句并提交，调用方需持有锁"""
+        if self._db is None:
+            return None
+        try:
+            cursor = self._db.execute(sql, params)
+            self._db.commit()
+            return cursor
+        except sqlite3.Error as e:
+            logger.warning(f"搜索缓存数据库操作失败: {e}")
+            return None
+
+    def _remember(self, url, result, timestamp):
+        """放入内存缓存，调用方需持有锁"""
+        self._memory[url] = (result, timestamp)
+        self._memory.move_to_end(url)
+        while len(self._memory) > min(MEMORY_ENTRIES, self.max_entries):
+            self._memory.popitem(last=False)
+
+    def get(self, url):
+        """获取搜索结果，不存在或已过期时返回 None"""
+        with self._lock:
+            record = self._memory.get(url)
+            if record is None:
+                cursor = self._db_execute('SELECT value, timestamp FROM search_results WHERE url = ?', (url,))
+                row = cursor.fetchone() if cursor else None
+                if row:
+                    try:
+                        record = (json.loads(row[0]), row[1])
+                    except ValueError:
+                        record = None
+            if record is None or self._expired(record[1]):
+                if record is not None:
+                    self._memory.pop(url, None)
+                    self._db_execute('DELETE FROM search_results WHERE url = ?', (url,))
+                self.misses += 1
+                return None
+            self._remember(url, *record)
+            self._db_execute('UPDATE search_results SET last_used = ? WHERE url = ?', (time.time(), url))
+            self.hits += 1
+            return record[0]
+
+    def __contains__(self, url):
+        """是否有未过期的结果 (不计入命中统计)"""
+        with self._lock:
+            record = self._memory.get(url)
+            if record is not None:
+                return not self._expired(record[1])
+            cursor = self._db_execute('SELECT timestamp FROM search_results WHERE url = ?', (url,))
+            row = cursor.fetchone() if cursor else None
+            return bool(row) and not self._expired(row[0])
+
+    def set(self, url, result):
+        """保存搜索结果，超出容量时淘汰最久未使用的结果"""
+        now = time.time()
+        with self._lock:
+            self._remember(url, result, now)
+            self._db_execute(
+                'INSERT OR REPLACE INTO search_results (url, value, timestamp, last_used) VALUES (?, ?, ?, ?)',
+                (url, json.dumps(result, ensure_ascii=False), now, now)
+            )
+            self._db_execute(
+                'DELETE FROM search_results WHERE url NOT IN '
+                '(SELECT url FROM search_results ORDER BY last_used DESC LIMIT ?)',
+                (self.max_entries,)
+            )
+            if self.ttl is not None:
+                self._db_execute('DELETE FROM search_results WHERE timestamp < ?', (now - self.ttl,))
+
+    def clear(self):
+        """清空全部搜索缓存"""
+        with self._lock:
+            self._memory.clear()
+            self._db_execute('DELETE FROM search_results')
+
+    def stats(self):
+        """返回缓存统计: 命中次数、未命中次数、命中率和缓存页数"""
+        with self._lock:
+            cursor = self._db_execute('SELECT COUNT(*) FROM search_results')
+            entries = cursor.fetchone()[0] if cursor else len(self._memory)
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0,
+                'entries': entries
+            }
@@ -21,5 +21,8 @@ def load_settings():
     with open(settings_path, 'r') as f:
         settings = json.load(f)
 
-    config.SETTINGS = settings
+    # 保留新版本新增字段的默认值
+    merged_settings = config.SETTINGS.copy()
+    merged_settings.update(settings)
+    config.SETTINGS = merged_settings
     return True, "novel_settings.json文件加载成功"
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+章节文本的保存和整卷文本的切分保存，同步 (novel.main) 和异步 (novel.async_engine) 下载器共用。
+
+这里只处理已经取得的文本和本地文件，不发出网络请求；整卷文本 (packtxt.php) 由各下载器自己获取:
+
+    pending = pending_chapters(manifest, prefixed_chapters)
+    if pending:
+        volume_text = ...  # 各下载器自己的请求
+        save_volume_text(volume_text, titles, prefixed_chapters, pending, volume_dir, manifest)
+"""
+
+import logging
+import os
+
+from novel.fix_text import normalize_lines
+from novel.manifest import atomic_write_lines
+from novel.parsing import clean_chapter_text, safe_chapter_filename, split_volume_text
+
+logger = logging.getLogger(__name__)
+
+
+def _log_to_logger(message, level=logging.INFO):
+    logger.log(level, message)
+
+
+def chapter_text_filename(chapter):
+    return f"{safe_chapter_filename(chapter)}.txt"
+
+
+def save_chapter_text(chapter, output_dir, text_content, image_files_references=()):
+    """写入章节文本文件，返回内容的 sha256；写入失败时抛出 IOError"""
+    full_text = f"# {chapter['title']}\n\n{text_content}"
+    # 插图引用与正文一起写入，保证文件要么完整要么不存在
+    if image_files_references:
+        full_text += "\n\n--- (本章节包含插图) ---\n"
+        full_text += ''.join(f"[插图: {img_ref}]\n" for img_ref in image_files_references)
+    text_filepath = os.path.join(output_dir, chapter_text_filename(chapter))
+    # 写入时逐行规范化换行和小标题间距，不再需要下载后重新修复
+    return atomic_write_lines(text_filepath, normalize_lines(full_text.splitlines()))
+
+
+def pending_chapters(manifest, chapters):
+    """下载清单中尚未完成的章节在 chapters 中的下标"""
+    return [i for i, chapter in enumerate(chapters) if not manifest.is_complete(chapter)]
+
+
+def save_volume_text(volume_text, titles, chapters, pending, volume_dir, manifest, log=None):
+    """
+    按目录标题切分整卷文本，保存 pending 中能切分出正文的章节并记入下载清单，返回保存的章节数。
+    titles: 卷内章节的原始标题；chapters: 带序号前缀的章节，与 titles 对齐
+    log(message, level): 输出日志，默认写入本模块的 logger
+    """
+    log = log or _log_to_logger
+    contents = split_volume_text(volume_text, titles)
+    saved = 0
+    for i in pending:
+        text_content = clean_chapter_text(contents[i]) if contents[i] else ""
+        if not text_content:
+            continue
+        chapter = chapters[i]
+        try:
+            text_hash = save_chapter_text(chapter, volume_dir, text_content)
+        except IOError as e:
+            log(f"  ✗ 保存文本文件失败 {chapter['title']}: {e}", logging.WARNING)
+            continue
+        manifest.record(chapter, chapter_text_filename(chapter), text_hash, [])
+        saved += 1
+    manifest.flush()
+    log(f"整卷下载: {saved}/{len(pending)} 个章节从整卷文本保存，其余 {len(pending) - saved} 个逐章下载")
+    return saved